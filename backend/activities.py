@@ -1,11 +1,61 @@
+import asyncio
 import csv
+import hashlib
 import json
-from typing import Dict, List, Tuple, Any
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple, Any, Union
 from temporalio import activity
-from openai import OpenAI
 from config import Config
-from geocoding import GeocodingService, get_fallback_coordinates
+from geocoding import get_geocoding_service, get_fallback_coordinates
+from distance_table import get_distance_table
 from matching import MatchingScorer, validate_matching_input
+from mock_mentors import get_mock_mentors
+from roster_store import RosterNotFoundError, RosterRef, resolve_roster
+from caching import LRUTTLCache
+from cv_preprocessing import preprocess_cv, merge_interest_votes, estimate_tokens
+from interest_classifier import InterestClassifier
+from reasoning_templates import template_reasoning, snippet_reasoning
+from minhash import MinHashLSH
+from llm_client import chat_completion, get_llm_client_stats, record_llm_outcome
+from llm_scheduler import BATCH, get_llm_scheduler
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Generated match reasoning, shared by every activity in this worker process
+reasoning_cache = LRUTTLCache(
+    'match-reasoning',
+    max_size=Config.REASONING_CACHE_SIZE,
+    ttl_seconds=Config.REASONING_CACHE_TTL_SECONDS,
+    persistent_path=Config.REASONING_CACHE_DB
+)
+
+# Validated CV analysis results, keyed by content so re-uploads skip the LLM
+cv_analysis_cache = LRUTTLCache(
+    'cv-analysis',
+    max_size=Config.CV_CACHE_SIZE,
+    ttl_seconds=Config.CV_CACHE_TTL_SECONDS,
+    persistent_path=Config.CV_CACHE_DB
+)
+
+# Reusable per-mentor reasoning fragments, keyed by mentor id and profile revision
+mentor_snippet_cache = LRUTTLCache(
+    'mentor-snippets',
+    max_size=Config.SNIPPET_CACHE_SIZE,
+    ttl_seconds=Config.SNIPPET_CACHE_TTL_SECONDS,
+    persistent_path=Config.SNIPPET_CACHE_DB
+)
+
+# Near-duplicate index over analysed CVs (small edits, shared templates)
+cv_similarity_index = MinHashLSH(max_entries=Config.CV_SIMILARITY_INDEX_SIZE)
+
+# Matches currently generating LLM reasoning in this worker, for load shedding
+_reasoning_in_flight = 0
+
+# Local rule-based classifier, built for the current interest vocabulary on first use
+_interest_classifier: Optional[InterestClassifier] = None
+_interest_classifier_vocabulary: Optional[List[str]] = None
 
 def load_interests():
     """Load interests from CSV file"""
@@ -16,10 +66,126 @@ def load_interests():
             interests.append(row['interest'])
     return interests
 
+def cv_analysis_cache_key(cv_text: str, interests: List[str]) -> str:
+    """
+    Build the content-addressed cache key for a CV analysis.
+    Combines the normalized CV text, the interest vocabulary version and the model id.
+    """
+    normalized_text = ' '.join(cv_text.split()).lower()
+    vocabulary_version = hashlib.sha256('\n'.join(interests).encode()).hexdigest()[:16]
+    payload = json.dumps([normalized_text, vocabulary_version, Config.LLM_MODEL])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@activity.defn
+async def lookup_cv_analysis(cv_text: str) -> Optional[List[str]]:
+    """
+    Look up a previous analysis of the same CV text.
+    Run as a local activity before scheduling the LLM activity.
+    
+    Args:
+        cv_text: The CV text to analyze
+        
+    Returns:
+        The cached list of interests, or None on a cache miss
+    """
+    all_interests = load_interests()
+    interests = cv_analysis_cache.get(cv_analysis_cache_key(cv_text, all_interests))
+    activity.logger.info(f"CV analysis cache {'hit' if interests is not None else 'miss'}: {cv_analysis_cache.stats()}")
+    
+    if interests is None and Config.CV_SIMILARITY_ENABLED:
+        interests = find_similar_cv_analysis(cv_text, all_interests, activity.logger)
+    
+    if interests is None and Config.CV_FAST_PATH_ENABLED:
+        interests = classify_cv_fast_path(cv_text, all_interests, activity.logger)
+    
+    return interests
+
+
+def get_interest_classifier(interests: List[str]) -> InterestClassifier:
+    """Get the shared interest classifier, rebuilding it if the vocabulary changed."""
+    global _interest_classifier, _interest_classifier_vocabulary
+    
+    if _interest_classifier is None or _interest_classifier_vocabulary != interests:
+        _interest_classifier = InterestClassifier(
+            interests,
+            confident=Config.CV_FAST_PATH_CONFIDENCE,
+            min_interests=Config.CV_FAST_PATH_MIN_INTERESTS
+        )
+        _interest_classifier_vocabulary = list(interests)
+    
+    return _interest_classifier
+
+
+def classify_cv_fast_path(cv_text: str, interests: List[str], logger=logger) -> Optional[List[str]]:
+    """
+    Classify a CV locally, skipping the LLM when the classifier is confident.
+    
+    Args:
+        cv_text: The CV text to analyze
+        interests: The current interest vocabulary
+        logger: Logger instance
+        
+    Returns:
+        The detected interests, or None if the CV is ambiguous and needs the LLM
+    """
+    classifier = get_interest_classifier(interests)
+    cleaned_text = '\n'.join(preprocess_cv(cv_text, Config.CV_CHUNK_TOKENS, Config.CV_MAX_CHUNKS))
+    matched = classifier.fast_path(cleaned_text)
+    
+    logger.info(
+        f"CV fast path {'taken' if matched is not None else 'skipped'}"
+        f"{f': {matched}' if matched is not None else ''} ({classifier.stats()})"
+    )
+    return matched
+
+
+def find_similar_cv_analysis(cv_text: str, interests: List[str], logger=logger) -> Optional[List[str]]:
+    """
+    Reuse the interests of a previously analysed, near-identical CV.
+    
+    Args:
+        cv_text: The CV text to analyze
+        interests: The current interest vocabulary
+        logger: Logger instance
+        
+    Returns:
+        The reused (and optionally refined) interests, or None if no CV is similar enough
+    """
+    match = cv_similarity_index.query(cv_text)
+    if match is None:
+        return None
+    
+    _, similarity, previous = match
+    if similarity < Config.CV_SIMILARITY_THRESHOLD or previous['model'] != Config.LLM_MODEL:
+        logger.info(f"Closest previous CV has similarity {similarity:.2f}, not reusing")
+        return None
+    
+    reused = [interest for interest in previous['interests'] if interest in interests]
+    
+    if Config.CV_SIMILARITY_REFINE:
+        # Cheap diff check: pick up interests named in lines that are new in this CV
+        added_lines = _normalized_lines(cv_text) - set(previous['lines'])
+        for interest in interests:
+            if len(reused) >= 8:
+                break
+            if interest not in reused and any(interest.lower() in line for line in added_lines):
+                reused.append(interest)
+    
+    logger.info(f"Reusing interests from a previous CV with similarity {similarity:.2f}: {reused}")
+    return reused
+
+
+def _normalized_lines(text: str) -> Set[str]:
+    """Split text into lowercased, whitespace-normalized non-empty lines."""
+    return {' '.join(line.split()).lower() for line in text.splitlines() if line.strip()}
+
+
 @activity.defn
 async def analyze_cv_with_llm(cv_text: str) -> list[str]:
     """
     Analyze CV text using LLM and match against predefined interests.
+    Oversized CVs are split into chunks that are analysed concurrently.
     
     Args:
         cv_text: The CV text to analyze
@@ -34,14 +200,60 @@ async def analyze_cv_with_llm(cv_text: str) -> list[str]:
         interests = load_interests()
         activity.logger.info(f"Loaded {len(interests)} interests from CSV")
         
-        # Initialize OpenAI client with OpenRouter
-        client = OpenAI(
-            base_url=Config.OPENROUTER_BASE_URL,
-            api_key=Config.OPENROUTER_API_KEY
+        # Clean the CV and cap it at the prompt token budget
+        chunks = preprocess_cv(cv_text, Config.CV_CHUNK_TOKENS, Config.CV_MAX_CHUNKS)
+        if not chunks:
+            raise Exception("CV text is empty after preprocessing")
+        activity.logger.info(
+            f"Preprocessed CV into {len(chunks)} chunk(s), ~{sum(estimate_tokens(c) for c in chunks)} tokens"
+        )
+        
+        results = await asyncio.gather(
+            *(request_cv_interests(chunk, interests, activity.logger) for chunk in chunks),
+            return_exceptions=True
         )
         
-        # Prepare the prompt
-        prompt = f"""You are an expert at analyzing CVs and identifying people's interests based on their professional background, skills, and experience.
+        succeeded = [result for result in results if not isinstance(result, BaseException)]
+        for result in results:
+            if isinstance(result, BaseException):
+                activity.logger.error(f"CV chunk analysis failed: {result}")
+        if not succeeded:
+            raise results[0]
+        
+        valid_interests = merge_interest_votes([matched for matched, _ in succeeded])
+        activity.logger.info(f"Successfully matched {len(valid_interests)} interests: {valid_interests}")
+        
+        # Only cache complete, well-formed answers
+        if len(succeeded) == len(chunks) and all(parsed for _, parsed in succeeded):
+            cache_key = cv_analysis_cache_key(cv_text, interests)
+            cv_analysis_cache.set(cache_key, valid_interests)
+            cv_similarity_index.add(cache_key, cv_text, {
+                'interests': valid_interests,
+                'model': Config.LLM_MODEL,
+                'lines': sorted(_normalized_lines(cv_text))
+            })
+        
+        return valid_interests
+                
+    except Exception as e:
+        activity.logger.error(f"Error in analyze_cv_with_llm: {str(e)}")
+        raise
+
+
+async def request_cv_interests(cv_text: str, interests: List[str], logger=logger) -> Tuple[List[str], bool]:
+    """
+    Ask the LLM which predefined interests match one (preprocessed) piece of CV text.
+    
+    Args:
+        cv_text: CV text within the prompt token budget
+        interests: The predefined interests
+        logger: Logger instance
+        
+    Returns:
+        Tuple of (matched interests, whether the response was valid JSON)
+    """
+    # Prepare the prompt
+    prompt = f"""You are an expert at analyzing CVs and identifying people's interests based on their professional background, skills, and experience.
 
 Given the following CV text, identify which interests from the predefined list below are most relevant to this person. Consider their:
 - Professional experience and career path
@@ -63,57 +275,55 @@ Respond with ONLY a JSON array of the matching interest names from the list abov
 
 Do not include any explanation, just the JSON array."""
 
-        # Make API call to OpenRouter
-        activity.logger.info(f"Calling OpenRouter API with model: {Config.LLM_MODEL}")
+    # Make API call to OpenRouter
+    logger.info(f"Calling OpenRouter API with model: {Config.LLM_MODEL}")
+    
+    response = await chat_completion(
+        'cv_analysis',
+        priority=BATCH,
+        model=Config.LLM_MODEL,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.3,  # Lower temperature for more consistent results
+        max_tokens=500
+    )
+    
+    # Extract the response
+    result_text = response.choices[0].message.content.strip()
+    logger.info(f"Received response from LLM: {result_text}")
+    
+    # Parse JSON response
+    try:
+        matched_interests = json.loads(result_text)
         
-        response = client.chat.completions.create(
-            model=Config.LLM_MODEL,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,  # Lower temperature for more consistent results
-            max_tokens=500
-        )
+        # Validate that returned interests are in our predefined list
+        valid_interests = [
+            interest for interest in matched_interests 
+            if interest in interests
+        ]
+        return valid_interests, True
         
-        # Extract the response
-        result_text = response.choices[0].message.content.strip()
-        activity.logger.info(f"Received response from LLM: {result_text}")
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse LLM response as JSON: {e}")
+        logger.error(f"Raw response: {result_text}")
+        record_llm_outcome('parse_failure', 'cv_analysis')
         
-        # Parse JSON response
-        try:
-            matched_interests = json.loads(result_text)
-            
-            # Validate that returned interests are in our predefined list
-            valid_interests = [
-                interest for interest in matched_interests 
-                if interest in interests
-            ]
-            
-            activity.logger.info(f"Successfully matched {len(valid_interests)} interests: {valid_interests}")
-            return valid_interests
-            
-        except json.JSONDecodeError as e:
-            activity.logger.error(f"Failed to parse LLM response as JSON: {e}")
-            activity.logger.error(f"Raw response: {result_text}")
-            
-            # Fallback: try to extract interests manually
-            matched = []
-            for interest in interests:
-                if interest.lower() in result_text.lower():
-                    matched.append(interest)
-            
-            if matched:
-                activity.logger.info(f"Fallback extraction found {len(matched)} interests: {matched}")
-                return matched
-            else:
-                raise Exception("Could not parse LLM response and no interests found in text")
-                
-    except Exception as e:
-        activity.logger.error(f"Error in analyze_cv_with_llm: {str(e)}")
-        raise
+        # Fallback: try to extract interests manually
+        matched = []
+        for interest in interests:
+            if interest.lower() in result_text.lower():
+                matched.append(interest)
+        
+        if matched:
+            logger.info(f"Fallback extraction found {len(matched)} interests: {matched}")
+            record_llm_outcome('fallback', 'cv_analysis')
+            return matched, False
+        else:
+            raise Exception("Could not parse LLM response and no interests found in text")
 
 
 @activity.defn
@@ -130,8 +340,9 @@ async def geocode_postcodes(postcodes: Dict[str, str]) -> Dict[str, Tuple[float,
     activity.logger.info(f"Starting geocoding for {len(postcodes)} postcodes")
     
     try:
-        geocoding_service = GeocodingService()
-        results = geocoding_service.geocode_postcodes(postcodes)
+        # Geocoding is blocking I/O (requests plus rate-limit sleeps), keep it off the event loop
+        geocoding_service = get_geocoding_service()
+        results = await asyncio.to_thread(geocoding_service.geocode_postcodes, postcodes)
         
         # Apply fallbacks for failed lookups
         for person_id, postcode in postcodes.items():
@@ -150,54 +361,200 @@ async def geocode_postcodes(postcodes: Dict[str, str]) -> Dict[str, Tuple[float,
 
 
 @activity.defn
-async def calculate_mentor_matches(
+async def select_location_postcodes(
+    student: Dict[str, Any],
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    settings: Optional[Dict[str, Any]] = None
+) -> Dict[str, str]:
+    """
+    Pick the postcodes worth geocoding for a matching request.
+    
+    Distance only matters for in-person pairs that could still change the top-K
+    ordering, so everyone else is left out. Run as a local activity by the
+    matching workflows, which only hold a roster reference.
+    
+    Args:
+        student: Student profile dictionary
+        mentors: Roster reference or list of mentor profile dictionaries
+        settings: The request's matching settings (the worker's configuration when omitted)
+        
+    Returns:
+        Dict mapping person_id -> postcode (empty when location cannot change the top matches)
+    """
+    mentors = resolve_roster(mentors)
+    top_k = resolve_settings(settings)['top_k']
+    candidate_ids = MatchingScorer().select_location_candidates(student, mentors, top_k)
+    return location_postcodes(student, mentors, candidate_ids)
+
+
+@activity.defn
+async def select_shard_location_postcodes(
+    student: Dict[str, Any],
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    start: int,
+    end: int,
+    top_k: int
+) -> Dict[str, Any]:
+    """
+    Score bounds of one shard of a roster, for picking the postcodes worth geocoding
+    in distributed matching (see merge_location_candidates).
+
+    Args:
+        student: Student profile dictionary
+        mentors: Roster reference or list of mentor profile dictionaries
+        start: Index of the shard's first mentor in the roster
+        end: Index after the shard's last mentor
+        top_k: Number of top matches whose ordering must be exact
+
+    Returns:
+        MatchingScorer.location_bounds of the shard, plus "postcodes" mapping each
+        candidate mentor id -> postcode
+    """
+    try:
+        shard = resolve_roster(mentors, start, end)
+        summary = MatchingScorer().location_bounds(student, shard, top_k)
+
+        candidate_ids = {mentor_id for mentor_id, _ in summary['candidates']}
+        summary['postcodes'] = {m['id']: m['postcode'] for m in shard if m['id'] in candidate_ids}
+
+        activity.logger.info(f"Mentors {start}-{end}: {len(candidate_ids)} location candidates")
+        return summary
+
+    except Exception as e:
+        activity.logger.error(f"Error in select_shard_location_postcodes: {str(e)}")
+        raise
+
+
+def location_postcodes(
     student: Dict[str, Any],
     mentors: List[Dict[str, Any]],
-    coordinates: Dict[str, Tuple[float, float]]
+    candidate_ids: List[str]
+) -> Dict[str, str]:
+    """Postcodes of the student and the candidate mentors (empty when there are no candidates)."""
+    if not candidate_ids:
+        return {}
+    
+    candidate_ids = set(candidate_ids)
+    postcodes = {'student': student['postcode']}
+    for mentor in mentors:
+        if mentor['id'] in candidate_ids:
+            postcodes[mentor['id']] = mentor['postcode']
+    return postcodes
+
+
+@activity.defn
+async def lookup_cached_coordinates(postcodes: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Resolve postcodes from this worker's geocoding cache without calling the API.
+    Run as a local activity by LowLatencyMatchingWorkflow.
+
+    Args:
+        postcodes: Dict mapping person_id -> postcode
+
+    Returns:
+        {"coordinates": {person_id: (lat, lng)}, "missing": [person_id, ...]} where
+        missing lists the person_ids whose postcode still needs geocode_postcodes
+    """
+    coordinates, missing = resolve_cached_coordinates(postcodes, activity.logger)
+    return {"coordinates": coordinates, "missing": missing}
+
+
+def resolve_cached_coordinates(
+    postcodes: Dict[str, str],
+    logger=logger
+) -> Tuple[Dict[str, Tuple[float, float]], List[str]]:
+    """
+    Resolve postcodes from this process's geocoding cache, with geocode_postcodes' fallbacks.
+
+    Returns:
+        (coordinates, missing) where missing lists the person_ids whose postcode was never looked up
+    """
+    coordinates, missing = get_geocoding_service().lookup_cached(postcodes)
+
+    # Postcodes that failed to geocode before get the same fallbacks as in geocode_postcodes
+    for person_id, postcode in postcodes.items():
+        if person_id not in coordinates and person_id not in missing:
+            fallback_coords = get_fallback_coordinates(postcode)
+            if fallback_coords:
+                coordinates[person_id] = fallback_coords
+
+    logger.info(f"Geocoding cache lookup: {len(coordinates)} resolved, {len(missing)} missing "
+                f"out of {len(postcodes)} postcodes")
+    return coordinates, missing
+
+
+@activity.defn
+async def refresh_geocode_cache() -> int:
+    """
+    Re-resolve the current mentor roster into the geocoding cache.
+    Run periodically by the geocode cache refresh schedule, which the workers only
+    create with a shared GEOCODE_CACHE_DB: otherwise it would refresh the process-local
+    cache of whichever worker picks the activity up.
+    
+    Returns:
+        Number of postcodes in the geocoding cache
+    """
+    return await warm_up_caches(get_mock_mentors(), activity.logger, refresh=True)
+
+
+async def warm_up_caches(mentors: List[Dict[str, Any]], logger=logger, refresh: bool = False) -> int:
+    """
+    Warm the geocoding cache and the scorer before serving traffic.
+    Helper function (not an activity) used at worker startup and by refresh_geocode_cache.
+    
+    Args:
+        mentors: Mentor roster whose postcodes should be resolved
+        logger: Logger for progress reporting
+        refresh: Re-resolve postcodes that are already cached (see GeocodingService.warm_cache)
+        
+    Returns:
+        Number of postcodes in the geocoding cache
+    """
+    start = time.monotonic()
+    
+    MatchingScorer.warm_up()
+    logger.info(f"Scorer warm-up completed in {time.monotonic() - start:.2f}s")
+    
+    postcodes = [str(mentor['postcode']) for mentor in mentors if mentor.get('postcode')]
+    logger.info(f"Warming geocoding cache for {len(set(postcodes))} distinct mentor postcodes")
+    
+    # Geocoding is blocking I/O, keep it off the event loop
+    cached = await asyncio.to_thread(get_geocoding_service().warm_cache, postcodes, refresh)
+    
+    logger.info(f"Cache warm-up completed in {time.monotonic() - start:.2f}s ({cached} postcodes cached)")
+    return cached
+
+
+@activity.defn
+async def calculate_mentor_matches(
+    student: Dict[str, Any],
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    coordinates: Dict[str, Tuple[float, float]],
+    settings: Optional[Dict[str, Any]] = None
 ) -> List[Dict[str, Any]]:
     """
     Calculate matching scores between a student and mentors.
 
     Args:
         student: Student profile dictionary
-        mentors: List of mentor profile dictionaries
+        mentors: Roster reference or list of mentor profile dictionaries
         coordinates: Dict mapping person_id -> (lat, lng)
+        settings: The request's matching settings (the worker's configuration when omitted)
 
     Returns:
         List of matches with mentor_id, score, and reasoning, sorted by score descending
     """
-    activity.logger.info(f"Calculating matches for student against {len(mentors)} mentors")
-
     try:
-        scorer = MatchingScorer()
-        matches = scorer.calculate_matches(student, mentors, coordinates)
+        mentors = resolve_roster(mentors)
+        activity.logger.info(f"Calculating matches for student against {len(mentors)} mentors")
+
+        scorer = MatchingScorer(distance_table=get_distance_table())
+        matches = score_with_template_reasoning(scorer, student, mentors, coordinates)
 
         activity.logger.info(f"Generated {len(matches)} matches with scores > 0")
 
-        # Generate unique reasoning for TOP 10 matches only (to avoid timeouts)
-        top_matches = matches[:10]
-        activity.logger.info(f"Generating personalized reasoning for top {len(top_matches)} matches...")
-
-        for match in top_matches:
-            # Find the mentor details
-            mentor = next((m for m in mentors if m['id'] == match['mentor_id']), None)
-            if mentor:
-                try:
-                    # Generate personalized reasoning using LLM
-                    reasoning = await generate_match_reasoning(student, mentor, match['score'], activity.logger)
-                    match['reasoning'] = reasoning
-                except Exception as e:
-                    activity.logger.error(f"Error generating reasoning for {mentor.get('id')}: {str(e)}")
-                    # Fallback to generic reasoning if LLM fails
-                    match['reasoning'] = f"{match['score']}% match based on compatible interests and goals."
-            else:
-                match['reasoning'] = "Good compatibility match."
-
-        # Add generic reasoning for remaining matches
-        for match in matches[10:]:
-            match['reasoning'] = f"{match['score']}% compatibility based on shared interests and goals."
-
-        activity.logger.info(f"Generated personalized reasoning for {len(top_matches)} matches, generic for {len(matches) - len(top_matches)}")
+        await personalize_reasoning(scorer, student, matches, {m['id']: m for m in mentors}, coordinates,
+                                    activity.logger, settings=settings)
         return matches
 
     except Exception as e:
@@ -206,12 +563,410 @@ async def calculate_mentor_matches(
 
 
 @activity.defn
-async def validate_matching_data(data: Dict[str, Any]) -> bool:
+async def score_mentor_shard(
+    student: Dict[str, Any],
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    coordinates: Dict[str, Tuple[float, float]],
+    start: int,
+    end: int,
+    limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Score one shard of a roster for distributed matching.
+
+    Args:
+        student: Student profile dictionary
+        mentors: Roster reference or list of mentor profile dictionaries
+        coordinates: Dict mapping person_id -> (lat, lng)
+        start: Index of the shard's first mentor in the roster
+        end: Index after the shard's last mentor
+        limit: Maximum number of matches to return (0 for all)
+
+    Returns:
+        The shard's best matches with template reasoning, sorted by score descending
+    """
+    try:
+        shard = resolve_roster(mentors, start, end)
+        scorer = MatchingScorer(distance_table=get_distance_table())
+        matches = scorer.calculate_matches(student, shard, coordinates)
+        if limit:
+            matches = matches[:limit]
+        add_template_reasoning(scorer, student, matches, {m['id']: m for m in shard}, coordinates)
+
+        activity.logger.info(f"Scored mentors {start}-{end}: {len(matches)} matches returned")
+        return matches
+
+    except Exception as e:
+        activity.logger.error(f"Error in score_mentor_shard: {str(e)}")
+        raise
+
+
+@activity.defn
+async def add_match_reasoning(
+    student: Dict[str, Any],
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    coordinates: Dict[str, Tuple[float, float]],
+    matches: List[Dict[str, Any]],
+    settings: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Add snippet or LLM reasoning to merged matches from distributed scoring.
+
+    Args:
+        student: Student profile dictionary
+        mentors: Roster reference or list of mentor profile dictionaries
+        coordinates: Dict mapping person_id -> (lat, lng)
+        matches: Matches with template reasoning, sorted by score descending
+        settings: The request's matching settings (the worker's configuration when omitted)
+
+    Returns:
+        The matches with personalized reasoning for the top matches
+    """
+    try:
+        matched_ids = {match['mentor_id'] for match in matches}
+        mentors_by_id = {m['id']: m for m in resolve_roster(mentors) if m['id'] in matched_ids}
+        scorer = MatchingScorer(distance_table=get_distance_table())
+
+        await personalize_reasoning(scorer, student, matches, mentors_by_id, coordinates, activity.logger,
+                                    settings=settings)
+        return matches
+
+    except Exception as e:
+        activity.logger.error(f"Error in add_match_reasoning: {str(e)}")
+        raise
+
+
+@activity.defn
+async def score_location_independent(
+    student: Dict[str, Any],
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    settings: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Score every component except distance, so scoring can start before geocoding finishes.
+
+    Args:
+        student: Student profile dictionary
+        mentors: Roster reference or list of mentor profile dictionaries
+        settings: The request's matching settings (the worker's configuration when omitted)
+
+    Returns:
+        {"postcodes": {person_id: postcode}, "settled": [{"mentor_id": str, "score": int}, ...]}
+        where postcodes are the ones worth geocoding (as select_location_postcodes) and
+        settled lists the top matches whose final score and top-K membership coordinates
+        cannot change. The base scores stay in the worker, so the result (and the workflow
+        history) only grows with the candidates rather than the roster.
+    """
+    try:
+        mentors = resolve_roster(mentors)
+        scorer = MatchingScorer(distance_table=get_distance_table())
+        base_scores = scorer.calculate_base_scores(student, mentors)
+
+        top_k = resolve_settings(settings)['top_k']
+        candidate_ids = scorer.select_location_candidates(student, mentors, top_k, base_scores)
+        settled = scorer.settled_top_matches(student, mentors, top_k, base_scores)
+
+        activity.logger.info(f"Scored {len(base_scores)} of {len(mentors)} mentors without location: "
+                             f"{len(candidate_ids)} need coordinates, {len(settled)} top matches settled")
+        return {
+            "postcodes": location_postcodes(student, mentors, candidate_ids),
+            "settled": settled
+        }
+
+    except Exception as e:
+        activity.logger.error(f"Error in score_location_independent: {str(e)}")
+        raise
+
+
+@activity.defn
+async def reason_settled_matches(
+    student: Dict[str, Any],
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    settled: List[Dict[str, Any]],
+    settings: Optional[Dict[str, Any]] = None
+) -> Dict[str, str]:
+    """
+    Generate LLM reasoning for settled top matches while the rest of the roster is geocoded.
+
+    Args:
+        student: Student profile dictionary
+        mentors: Roster reference or list of mentor profile dictionaries
+        settled: Settled matches from score_location_independent
+        settings: The request's matching settings (the worker's configuration when omitted)
+
+    Returns:
+        Dict mapping mentor_id -> reasoning (empty when reasoning is shed)
+    """
+    try:
+        settings = resolve_settings(settings)
+        if settings['reasoning_mode'] in ('template', 'snippets') or reasoning_overloaded():
+            return {}
+
+        settled_ids = {match['mentor_id'] for match in settled}
+        mentors_by_id = {m['id']: m for m in resolve_roster(mentors) if m['id'] in settled_ids}
+        matches = [dict(match) for match in settled]
+
+        # Location is irrelevant for settled pairs, so their template reasoning needs no coordinates
+        scorer = MatchingScorer(distance_table=get_distance_table())
+        add_template_reasoning(scorer, student, matches, mentors_by_id, {})
+        await add_llm_reasoning(student, matches, mentors_by_id, activity.logger, settings['reasoning_mode'])
+
+        activity.logger.info(f"Generated reasoning for {len(matches)} settled matches")
+        return {match['mentor_id']: match['reasoning'] for match in matches}
+
+    except Exception as e:
+        activity.logger.error(f"Error in reason_settled_matches: {str(e)}")
+        raise
+
+
+@activity.defn
+async def combine_mentor_matches(
+    student: Dict[str, Any],
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    coordinates: Dict[str, Tuple[float, float]],
+    reasoned: Dict[str, str],
+    settings: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Score the roster with the geocoded coordinates and finish the reasoning.
+
+    Args:
+        student: Student profile dictionary
+        mentors: Roster reference or list of mentor profile dictionaries
+        coordinates: Dict mapping person_id -> (lat, lng)
+        reasoned: Reasoning already generated by reason_settled_matches
+        settings: The request's matching settings (the worker's configuration when omitted)
+
+    Returns:
+        The same matches as calculate_mentor_matches, sorted by score descending
+    """
+    try:
+        mentors = resolve_roster(mentors)
+        mentors_by_id = {m['id']: m for m in mentors}
+        scorer = MatchingScorer(distance_table=get_distance_table())
+
+        # Recomputing the base scores is cheaper than carrying them through the workflow history
+        matches = scorer.calculate_matches(student, mentors, coordinates)
+        add_template_reasoning(scorer, student, matches, mentors_by_id, coordinates)
+
+        await personalize_reasoning(scorer, student, matches, mentors_by_id, coordinates, activity.logger,
+                                    reasoned=reasoned, settings=settings)
+        return matches
+
+    except Exception as e:
+        activity.logger.error(f"Error in combine_mentor_matches: {str(e)}")
+        raise
+
+
+async def match_in_process(
+    student: Dict[str, Any],
+    mentors: List[Dict[str, Any]],
+    logger=logger
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Run a whole match in the calling process: validation, cached geocoding and scoring.
+    Helper function (not an activity) used by the API to skip Temporal for small rosters;
+    the matches are the same as the matching workflows return.
+
+    Args:
+        student: Student profile dictionary
+        mentors: List of mentor profile dictionaries
+        logger: Logger for progress reporting
+
+    Returns:
+        Matches as returned by calculate_mentor_matches, or None when postcodes are missing
+        from this process's geocoding cache and the match needs the durable workflow
+
+    Raises:
+        ValueError: If validation fails
+    """
+    is_valid, error_message = validate_matching_input({'student': student, 'mentors': mentors})
+    if not is_valid:
+        raise ValueError(error_message)
+
+    scorer = MatchingScorer(distance_table=get_distance_table())
+    base_scores = scorer.calculate_base_scores(student, mentors)
+    candidate_ids = scorer.select_location_candidates(student, mentors, Config.MATCHING_TOP_K, base_scores)
+
+    postcodes = location_postcodes(student, mentors, candidate_ids)
+    coordinates, missing = resolve_cached_coordinates(postcodes, logger)
+    if missing:
+        # Geocoding API calls belong in the workflow's retried activity, which also
+        # fills the shared cache (GEOCODE_CACHE_DB) for the next match in process
+        return None
+
+    matches = scorer.combine_scores(student, mentors, base_scores, coordinates)
+    mentors_by_id = {m['id']: m for m in mentors}
+    add_template_reasoning(scorer, student, matches, mentors_by_id, coordinates)
+
+    await personalize_reasoning(scorer, student, matches, mentors_by_id, coordinates, logger)
+    return matches
+
+
+def score_with_template_reasoning(
+    scorer: MatchingScorer,
+    student: Dict[str, Any],
+    mentors: List[Dict[str, Any]],
+    coordinates: Dict[str, Tuple[float, float]]
+) -> List[Dict[str, Any]]:
+    """Score every mentor and give each match deterministic template reasoning."""
+    matches = scorer.calculate_matches(student, mentors, coordinates)
+    add_template_reasoning(scorer, student, matches, {m['id']: m for m in mentors}, coordinates)
+    return matches
+
+
+def add_template_reasoning(
+    scorer: MatchingScorer,
+    student: Dict[str, Any],
+    matches: List[Dict[str, Any]],
+    mentors_by_id: Dict[str, Dict[str, Any]],
+    coordinates: Dict[str, Tuple[float, float]]
+) -> None:
+    """Deterministic template reasoning for every match; LLM reasoning replaces it for the top matches."""
+    for match in matches:
+        mentor = mentors_by_id.get(match['mentor_id'])
+        match['reasoning'] = (build_template_reasoning(scorer, student, mentor, match['score'], coordinates)
+                              if mentor else "Good compatibility match.")
+
+
+async def personalize_reasoning(
+    scorer: MatchingScorer,
+    student: Dict[str, Any],
+    matches: List[Dict[str, Any]],
+    mentors_by_id: Dict[str, Dict[str, Any]],
+    coordinates: Dict[str, Tuple[float, float]],
+    logger=logger,
+    reasoned: Optional[Dict[str, str]] = None,
+    settings: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Replace template reasoning according to the reasoning mode in `settings`: precomputed
+    snippets for every match, or LLM reasoning for the top matches unless reasoning is shed.
+    Top matches found in `reasoned` (mentor_id -> reasoning generated earlier) reuse it.
+    """
+    settings = resolve_settings(settings)
+
+    # Precomputed mentor snippets plus student evidence - no LLM calls at request time
+    if settings['reasoning_mode'] == 'snippets':
+        with_snippets = add_snippet_reasoning(scorer, student, matches, mentors_by_id, coordinates)
+        logger.info(f"Used precomputed snippets for {with_snippets} of {len(matches)} matches")
+        record_llm_outcome('fallback', 'mentor_snippet', len(matches) - with_snippets)
+        return
+
+    # Generate unique reasoning for the top matches only (to avoid timeouts)
+    top_k = settings['top_k']
+    if settings['reasoning_mode'] == 'template' or reasoning_overloaded():
+        logger.info(f"Shedding LLM reasoning ({_reasoning_in_flight} in flight), using templates")
+        top_k = 0
+    
+    # Reuse reasoning generated for settled matches while the roster was still being geocoded
+    reasoned = reasoned or {}
+    early_matches = [match for match in matches[:settings['top_k']] if match['mentor_id'] in reasoned]
+    for match in early_matches:
+        match['reasoning'] = reasoned[match['mentor_id']]
+    top_matches = [match for match in matches[:top_k] if match['mentor_id'] not in reasoned]
+    logger.info(f"Generating personalized reasoning for top {len(top_matches)} matches...")
+
+    await add_llm_reasoning(student, top_matches, mentors_by_id, logger, settings['reasoning_mode'])
+
+    personalized = len(early_matches) + len(top_matches)
+    logger.info(f"Generated personalized reasoning for {personalized} matches, template for {len(matches) - personalized}")
+    logger.info(f"Reasoning cache stats: {reasoning_cache.stats()}")
+    logger.info(f"LLM client stats: {get_llm_client_stats()}, scheduler: {get_llm_scheduler().stats()}")
+    logger.info(f"LLM latency: {metrics.histogram('llm_latency_seconds', activity='calculate_mentor_matches')}")
+
+
+def build_template_reasoning(
+    scorer: MatchingScorer,
+    student: Dict[str, Any],
+    mentor: Dict[str, Any],
+    score: int,
+    coordinates: Dict[str, Tuple[float, float]]
+) -> str:
+    """Build deterministic reasoning for a match from its score evidence (no LLM call)."""
+    evidence = scorer.explain(student, mentor, coordinates.get('student'), coordinates.get(mentor['id']))
+    return template_reasoning(mentor, score, evidence)
+
+
+def add_snippet_reasoning(
+    scorer: MatchingScorer,
+    student: Dict[str, Any],
+    matches: List[Dict[str, Any]],
+    mentors_by_id: Dict[str, Dict[str, Any]],
+    coordinates: Dict[str, Tuple[float, float]]
+) -> int:
+    """
+    Replace template reasoning with the mentor's precomputed snippet combined with student evidence.
+    Matches whose mentor has no snippet for the current revision keep their template reasoning.
+
+    Returns:
+        Number of matches that used a snippet
+    """
+    used = 0
+    for match in matches:
+        mentor = mentors_by_id.get(match['mentor_id'])
+        if not mentor:
+            continue
+        snippet = mentor_snippet_cache.get(mentor_snippet_key(mentor))
+        if snippet is None:
+            continue
+        evidence = scorer.explain(student, mentor, coordinates.get('student'), coordinates.get(mentor['id']))
+        match['reasoning'] = snippet_reasoning(mentor, evidence, snippet)
+        used += 1
+    return used
+
+
+def resolve_settings(settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The matching settings an activity was called with, or the worker's configuration for
+    callers that pass none. Workflows pass the request's settings, so every activity of a
+    request reasons and selects candidates the way the process that started it decided.
+    """
+    if settings is not None:
+        return settings
+    return {'reasoning_mode': Config.REASONING_MODE, 'top_k': Config.MATCHING_TOP_K}
+
+
+def reasoning_overloaded() -> bool:
+    """Check whether LLM reasoning should be shed because too many matches are already generating it."""
+    return 0 < Config.REASONING_SHED_IN_FLIGHT <= _reasoning_in_flight
+
+
+async def add_llm_reasoning(
+    student: Dict[str, Any],
+    matches: List[Dict[str, Any]],
+    mentors_by_id: Dict[str, Dict[str, Any]],
+    logger=logger,
+    reasoning_mode: Optional[str] = None
+) -> None:
+    """
+    Replace the reasoning of the given matches with LLM reasoning, tracking in-flight work.
+    One batched call is used when reasoning_mode (REASONING_MODE by default) is 'batched'.
+    """
+    global _reasoning_in_flight
+
+    if not matches:
+        return
+
+    _reasoning_in_flight += 1
+    try:
+        if (reasoning_mode or Config.REASONING_MODE) == 'batched':
+            await add_batched_reasoning(student, matches, mentors_by_id, logger)
+        else:
+            await add_per_mentor_reasoning(student, matches, mentors_by_id, logger)
+    finally:
+        _reasoning_in_flight -= 1
+
+
+@activity.defn
+async def validate_matching_data(data: Dict[str, Any], start: int = 0, end: Optional[int] = None) -> bool:
     """
     Validate the matching request data.
     
     Args:
-        data: The matching request data
+        data: The matching request data, with a 'roster' reference or inline 'mentors'
+        start: Index of the first mentor to validate, when validating one shard of a roster
+        end: Index after the last mentor to validate (None for the end of the roster)
         
     Returns:
         True if valid
@@ -222,7 +977,15 @@ async def validate_matching_data(data: Dict[str, Any]) -> bool:
     activity.logger.info("Validating matching request data")
     
     try:
-        is_valid, error_message = validate_matching_input(data)
+        if 'roster' in data:
+            try:
+                data = {**data, 'mentors': resolve_roster(data['roster'], start, end)}
+            except RosterNotFoundError as e:
+                raise ValueError(str(e))
+        elif (start, end) != (0, None) and isinstance(data.get('mentors'), list):
+            data = {**data, 'mentors': data['mentors'][start:end]}
+        
+        is_valid, error_message = validate_matching_input(data, first_index=start)
         
         if not is_valid:
             activity.logger.error(f"Validation failed: {error_message}")
@@ -236,6 +999,147 @@ async def validate_matching_data(data: Dict[str, Any]) -> bool:
         raise
 
 
+async def add_per_mentor_reasoning(
+    student: Dict[str, Any],
+    matches: List[Dict[str, Any]],
+    mentors_by_id: Dict[str, Dict[str, Any]],
+    logger=logger
+) -> None:
+    """
+    Fill in match['reasoning'] with one concurrent LLM call per match.
+    Concurrency is capped by REASONING_CONCURRENCY and each call by REASONING_TIMEOUT_SECONDS.
+    Matches keep their existing (template) reasoning if the call fails.
+    """
+    semaphore = asyncio.Semaphore(Config.REASONING_CONCURRENCY)
+
+    async def add_reasoning(match: Dict[str, Any]) -> None:
+        # Find the mentor details
+        mentor = mentors_by_id.get(match['mentor_id'])
+        if mentor:
+            try:
+                # Generate personalized reasoning using LLM, bounded by the concurrency cap
+                async with semaphore:
+                    match['reasoning'] = await asyncio.wait_for(
+                        generate_match_reasoning(student, mentor, match['score'], logger),
+                        timeout=Config.REASONING_TIMEOUT_SECONDS
+                    )
+            except Exception as e:
+                logger.error(f"Error generating reasoning for {mentor.get('id')}: {str(e) or type(e).__name__}")
+                # Fallback to template or generic reasoning if LLM fails
+                match.setdefault('reasoning', _generic_reasoning(match['score']))
+                record_llm_outcome('fallback', 'match_reasoning')
+        else:
+            match['reasoning'] = "Good compatibility match."
+
+    # Fan out concurrently; each task fills in its own match so order is preserved
+    await asyncio.gather(*(add_reasoning(match) for match in matches))
+
+
+async def add_batched_reasoning(
+    student: Dict[str, Any],
+    matches: List[Dict[str, Any]],
+    mentors_by_id: Dict[str, Dict[str, Any]],
+    logger=logger
+) -> None:
+    """
+    Fill in match['reasoning'] for all matches with a single LLM call.
+    Matches missing from a malformed or failed response keep their existing (template)
+    reasoning, or get the generic fallback.
+    """
+    reasonings: Dict[str, str] = {}
+    pairs = []
+    for match in matches:
+        mentor = mentors_by_id.get(match['mentor_id'])
+        if not mentor:
+            continue
+        cached = reasoning_cache.get(_reasoning_cache_key(student, mentor, match['score']))
+        if cached is not None:
+            reasonings[mentor['id']] = cached
+        else:
+            pairs.append((mentor, match['score']))
+
+    if pairs:
+        try:
+            generated = await asyncio.wait_for(
+                generate_batch_match_reasoning(student, pairs, logger),
+                timeout=Config.REASONING_BATCH_TIMEOUT_SECONDS
+            )
+            for mentor, score in pairs:
+                if mentor['id'] in generated:
+                    reasoning_cache.set(_reasoning_cache_key(student, mentor, score), generated[mentor['id']])
+            reasonings.update(generated)
+            record_llm_outcome('parse_failure', 'batch_match_reasoning', len(pairs) - len(generated))
+        except Exception as e:
+            logger.error(f"Error generating batched reasoning: {str(e) or type(e).__name__}")
+        record_llm_outcome('fallback', 'batch_match_reasoning',
+                           sum(1 for mentor, _ in pairs if mentor['id'] not in reasonings))
+
+    for match in matches:
+        if match['mentor_id'] not in mentors_by_id:
+            match['reasoning'] = "Good compatibility match."
+        else:
+            match['reasoning'] = (reasonings.get(match['mentor_id']) or match.get('reasoning')
+                                  or _generic_reasoning(match['score']))
+
+
+def _generic_reasoning(score: int) -> str:
+    """Generic reasoning used when personalized reasoning is unavailable."""
+    return f"{score}% match based on compatible interests and goals."
+
+
+def _reasoning_cache_key(student: Dict[str, Any], mentor: Dict[str, Any], score: int) -> str:
+    """
+    Build the reasoning cache key from everything the prompt depends on:
+    the student fields used in the prompt, the mentor id and version, and the score.
+    """
+    student_fields = {field: student.get(field) for field in ('goals', 'bio', 'interests', 'subjects')}
+    payload = json.dumps([student_fields, mentor.get('id'), mentor_revision(mentor), score], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def mentor_revision(mentor: Dict[str, Any]) -> str:
+    """
+    The mentor's profile revision: the explicit 'version' field if present, otherwise
+    a hash of the profile fields used in reasoning prompts.
+    """
+    if mentor.get('version') is not None:
+        return str(mentor['version'])
+    return hashlib.sha256(json.dumps(
+        {field: mentor.get(field) for field in ('first_name', 'last_name', 'role', 'bio', 'skills', 'interests')},
+        sort_keys=True
+    ).encode()).hexdigest()[:16]
+
+
+def _build_student_description(student: Dict[str, Any]) -> str:
+    """Build the student context used in reasoning prompts."""
+    student_context = []
+    if student.get('goals'):
+        student_context.append(f"Goals: {student['goals']}")
+    if student.get('bio'):
+        student_context.append(f"About: {student['bio']}")
+    if student.get('interests'):
+        student_context.append(f"Interests: {', '.join(student['interests'])}")
+    if student.get('subjects'):
+        student_context.append(f"Favorite subjects: {', '.join(student['subjects'])}")
+    
+    return "\n".join(student_context) if student_context else "Student seeking mentorship"
+
+
+def _build_mentor_description(mentor: Dict[str, Any]) -> str:
+    """Build the mentor context used in reasoning prompts."""
+    mentor_name = f"{mentor.get('first_name', '')} {mentor.get('last_name', '')}".strip()
+    mentor_role = mentor.get('role', 'Professional')
+    mentor_bio = mentor.get('bio', '')
+    mentor_skills = ', '.join(mentor.get('skills', []))
+    mentor_interests = ', '.join(mentor.get('interests', []))
+    
+    return f"""Name: {mentor_name}
+Role: {mentor_role}
+Bio: {mentor_bio}
+Skills: {mentor_skills}
+Interests: {mentor_interests}"""
+
+
 async def generate_match_reasoning(
     student: Dict[str, Any],
     mentor: Dict[str, Any],
@@ -254,51 +1158,31 @@ async def generate_match_reasoning(
 
     Returns:
         A 1-2 sentence natural language explanation of the match
+
+    Raises:
+        Exception: If the LLM call fails (the caller keeps its template reasoning)
     """
+    cache_key = _reasoning_cache_key(student, mentor, score)
+    cached = reasoning_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     if logger:
         logger.info(f"Generating match reasoning for student-mentor pair (score: {score})")
     else:
         print(f"Generating match reasoning for student-mentor pair (score: {score})")
     
-    try:
-        # Initialize OpenAI client with OpenRouter
-        client = OpenAI(
-            base_url=Config.OPENROUTER_BASE_URL,
-            api_key=Config.OPENROUTER_API_KEY
-        )
-        
-        # Build student context
-        student_context = []
-        if student.get('goals'):
-            student_context.append(f"Goals: {student['goals']}")
-        if student.get('bio'):
-            student_context.append(f"About: {student['bio']}")
-        if student.get('interests'):
-            student_context.append(f"Interests: {', '.join(student['interests'])}")
-        if student.get('subjects'):
-            student_context.append(f"Favorite subjects: {', '.join(student['subjects'])}")
-        
-        student_desc = "\n".join(student_context) if student_context else "Student seeking mentorship"
-        
-        # Build mentor context
-        mentor_name = f"{mentor.get('first_name', '')} {mentor.get('last_name', '')}".strip()
-        mentor_role = mentor.get('role', 'Professional')
-        mentor_bio = mentor.get('bio', '')
-        mentor_skills = ', '.join(mentor.get('skills', []))
-        mentor_interests = ', '.join(mentor.get('interests', []))
-        
-        # Create the prompt
-        prompt = f"""You are an expert career counselor and mentorship matcher. Generate a compelling, personalized 1-2 sentence explanation for why this mentor is a great match for this student.
+    student_desc = _build_student_description(student)
+    mentor_desc = _build_mentor_description(mentor)
+    
+    # Create the prompt
+    prompt = f"""You are an expert career counselor and mentorship matcher. Generate a compelling, personalized 1-2 sentence explanation for why this mentor is a great match for this student.
 
 STUDENT PROFILE:
 {student_desc}
 
 MENTOR PROFILE:
-Name: {mentor_name}
-Role: {mentor_role}
-Bio: {mentor_bio}
-Skills: {mentor_skills}
-Interests: {mentor_interests}
+{mentor_desc}
 
 Match Score: {score}/100
 
@@ -312,32 +1196,284 @@ If the student is uncertain about their goals but has interests, emphasize how t
 
 Respond with ONLY the 1-2 sentence explanation, nothing else."""
 
-        # Make API call to OpenRouter
-        if logger:
-            logger.info(f"Calling OpenRouter API for match reasoning")
-
-        response = client.chat.completions.create(
-            model=Config.LLM_MODEL,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,  # Slightly creative for personalized responses
-            max_tokens=150
-        )
+    # Make API call to OpenRouter
+    if logger:
+        logger.info(f"Calling OpenRouter API for match reasoning")
+
+    response = await chat_completion(
+        'match_reasoning',
+        deadline_seconds=Config.REASONING_TIMEOUT_SECONDS,
+        model=Config.LLM_MODEL,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.7,  # Slightly creative for personalized responses
+        max_tokens=150
+    )
+
+    # Extract the response
+    reasoning = (response.choices[0].message.content or '').strip()
+    if not reasoning:
+        raise ValueError("Empty match reasoning response")
+    if logger:
+        logger.info(f"Generated reasoning: {reasoning}")
+
+    reasoning_cache.set(cache_key, reasoning)
+    return reasoning
+
+
+async def generate_batch_match_reasoning(
+    student: Dict[str, Any],
+    mentor_scores: List[Tuple[Dict[str, Any], int]],
+    logger=None
+) -> Dict[str, str]:
+    """
+    Use a single LLM call to generate reasoning for several mentors at once.
+    The student context is sent once, followed by a summary of every mentor.
+
+    Args:
+        student: Student profile dictionary
+        mentor_scores: List of (mentor profile, match score) pairs
+        logger: Optional logger instance
+
+    Returns:
+        Dict mapping mentor_id -> reasoning for every valid item in the response
+        (missing mentors should get a per-item fallback from the caller)
+    """
+    if logger:
+        logger.info(f"Generating batched match reasoning for {len(mentor_scores)} mentors")
+
+    mentor_blocks = "\n\n".join(
+        f"Mentor ID: {mentor['id']}\n{_build_mentor_description(mentor)}\nMatch Score: {score}/100"
+        for mentor, score in mentor_scores
+    )
+
+    prompt = f"""You are an expert career counselor and mentorship matcher. For EACH mentor below, generate a compelling, personalized 1-2 sentence explanation for why that mentor is a great match for this student.
+
+STUDENT PROFILE:
+{_build_student_description(student)}
+
+MENTORS:
+{mentor_blocks}
+
+Based on the student's goals, interests, and each mentor's experience, write a natural, engaging 1-2 sentence explanation of why they're compatible. Focus on:
+- Shared interests or passions
+- How the mentor's expertise aligns with student's goals or curiosity
+- Specific connections between what the student wants to learn/explore and what the mentor offers
+- Use a warm, encouraging tone
+
+If the student is uncertain about their goals but has interests, emphasize how the mentor can help them explore those interests.
+
+Respond with ONLY a JSON array with one object per mentor. Example format:
+[{{"mentor_id": "mentor-1", "reasoning": "..."}}]
+
+Do not include any explanation, just the JSON array."""
+
+    response = await chat_completion(
+        'batch_match_reasoning',
+        deadline_seconds=Config.REASONING_BATCH_TIMEOUT_SECONDS,
+        model=Config.LLM_MODEL,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.7,  # Slightly creative for personalized responses
+        max_tokens=150 * len(mentor_scores)
+    )
+
+    result_text = response.choices[0].message.content.strip()
+    reasonings = parse_batch_reasoning(result_text, {mentor['id'] for mentor, _ in mentor_scores})
+
+    if logger:
+        logger.info(f"Parsed batched reasoning for {len(reasonings)} of {len(mentor_scores)} mentors")
+
+    return reasonings
+
+
+def parse_batch_reasoning(result_text: str, mentor_ids: Set[str]) -> Dict[str, str]:
+    """
+    Parse and validate a batched reasoning response.
+
+    Args:
+        result_text: Raw LLM response, expected to be a JSON array
+        mentor_ids: Mentor ids that were requested
+
+    Returns:
+        Dict mapping mentor_id -> reasoning for every well-formed item
+    """
+    # Tolerate surrounding text such as markdown code fences
+    start, end = result_text.find('['), result_text.rfind(']')
+    if start == -1 or end < start:
+        return {}
+
+    try:
+        items = json.loads(result_text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    if not isinstance(items, list):
+        return {}
+
+    reasonings = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        mentor_id = item.get('mentor_id')
+        reasoning = item.get('reasoning')
+        if mentor_id in mentor_ids and isinstance(reasoning, str) and reasoning.strip():
+            reasonings[mentor_id] = reasoning.strip()
+
+    return reasonings
+
 
-        # Extract the response
-        reasoning = response.choices[0].message.content.strip()
-        if logger:
-            logger.info(f"Generated reasoning: {reasoning}")
+def mentor_snippet_key(mentor: Dict[str, Any]) -> str:
+    """Cache key for a mentor's snippet: mentor id, profile revision and model."""
+    return f"{mentor.get('id')}:{mentor_revision(mentor)}:{Config.LLM_MODEL}"
 
-        return reasoning
 
+@activity.defn
+async def refresh_mentor_snippets(mentors: Optional[Union[RosterRef, List[Dict[str, Any]]]] = None) -> int:
+    """
+    Generate reasoning snippets for every mentor whose current revision has none yet.
+    Run in the background by the snippet refresh schedule and after matching requests.
+    
+    Args:
+        mentors: Roster reference or mentor list (defaults to the built-in roster)
+        
+    Returns:
+        Number of snippets generated
+    """
+    roster = resolve_roster(mentors) if mentors is not None else get_mock_mentors()
+    activity.logger.info(f"Refreshing reasoning snippets for {len(roster)} mentors")
+    
+    try:
+        generated = await generate_mentor_snippets(roster, activity.logger)
+        activity.logger.info(f"Generated {generated} snippets, cache stats: {mentor_snippet_cache.stats()}")
+        return generated
+        
     except Exception as e:
-        if logger:
-            logger.error(f"Error in generate_match_reasoning: {str(e)}")
-        # Return a fallback message if LLM fails
-        mentor_skills = ', '.join(mentor.get('skills', [])[:2])
-        return f"Specializes in {mentor_skills if mentor_skills else mentor.get('bio', 'their field')[:50]}."
+        activity.logger.error(f"Error in refresh_mentor_snippets: {str(e)}")
+        raise
+
+
+async def generate_mentor_snippets(mentors: List[Dict[str, Any]], logger=logger) -> int:
+    """
+    Call the LLM once per mentor revision that has no cached snippet.
+    Concurrency is capped by REASONING_CONCURRENCY.
+    
+    Returns:
+        Number of snippets generated
+    """
+    missing = {}
+    for mentor in mentors:
+        key = mentor_snippet_key(mentor)
+        if key not in missing and mentor_snippet_cache.get(key) is None:
+            missing[key] = mentor
+    
+    semaphore = asyncio.Semaphore(Config.REASONING_CONCURRENCY)
+    
+    async def generate(key: str, mentor: Dict[str, Any]) -> bool:
+        try:
+            async with semaphore:
+                snippet = await asyncio.wait_for(
+                    generate_mentor_snippet(mentor, logger),
+                    timeout=Config.REASONING_TIMEOUT_SECONDS
+                )
+        except Exception as e:
+            logger.error(f"Error generating snippet for {mentor.get('id')}: {str(e) or type(e).__name__}")
+            return False
+        
+        if snippet is None:
+            return False
+        mentor_snippet_cache.set(key, snippet)
+        return True
+    
+    results = await asyncio.gather(*(generate(key, mentor) for key, mentor in missing.items()))
+    return sum(results)
+
+
+async def generate_mentor_snippet(mentor: Dict[str, Any], logger=logger) -> Optional[Dict[str, str]]:
+    """
+    Use the LLM to write reusable, student-independent reasoning fragments for a mentor.
+    
+    Args:
+        mentor: Mentor profile dictionary
+        logger: Logger instance
+        
+    Returns:
+        Dict with 'summary' and 'offer', or None if the response was malformed
+    """
+    first_name = mentor.get('first_name') or 'This mentor'
+    
+    prompt = f"""You are an expert career counselor writing reusable text for mentorship match explanations.
+
+MENTOR PROFILE:
+{_build_mentor_description(mentor)}
+
+Write two fragments about this mentor that will be shown to many different students:
+- "summary": one warm sentence in the third person about {first_name}'s background and strengths, starting with "{first_name}"
+- "offer": a short phrase that completes "{first_name} can help you ..." (no trailing period)
+
+Do not mention any particular student.
+
+Respond with ONLY a JSON object. Example format:
+{{"summary": "{first_name} is ...", "offer": "explore ..."}}"""
+
+    response = await chat_completion(
+        'mentor_snippet',
+        priority=BATCH,
+        deadline_seconds=Config.REASONING_TIMEOUT_SECONDS,
+        model=Config.LLM_MODEL,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.7,
+        max_tokens=200
+    )
+    
+    result_text = response.choices[0].message.content.strip()
+    snippet = parse_mentor_snippet(result_text)
+    if snippet is None:
+        logger.error(f"Malformed snippet for {mentor.get('id')}: {result_text}")
+        record_llm_outcome('parse_failure', 'mentor_snippet')
+    return snippet
+
+
+def parse_mentor_snippet(result_text: str) -> Optional[Dict[str, str]]:
+    """
+    Parse and validate a snippet response.
+    
+    Returns:
+        Dict with a 'summary' sentence and an 'offer' phrase, or None if malformed
+    """
+    # Tolerate surrounding text such as markdown code fences
+    start, end = result_text.find('{'), result_text.rfind('}')
+    if start == -1 or end < start:
+        return None
+    
+    try:
+        item = json.loads(result_text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    
+    if not isinstance(item, dict):
+        return None
+    
+    summary, offer = item.get('summary'), item.get('offer')
+    if not isinstance(summary, str) or not isinstance(offer, str) or not summary.strip() or not offer.strip():
+        return None
+    
+    summary = summary.strip()
+    offer = offer.strip().rstrip('.')
+    return {
+        'summary': summary if summary.endswith(('.', '!')) else f"{summary}.",
+        'offer': offer[0].lower() + offer[1:]
+    }
@@ -1,12 +1,25 @@
 from flask import Flask, request, jsonify, redirect
 from flask_cors import CORS
 import asyncio
+import hashlib
+import json
 import logging
+import time
+from collections import deque
 from datetime import datetime, timedelta
 from temporalio.client import Client
+from temporalio.common import WorkflowIDReusePolicy
+from temporalio.exceptions import WorkflowAlreadyStartedError
 from config import Config
-from workflows import CVAnalysisWorkflow, MatchingWorkflow
+from workflows import (CVAnalysisWorkflow, MatchingWorkflow, LowLatencyMatchingWorkflow, MentorSnippetRefreshWorkflow,
+                       matching_settings)
+from activities import match_in_process
+from distance_table import get_distance_table
+from llm_client import close_llm_client
 from email_service import EmailService
+from metrics import metrics
+from payload_codec import get_data_converter, get_payload_codec
+from roster_store import get_roster_store
 
 # Configure logging
 logging.basicConfig(
@@ -28,10 +41,65 @@ async def get_temporal_client():
     if temporal_client is None:
         temporal_client = await Client.connect(
             Config.TEMPORAL_HOST,
-            namespace=Config.TEMPORAL_NAMESPACE
+            namespace=Config.TEMPORAL_NAMESPACE,
+            data_converter=get_data_converter()
         )
     return temporal_client
 
+def request_workflow_id(prefix: str, payload) -> str:
+    """
+    Derive a workflow ID from the request content so identical requests share it.
+    """
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return f"{prefix}-{digest[:32]}"
+
+async def execute_coalesced_workflow(workflow_run, arg, workflow_id: str):
+    """
+    Start a workflow, or attach to the running execution with the same ID.
+    
+    Concurrent identical requests (double submits, frontend retries) wait on a
+    single execution instead of repeating the LLM and geocoding work. Once the
+    execution has closed, the same ID can start a fresh run.
+    """
+    client = await get_temporal_client()
+    
+    try:
+        handle = await client.start_workflow(
+            workflow_run,
+            arg,
+            id=workflow_id,
+            task_queue=Config.TEMPORAL_TASK_QUEUE,
+            id_reuse_policy=WorkflowIDReusePolicy.ALLOW_DUPLICATE,
+        )
+        logger.info(f"Started workflow {workflow_id}")
+    except WorkflowAlreadyStartedError:
+        logger.info(f"Workflow {workflow_id} already running, attaching to it")
+        handle = client.get_workflow_handle_for(workflow_run, workflow_id)
+    
+    return await handle.result()
+
+async def start_snippet_refresh(roster):
+    """
+    Start background snippet generation for a request's mentors without waiting for it.
+    
+    The workflow ID is derived from the roster (its snapshot version, or the inline mentors),
+    so repeated requests with the same roster attach to one running refresh.
+    """
+    client = await get_temporal_client()
+    workflow_id = request_workflow_id("mentor-snippets", roster)
+    
+    try:
+        await client.start_workflow(
+            MentorSnippetRefreshWorkflow.run,
+            roster,
+            id=workflow_id,
+            task_queue=Config.TEMPORAL_TASK_QUEUE,
+            id_reuse_policy=WorkflowIDReusePolicy.ALLOW_DUPLICATE,
+        )
+        logger.info(f"Started snippet refresh {workflow_id}")
+    except WorkflowAlreadyStartedError:
+        logger.info(f"Snippet refresh {workflow_id} already running")
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -120,22 +188,11 @@ async def execute_workflow(cv_text: str) -> dict:
         Dictionary with workflow execution result
     """
     try:
-        # Get Temporal client
-        client = await get_temporal_client()
-        
-        # Generate unique workflow ID
-        import uuid
-        workflow_id = f"cv-analysis-{uuid.uuid4()}"
-        
-        logger.info(f"Starting workflow {workflow_id}")
+        # Identical CVs share a workflow ID so concurrent duplicates coalesce
+        workflow_id = request_workflow_id("cv-analysis", cv_text)
         
-        # Execute workflow and wait for result
-        result = await client.execute_workflow(
-            CVAnalysisWorkflow.run,
-            cv_text,
-            id=workflow_id,
-            task_queue=Config.TEMPORAL_TASK_QUEUE,
-        )
+        # Execute workflow (or attach to a running duplicate) and wait for result
+        result = await execute_coalesced_workflow(CVAnalysisWorkflow.run, cv_text, workflow_id)
         
         logger.info(f"Workflow {workflow_id} completed")
         
@@ -185,7 +242,9 @@ def match_mentors():
         "suggest": [
             {"mentor_id": "mentor-123", "score": 85},
             {"mentor_id": "mentor-456", "score": 72}
-        ]
+        ],
+        "result_limit": 100  (only for rosters larger than MATCHING_SHARD_SIZE, which
+                              return their best MATCHING_SHARD_RESULT_LIMIT matches)
     }
     """
     try:
@@ -219,14 +278,15 @@ def match_mentors():
         
         logger.info(f"Received matching request for student against {len(data['mentors'])} mentors")
         
-        # Execute Temporal workflow synchronously
-        result = asyncio.run(execute_matching_workflow(data))
+        # Execute in process or as a Temporal workflow, synchronously
+        result = asyncio.run(execute_matching(data))
         
         if result['success']:
             logger.info(f"Successfully matched student, found {len(result['suggest'])} matches")
-            return jsonify({
-                "suggest": result['suggest']
-            }), 200
+            response = {"suggest": result['suggest']}
+            if 'result_limit' in result:
+                response['result_limit'] = result['result_limit']
+            return jsonify(response), 200
         else:
             logger.error(f"Matching workflow execution failed: {result.get('error')}")
             return jsonify({
@@ -244,6 +304,125 @@ def match_mentors():
         }), 500
 
 
+# Recent in-process match times as (monotonic time, seconds per mentor). Samples expire after
+# INLINE_MATCHING_WINDOW_SECONDS, so a slow burst cannot send every later match to Temporal for good
+inline_timings = deque(maxlen=1000)
+
+
+def record_inline_timing(seconds_per_mentor: float) -> None:
+    """Record the time per mentor of an in-process match."""
+    inline_timings.append((time.monotonic(), seconds_per_mentor))
+    metrics.observe('inline_matching_seconds_per_mentor', seconds_per_mentor)
+
+
+def recent_inline_seconds_per_mentor(q: float = 0.95):
+    """Quantile (nearest rank) of the unexpired in-process times per mentor, or None if there are none."""
+    cutoff = time.monotonic() - Config.INLINE_MATCHING_WINDOW_SECONDS
+    while inline_timings and inline_timings[0][0] < cutoff:
+        inline_timings.popleft()
+    if not inline_timings:
+        return None
+    ordered = sorted(seconds for _, seconds in inline_timings)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def use_inline_matching(mentors: list) -> bool:
+    """
+    Decide whether a match runs in the API process instead of through Temporal.
+    
+    In 'auto' mode small rosters run inline while the p95 time per mentor of
+    recent inline matches, scaled to this roster, stays under
+    INLINE_MATCHING_MAX_MS. Once the slow samples expire, matches are tried
+    inline again. LLM reasoning modes keep using the workflow, whose
+    activities retry and shed LLM calls.
+    
+    Auto mode also needs the caches the workers fill to be shared with the API
+    (GEOCODE_CACHE_DB, and SNIPPET_CACHE_DB for snippet reasoning); otherwise the
+    API could not resolve postcodes or would answer with template reasoning where
+    the workflow uses snippets.
+    """
+    if Config.MATCHING_EXECUTION == 'inline':
+        return True
+    if Config.MATCHING_EXECUTION != 'auto' or Config.REASONING_MODE not in ('template', 'snippets'):
+        return False
+    if not Config.GEOCODE_CACHE_DB or (Config.REASONING_MODE == 'snippets' and not Config.SNIPPET_CACHE_DB):
+        return False
+    if len(mentors) > Config.INLINE_MATCHING_MAX_MENTORS:
+        return False
+    
+    per_mentor = recent_inline_seconds_per_mentor()
+    return per_mentor is None or per_mentor * len(mentors) * 1000 <= Config.INLINE_MATCHING_MAX_MS
+
+
+async def execute_matching(matching_data: dict) -> dict:
+    """
+    Run a match in process when use_inline_matching allows it, otherwise (or when
+    postcodes still need geocoding) through the Temporal matching workflow.
+    Both paths return the same matches.
+    
+    Args:
+        matching_data: The matching request data
+        
+    Returns:
+        Dictionary with the matching result
+    """
+    mentors = matching_data.get('mentors', [])
+    if use_inline_matching(mentors):
+        start = time.perf_counter()
+        try:
+            matches = await match_in_process(matching_data['student'], mentors, logger)
+        except Exception as e:
+            logger.error(f"Error executing in-process matching: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "suggest": []
+            }
+        finally:
+            # Each API request runs in its own event loop, so release its LLM connections with it
+            await close_llm_client()
+        
+        if matches is not None:
+            elapsed = time.perf_counter() - start
+            metrics.observe('matching_latency_seconds', elapsed, path='inline')
+            record_inline_timing(elapsed / max(len(mentors), 1))
+            logger.info(f"In-process matching completed in {elapsed * 1000:.1f}ms")
+            
+            if Config.REASONING_MODE == 'snippets':
+                await start_request_snippet_refresh(workflow_roster(mentors))
+            
+            return {
+                "success": True,
+                "suggest": matches,
+                "workflow_id": None
+            }
+        
+        logger.info("Postcodes missing from the geocoding cache, matching through Temporal")
+        metrics.inc('inline_matching_deferred_total')
+    
+    start = time.perf_counter()
+    result = await execute_matching_workflow(matching_data)
+    metrics.observe('matching_latency_seconds', time.perf_counter() - start, path='temporal')
+    return result
+
+
+def workflow_roster(mentors: list):
+    """
+    The mentors to hand to workflows: a snapshot reference when ROSTER_STORE_DB is shared
+    with the workers, otherwise the mentor list itself.
+    """
+    if Config.ROSTER_STORE_DB:
+        return get_roster_store().put(mentors)
+    return mentors
+
+async def start_request_snippet_refresh(roster):
+    """Make sure a request's mentors get reasoning snippets for later requests."""
+    try:
+        await start_snippet_refresh(roster)
+    except Exception as e:
+        logger.error(f"Failed to start snippet refresh: {str(e)}")
+
+
 async def execute_matching_workflow(matching_data: dict) -> dict:
     """
     Execute the Temporal matching workflow and wait for result.
@@ -255,24 +434,31 @@ async def execute_matching_workflow(matching_data: dict) -> dict:
         Dictionary with workflow execution result
     """
     try:
-        # Get Temporal client
-        client = await get_temporal_client()
+        # With a shared roster store the workflow and its activities only carry the snapshot reference
+        roster = workflow_roster(matching_data.get('mentors', []))
+        # Settings are resolved here so the workflow's branches don't depend on the worker's environment
+        workflow_input = {
+            **{key: value for key, value in matching_data.items() if key != 'mentors'},
+            'roster' if isinstance(roster, dict) else 'mentors': roster,
+            'settings': matching_settings()
+        }
         
-        # Generate unique workflow ID
-        import uuid
-        workflow_id = f"matching-{uuid.uuid4()}"
+        # Make sure the request's mentors get reasoning snippets for later requests
+        if Config.REASONING_MODE == 'snippets':
+            await start_request_snippet_refresh(roster)
         
-        logger.info(f"Starting matching workflow {workflow_id}")
+        # Identical matching requests share a workflow ID so concurrent duplicates coalesce
+        workflow_id = request_workflow_id("matching", workflow_input)
         
-        # Execute workflow and wait for result
-        result = await client.execute_workflow(
-            MatchingWorkflow.run,
-            matching_data,
-            id=workflow_id,
-            task_queue=Config.TEMPORAL_TASK_QUEUE,
-        )
+        workflow_run = (LowLatencyMatchingWorkflow.run if Config.MATCHING_WORKFLOW == 'low_latency'
+                        else MatchingWorkflow.run)
+        
+        # Execute workflow (or attach to a running duplicate) and wait for result
+        result = await execute_coalesced_workflow(workflow_run, workflow_input, workflow_id)
         
         logger.info(f"Matching workflow {workflow_id} completed")
+        if get_payload_codec() is not None:
+            logger.info(f"Payload codec stats: {get_payload_codec().stats()}")
         
         return {
             **result,
@@ -417,7 +603,7 @@ def match_with_mocks():
             "mentors": mock_mentors
         }
 
-        result = asyncio.run(execute_matching_workflow(matching_request))
+        result = asyncio.run(execute_matching(matching_request))
 
         if result['success']:
             # Enhance matches with full mentor details
@@ -666,6 +852,9 @@ if __name__ == '__main__':
         # Validate configuration
         Config.validate()
         logger.info("Configuration validated successfully")
+        
+        # Build the distance table before serving, so no in-process match pays for it
+        get_distance_table()
         logger.info(f"Starting Flask server on port {Config.FLASK_PORT}")
         
         # Run Flask app
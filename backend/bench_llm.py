@@ -0,0 +1,153 @@
+"""
+Offline benchmark for the LLM path.
+
+Drives analyze_cv_with_llm and calculate_mentor_matches through the local
+LLM stub at several concurrency levels and reports throughput and tail
+latency. No Temporal server or OpenRouter key is needed.
+
+Usage:
+    python bench_llm.py --concurrency 1 4 16 --requests 40 --latency-ms 300 --jitter-ms 150
+
+Model fallback chain with a slow primary model:
+    python bench_llm.py --fallback-models backup \
+        --model-latency google/gemini-2.0-flash-exp:free=2000:1500 --model-latency backup=300
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+from temporalio.testing import ActivityEnvironment
+from activities import analyze_cv_with_llm, calculate_mentor_matches
+from config import Config
+from llm_stub import LLMStubServer, LatencyProfile, parse_model_latency
+from metrics import metrics
+from mock_mentors import get_mock_mentors
+
+SAMPLE_CV = """
+Senior Software Engineer with 8 years of experience in technology and cryptocurrency systems.
+Built trading platforms, mentored junior developers and led a gaming community.
+Hobbies: travel, music, food and photography.
+"""
+
+SAMPLE_STUDENT = {
+    "education_level": "University",
+    "postcode": "11122",
+    "city": "Stockholm",
+    "interests": ["Technology", "Gaming", "Music"],
+    "languages": ["Swedish", "English"],
+    "meeting_preference": "Online",
+    "bio": "I like music and gaming",
+    "goals": "I want to learn software engineering"
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_level(call: Callable[[int], Awaitable[Any]], requests: int, concurrency: int) -> Dict[str, float]:
+    """Run `requests` calls with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'throughput': requests / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'errors': errors,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    env = ActivityEnvironment()
+    mentors = get_mock_mentors()
+    request_ids = itertools.count()
+
+    async def analyze(i: int) -> Any:
+        return await env.run(analyze_cv_with_llm, f"{SAMPLE_CV}\nReference number {i}")
+
+    async def match(i: int) -> Any:
+        # Vary the goals so every request misses the reasoning cache, across levels too
+        student = {**SAMPLE_STUDENT, "goals": f"{SAMPLE_STUDENT['goals']} (request {next(request_ids)})"}
+        return await env.run(calculate_mentor_matches, student, mentors, {})
+
+    stub = LLMStubServer(
+        latency=LatencyProfile(args.latency_ms, args.jitter_ms, args.distribution),
+        model_latency=parse_model_latency(args.model_latency, args.distribution),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    )
+
+    with stub:
+        Config.OPENROUTER_BASE_URL = stub.base_url
+        Config.OPENROUTER_API_KEY = 'stub-key'
+        Config.LLM_FALLBACK_MODELS = args.fallback_models
+
+        print(f"LLM stub at {stub.base_url}: {args.distribution} latency {args.latency_ms}±{args.jitter_ms} ms, "
+              f"error rate {args.error_rate}, rate-limit rate {args.rate_limit_rate}")
+        print(f"{'workload':<26}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+
+        for name, call in (('analyze_cv_with_llm', analyze), ('calculate_mentor_matches', match)):
+            for concurrency in args.concurrency:
+                result = await run_level(call, args.requests, concurrency)
+                print(f"{name:<26}{concurrency:>6}{result['throughput']:>10.2f}{result['p50']:>10.0f}"
+                      f"{result['p95']:>10.0f}{result['p99']:>10.0f}{result['errors']:>8}")
+
+        stats = stub.stats()
+        print(f"\nStub totals: {stats['requests']} requests, {stats['errors']} errors, "
+              f"{stats['rate_limited']} rate limited, {stats['prompt_tokens']} prompt tokens, "
+              f"{stats['completion_tokens']} completion tokens")
+
+        print(f"\n{'LLM operation':<26}{'calls':>8}{'p50 ms':>10}{'p95 ms':>10}{'retries':>9}{'fallbacks':>11}")
+        for operation in ('cv_analysis', 'match_reasoning'):
+            latency = metrics.histogram('llm_latency_seconds', operation=operation)
+            if latency is None:
+                continue
+            print(f"{operation:<26}{latency['count']:>8}{latency['p50'] * 1000:>10.0f}{latency['p95'] * 1000:>10.0f}"
+                  f"{metrics.counter('llm_retries_total', operation=operation):>9.0f}"
+                  f"{metrics.counter('llm_fallbacks_total', operation=operation):>11.0f}")
+
+        if args.fallback_models:
+            print(f"\n{'model':<40}{'calls':>8}{'p95 ms':>10}{'handed over':>13}")
+            for model in [Config.LLM_MODEL, *args.fallback_models]:
+                latency = metrics.histogram('llm_latency_seconds', model=model, outcome='success')
+                p95 = latency['p95'] * 1000 if latency else 0
+                print(f"{model:<40}{metrics.counter('llm_requests_total', model=model):>8.0f}{p95:>10.0f}"
+                      f"{metrics.counter('llm_model_fallbacks_total', model=model):>13.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the LLM path against the local stub")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=40, help="Requests per workload and concurrency level")
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--jitter-ms', type=float, default=100.0)
+    parser.add_argument('--distribution', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--model-latency', action='append', default=[],
+                        help="Per-model stub latency as model=mean_ms[:jitter_ms] (repeatable)")
+    parser.add_argument('--fallback-models', nargs='*', default=[], help="Models to fall back to, in order")
+    asyncio.run(main(parser.parse_args()))
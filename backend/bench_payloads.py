@@ -0,0 +1,118 @@
+"""
+Offline benchmark for Temporal payload encoding.
+
+Encodes and decodes realistic matching workflow inputs (student plus mentor
+roster) and results (scored matches with reasoning) with the JSON and
+msgpack payload converters, with and without the compressing codec, and
+reports time per round trip and payload size. No Temporal server is needed.
+
+Usage:
+    python bench_payloads.py --mentors 20 200 2000 --iterations 50
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Type
+import temporalio.converter
+from activities import build_template_reasoning
+from matching import MatchingScorer
+from mock_mentors import get_mock_roster
+from payload_codec import CompressionCodec
+from payload_converter import JSONPayloadConverter, MsgPackPayloadConverter, msgpack_available
+
+SAMPLE_STUDENT = {
+    "education_level": "University",
+    "postcode": "11122",
+    "city": "Stockholm",
+    "interests": ["Technology", "Gaming", "Music"],
+    "languages": ["Swedish", "English"],
+    "meeting_preference": "Both",
+    "bio": "I like music and gaming",
+    "goals": "I want to learn software engineering"
+}
+
+
+def build_matches(roster: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Scored matches with template reasoning, as returned by calculate_mentor_matches."""
+    scorer = MatchingScorer()
+    mentors_by_id = {mentor['id']: mentor for mentor in roster}
+    matches = scorer.calculate_matches(SAMPLE_STUDENT, roster, {})
+    for match in matches:
+        match['reasoning'] = build_template_reasoning(scorer, SAMPLE_STUDENT, mentors_by_id[match['mentor_id']],
+                                                      match['score'], {})
+    return matches
+
+
+def data_converters(threshold_bytes: int) -> Dict[str, temporalio.converter.DataConverter]:
+    converters = {'json': JSONPayloadConverter}
+    if msgpack_available():
+        converters['msgpack'] = MsgPackPayloadConverter
+
+    result = {}
+    for name, converter_class in converters.items():
+        result[name] = temporalio.converter.DataConverter(payload_converter_class=converter_class)
+        result[f"{name}+zlib"] = temporalio.converter.DataConverter(
+            payload_converter_class=converter_class,
+            payload_codec=CompressionCodec('zlib', threshold_bytes=threshold_bytes)
+        )
+    return result
+
+
+async def measure(converter: temporalio.converter.DataConverter, value: Any, type_hint: Optional[Type],
+                  iterations: int) -> Dict[str, float]:
+    """Average encode and decode time (ms) and encoded size (bytes) of one value."""
+    encode_time = decode_time = 0.0
+    size = 0
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        payloads = await converter.encode([value])
+        encode_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoded = await converter.decode(payloads, [type_hint])
+        decode_time += time.perf_counter() - start
+
+        size = payloads[0].ByteSize()
+
+    if decoded != [value]:
+        raise AssertionError("Payload did not round-trip")
+
+    return {
+        'encode_ms': encode_time / iterations * 1000,
+        'decode_ms': decode_time / iterations * 1000,
+        'bytes': size,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    if not msgpack_available():
+        print("msgpack is not installed (pip install msgpack), benchmarking JSON only\n")
+
+    converters = data_converters(args.threshold_bytes)
+    print(f"{'payload':<24}{'converter':<16}{'encode ms':>11}{'decode ms':>11}{'bytes':>10}{'vs json':>9}")
+
+    for size in args.mentors:
+        roster = get_mock_roster(size)
+        workloads = (
+            (f"request ({size} mentors)", {'student': SAMPLE_STUDENT, 'mentors': roster}, dict),
+            (f"result ({size} mentors)", build_matches(roster), list),
+        )
+
+        for label, value, type_hint in workloads:
+            baseline = None
+            for name, converter in converters.items():
+                result = await measure(converter, value, type_hint, args.iterations)
+                baseline = baseline or result['bytes']
+                print(f"{label:<24}{name:<16}{result['encode_ms']:>11.3f}{result['decode_ms']:>11.3f}"
+                      f"{result['bytes']:>10}{result['bytes'] / baseline:>9.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Temporal payload converters and compression")
+    parser.add_argument('--mentors', type=int, nargs='+', default=[20, 200, 2000], help="Roster sizes")
+    parser.add_argument('--iterations', type=int, default=50, help="Round trips per measurement")
+    parser.add_argument('--threshold-bytes', type=int, default=1024, help="Compression threshold")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,145 @@
+"""
+In-process LRU cache with TTL and an optional persistent tier.
+
+The persistent tier is a SQLite file, so several worker processes on the same
+host (or sharing a volume) can reuse each other's entries. Values must be
+JSON-serializable.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LRUTTLCache:
+    """Bounded LRU cache with per-entry expiry and hit-rate statistics."""
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: Optional[float] = None,
+                 persistent_path: Optional[str] = None):
+        """
+        Args:
+            name: Cache namespace, also used to separate entries in the persistent tier
+            max_size: Maximum number of in-process entries
+            ttl_seconds: Entry lifetime in seconds (None for no expiry)
+            persistent_path: Optional SQLite file shared across processes
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: 'OrderedDict[str, Tuple[Any, Optional[float]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'persistent_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if persistent_path:
+            try:
+                self._db = sqlite3.connect(persistent_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    "namespace TEXT, key TEXT, value TEXT, expires_at REAL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open persistent cache {persistent_path}: {e}")
+                self._db = None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+
+            persisted = self._get_persistent(key, now)
+            if persisted is not None:
+                value, expires_at = persisted
+                self._store(key, value, expires_at)
+                self._stats['persistent_hits'] += 1
+                return value
+
+            self._stats['misses'] += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value in both tiers."""
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+
+        with self._lock:
+            self._store(key, value, expires_at)
+
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)",
+                        (self.name, key, json.dumps(value), expires_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to persist {self.name} cache entry: {e}")
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._stats = {stat: 0 for stat in self._stats}
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.name,))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, hit rate and current size."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['persistent_hits'] + self._stats['misses']
+            hits = self._stats['hits'] + self._stats['persistent_hits']
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'hit_rate': hits / lookups if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _get_persistent(self, key: str, now: float) -> Optional[Tuple[Any, Optional[float]]]:
+        if self._db is None:
+            return None
+
+        try:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.name, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read {self.name} cache entry: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            return None
+
+        return json.loads(value), expires_at
@@ -13,17 +13,140 @@ class Config:
     
     # LLM Model - Using Google Gemini 2.0 Flash for fast, cost-effective inference
     LLM_MODEL = 'google/gemini-2.0-flash-exp:free'
+    # Models tried in order after LLM_MODEL (comma separated). A model that exceeds its latency
+    # budget (observed p95 x multiplier, clamped to min/max, and at most an even share of the
+    # caller's timeout such as REASONING_TIMEOUT_SECONDS) hands the request to the next one
+    LLM_FALLBACK_MODELS = [m.strip() for m in os.getenv('LLM_FALLBACK_MODELS', '').split(',') if m.strip()]
+    LLM_BUDGET_P95_MULTIPLIER = float(os.getenv('LLM_BUDGET_P95_MULTIPLIER', 1.5))
+    LLM_BUDGET_MIN_SECONDS = float(os.getenv('LLM_BUDGET_MIN_SECONDS', 2))
+    LLM_BUDGET_MAX_SECONDS = float(os.getenv('LLM_BUDGET_MAX_SECONDS', 20))
+    # Samples needed before the observed p95 is trusted; until then the max budget applies
+    LLM_BUDGET_MIN_SAMPLES = int(os.getenv('LLM_BUDGET_MIN_SAMPLES', 20))
+    
+    # Pooled LLM HTTP client settings (HTTP/2 requires the optional h2 package)
+    LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', 20))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', 10))
+    LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv('LLM_KEEPALIVE_EXPIRY_SECONDS', 60))
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', 60))
+    LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv('LLM_CONNECT_TIMEOUT_SECONDS', 10))
+    LLM_HTTP2 = os.getenv('LLM_HTTP2', 'true').lower() == 'true'
+    # Per-worker LLM scheduler: global concurrency, tokens-per-minute budget (0 = unlimited),
+    # slots reserved for interactive calls, and when batch calls are shed
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', 0))
+    LLM_INTERACTIVE_RESERVED = int(os.getenv('LLM_INTERACTIVE_RESERVED', 4))
+    LLM_BATCH_MAX_QUEUE = int(os.getenv('LLM_BATCH_MAX_QUEUE', 100))
+    LLM_BATCH_MAX_WAIT_SECONDS = float(os.getenv('LLM_BATCH_MAX_WAIT_SECONDS', 30))
+    # USD per 1000 tokens, for the llm_cost_usd_total metric (the default model is free)
+    LLM_PROMPT_COST_PER_1K = float(os.getenv('LLM_PROMPT_COST_PER_1K', 0))
+    LLM_COMPLETION_COST_PER_1K = float(os.getenv('LLM_COMPLETION_COST_PER_1K', 0))
+    
+    # Match reasoning settings
+    # Maximum concurrent LLM reasoning calls per match and per-call timeout
+    REASONING_CONCURRENCY = int(os.getenv('REASONING_CONCURRENCY', 5))
+    REASONING_TIMEOUT_SECONDS = float(os.getenv('REASONING_TIMEOUT_SECONDS', 20))
+    # 'per_mentor' makes one LLM call per match, 'batched' one call for all top-K matches,
+    # 'template' builds every explanation from the score evidence without the LLM,
+    # 'snippets' combines precomputed per-mentor snippets with the score evidence
+    REASONING_MODE = os.getenv('REASONING_MODE', 'per_mentor')
+    # Shed LLM reasoning (templates only) once this many matches are generating it (0 disables)
+    REASONING_SHED_IN_FLIGHT = int(os.getenv('REASONING_SHED_IN_FLIGHT', 0))
+    REASONING_BATCH_TIMEOUT_SECONDS = float(os.getenv('REASONING_BATCH_TIMEOUT_SECONDS', 45))
+    # Cache for generated reasoning; set REASONING_CACHE_DB to share entries across workers
+    REASONING_CACHE_SIZE = int(os.getenv('REASONING_CACHE_SIZE', 5000))
+    REASONING_CACHE_TTL_SECONDS = float(os.getenv('REASONING_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+    REASONING_CACHE_DB = os.getenv('REASONING_CACHE_DB')
+    # Per-mentor reasoning snippets; set SNIPPET_CACHE_DB so every worker sees the background job's output
+    SNIPPET_CACHE_SIZE = int(os.getenv('SNIPPET_CACHE_SIZE', 10000))
+    SNIPPET_CACHE_TTL_SECONDS = float(os.getenv('SNIPPET_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+    SNIPPET_CACHE_DB = os.getenv('SNIPPET_CACHE_DB')
+    
+    # CV analysis cache settings; set CV_CACHE_DB to share entries across workers
+    CV_CACHE_SIZE = int(os.getenv('CV_CACHE_SIZE', 2000))
+    CV_CACHE_TTL_SECONDS = float(os.getenv('CV_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+    CV_CACHE_DB = os.getenv('CV_CACHE_DB')
+    # Reuse interests of near-duplicate CVs (MinHash estimate of Jaccard similarity)
+    CV_SIMILARITY_ENABLED = os.getenv('CV_SIMILARITY_ENABLED', 'true').lower() == 'true'
+    CV_SIMILARITY_THRESHOLD = float(os.getenv('CV_SIMILARITY_THRESHOLD', 0.9))
+    CV_SIMILARITY_REFINE = os.getenv('CV_SIMILARITY_REFINE', 'true').lower() == 'true'
+    CV_SIMILARITY_INDEX_SIZE = int(os.getenv('CV_SIMILARITY_INDEX_SIZE', 5000))
+    # Token budget per CV analysis prompt; longer CVs are analysed in up to CV_MAX_CHUNKS concurrent chunks
+    CV_CHUNK_TOKENS = int(os.getenv('CV_CHUNK_TOKENS', 1500))
+    CV_MAX_CHUNKS = int(os.getenv('CV_MAX_CHUNKS', 4))
+    # Skip the LLM when the local classifier finds enough interests with high confidence.
+    # Opt-in, so CV analysis keeps its LLM results unless the classifier is enabled
+    CV_FAST_PATH_ENABLED = os.getenv('CV_FAST_PATH_ENABLED', 'false').lower() == 'true'
+    CV_FAST_PATH_CONFIDENCE = float(os.getenv('CV_FAST_PATH_CONFIDENCE', 0.8))
+    CV_FAST_PATH_MIN_INTERESTS = int(os.getenv('CV_FAST_PATH_MIN_INTERESTS', 3))
     
     # Temporal settings
     TEMPORAL_HOST = os.getenv('TEMPORAL_HOST', 'localhost:7233')
     TEMPORAL_NAMESPACE = os.getenv('TEMPORAL_NAMESPACE', 'default')
     TEMPORAL_TASK_QUEUE = 'cv-analysis-queue'
+    # Temporal payload encoding: 'json' or 'msgpack' (needs msgpack). Both decode either encoding
+    PAYLOAD_CONVERTER = os.getenv('PAYLOAD_CONVERTER', 'json')
+    # Compress Temporal payloads above the threshold: 'zlib', 'zstd' (needs zstandard) or 'none'.
+    # The API and the workers must agree; upgrade workers first
+    PAYLOAD_COMPRESSION = os.getenv('PAYLOAD_COMPRESSION', 'none')
+    PAYLOAD_COMPRESSION_THRESHOLD_BYTES = int(os.getenv('PAYLOAD_COMPRESSION_THRESHOLD_BYTES', 1024))
+    PAYLOAD_COMPRESSION_LEVEL = int(os.getenv('PAYLOAD_COMPRESSION_LEVEL', 6))
+    
+    # Matching settings
+    # Number of top matches that get personalized reasoning and exact distance ordering
+    MATCHING_TOP_K = int(os.getenv('MATCHING_TOP_K', 10))
+    # 'low_latency' runs validation and cached geocoding as local activities,
+    # 'durable' runs every step as a regular activity
+    MATCHING_WORKFLOW = os.getenv('MATCHING_WORKFLOW', 'low_latency')
+    # Where the API runs matches: 'temporal' (always the workflow), 'inline' (in the API process
+    # unless postcodes need geocoding) or 'auto' (inline for rosters up to INLINE_MATCHING_MAX_MENTORS
+    # whose estimated time stays under INLINE_MATCHING_MAX_MS, when reasoning needs no LLM calls
+    # and the API shares the workers' caches through GEOCODE_CACHE_DB and, for snippets, SNIPPET_CACHE_DB)
+    MATCHING_EXECUTION = os.getenv('MATCHING_EXECUTION', 'auto')
+    INLINE_MATCHING_MAX_MENTORS = int(os.getenv('INLINE_MATCHING_MAX_MENTORS', 200))
+    INLINE_MATCHING_MAX_MS = float(os.getenv('INLINE_MATCHING_MAX_MS', 250))
+    # Seconds an in-process match time counts towards the INLINE_MATCHING_MAX_MS estimate
+    INLINE_MATCHING_WINDOW_SECONDS = float(os.getenv('INLINE_MATCHING_WINDOW_SECONDS', 300))
+    
+    # Distributed scoring: rosters larger than MATCHING_SHARD_SIZE (0 disables) are scored in
+    # shards by parallel activities spread across workers, and the best matches merged.
+    # Off by default, as sharded results are cut to MATCHING_SHARD_RESULT_LIMIT matches
+    MATCHING_SHARD_SIZE = int(os.getenv('MATCHING_SHARD_SIZE', 0))
+    MATCHING_SHARD_PARALLELISM = int(os.getenv('MATCHING_SHARD_PARALLELISM', 8))
+    # Matches kept per shard and in the merged result of distributed scoring (0 keeps all)
+    MATCHING_SHARD_RESULT_LIMIT = int(os.getenv('MATCHING_SHARD_RESULT_LIMIT', 100))
+    
+    # Mentor roster snapshots: when set, workflows carry only a roster reference and activities
+    # load the snapshot from this SQLite file, which the API and every worker must share.
+    # Unset, the mentors are sent inline with each workflow
+    ROSTER_STORE_DB = os.getenv('ROSTER_STORE_DB')
+    ROSTER_CACHE_SIZE = int(os.getenv('ROSTER_CACHE_SIZE', 32))
+    ROSTER_TTL_SECONDS = float(os.getenv('ROSTER_TTL_SECONDS', 7 * 24 * 3600))
+    
+    # Geocoding results; set GEOCODE_CACHE_DB so the API's in-process matching sees
+    # the postcodes the workers' geocoding activities resolved
+    GEOCODE_CACHE_DB = os.getenv('GEOCODE_CACHE_DB')
+    
+    # Score distances from the precomputed postcode-prefix table instead of haversine
+    USE_DISTANCE_TABLE = os.getenv('USE_DISTANCE_TABLE', 'false').lower() == 'true'
+    
+    # Worker warm-up settings
+    # Resolve mentor postcodes and load scorer data before the worker starts polling
+    WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'false').lower() == 'true'
+    # Interval for the scheduled geocode cache refresh (0 disables the schedule; needs GEOCODE_CACHE_DB,
+    # as the refresh runs on a single worker)
+    GEOCODE_REFRESH_INTERVAL_MINUTES = int(os.getenv('GEOCODE_REFRESH_INTERVAL_MINUTES', 0))
+    # Interval for the scheduled mentor snippet refresh (0 disables the schedule)
+    SNIPPET_REFRESH_INTERVAL_MINUTES = int(os.getenv('SNIPPET_REFRESH_INTERVAL_MINUTES', 0))
     
     # Flask settings
     FLASK_PORT = int(os.getenv('FLASK_PORT', 5000))
     
     # Data files
     INTERESTS_CSV_PATH = os.path.join(os.path.dirname(__file__), 'data', 'interests.csv')
+    DISTANCE_TABLE_PATH = os.getenv(
+        'DISTANCE_TABLE_PATH',
+        os.path.join(os.path.dirname(__file__), 'data', 'postcode_prefix_distances.bin')
+    )
     
     # Email Configuration
     SMTP_USER = os.getenv('SMTP_USER', 'chathurangarulz@gmail.com')
@@ -0,0 +1,57 @@
+"""
+Shared fixtures for the offline test modules.
+"""
+
+import asyncio
+import copy
+import pytest
+from temporalio.testing import ActivityEnvironment
+from activities import calculate_mentor_matches
+from config import Config
+from mock_mentors import get_mock_roster
+
+SAMPLE_STUDENT = {
+    "education_level": "University",
+    "postcode": "11122",
+    "city": "Stockholm",
+    "interests": ["Technology", "Gaming", "Music"],
+    "languages": ["Swedish", "English"],
+    "meeting_preference": "Both",
+    "bio": "I like music and gaming",
+    "goals": "I want to learn software engineering"
+}
+
+
+@pytest.fixture
+def sample_student():
+    """A Stockholm student open to online and in-person mentoring."""
+    return copy.deepcopy(SAMPLE_STUDENT)
+
+
+@pytest.fixture
+def online_student(sample_student):
+    """The sample student meeting online only, so matches need no geocoding."""
+    return {**sample_student, "meeting_preference": "Online"}
+
+
+@pytest.fixture
+def use_stub(monkeypatch):
+    """use_stub(stub) points the LLM configuration at a stub server."""
+    def point_at(stub):
+        monkeypatch.setattr(Config, 'OPENROUTER_BASE_URL', stub.base_url)
+        monkeypatch.setattr(Config, 'OPENROUTER_API_KEY', 'test-key')
+    return point_at
+
+
+@pytest.fixture
+def run_matches():
+    """run_matches(student, mentors) runs calculate_mentor_matches without coordinates."""
+    def run(student, mentors):
+        return asyncio.run(ActivityEnvironment().run(calculate_mentor_matches, student, mentors, {}))
+    return run
+
+
+@pytest.fixture
+def mock_roster():
+    """mock_roster(size) repeats the mock mentors up to size, with unique ids mentor-0, mentor-1, ..."""
+    return get_mock_roster
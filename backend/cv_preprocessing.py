@@ -0,0 +1,190 @@
+"""
+CV text preprocessing for LLM analysis.
+
+Normalizes whitespace, strips boilerplate (page numbers, separators, consent
+statements, "references on request") and page headers and footers repeated
+next to page numbers, caps the text at a token budget and splits oversized CVs
+into chunks that can be analysed independently.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import List, Set
+
+# Page numbers, which mark the page breaks running headers and footers repeat at
+PAGE_NUMBER_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"^page \d+( of \d+)?$",
+    r"^sida \d+( av \d+)?$",
+    r"^\d+\s*/\s*\d+$",
+)]
+
+# Lines carrying no information about the person's interests
+BOILERPLATE_PATTERNS = PAGE_NUMBER_PATTERNS + [re.compile(p, re.IGNORECASE) for p in (
+    r"^(curriculum vitae|resume|résumé|cv|meritförteckning)$",
+    r"^[\W_]+$",
+    r"references (are )?(available )?(up)?on request",
+    r"referenser (lämnas )?på begäran",
+    r"consent to the processing of my personal data",
+    r"samtycker till (att mina personuppgifter|behandling av mina personuppgifter)",
+)]
+
+_SPACES = re.compile(r"[^\S\n]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def normalize_cv_text(cv_text: str) -> str:
+    """Normalize unicode and whitespace, keeping single blank lines between paragraphs."""
+    text = unicodedata.normalize('NFKC', cv_text).replace('\r\n', '\n').replace('\r', '\n')
+    lines = [_SPACES.sub(' ', line).strip() for line in text.split('\n')]
+    return re.sub(r"\n{3,}", "\n\n", '\n'.join(lines)).strip()
+
+
+def _matches_any(line: str, patterns: List[re.Pattern]) -> bool:
+    return any(pattern.search(line) for pattern in patterns)
+
+
+def page_headers_and_footers(lines: List[str]) -> Set[str]:
+    """
+    Lowercased lines that repeat and sit next to a page number somewhere, i.e. running
+    page headers and footers. Other boilerplate lines between them are skipped.
+    """
+    keys: List[str] = []
+    at_page_break: List[bool] = []
+    after_page_number = False
+
+    for line in lines:
+        if _matches_any(line, PAGE_NUMBER_PATTERNS):
+            if at_page_break:
+                at_page_break[-1] = True
+            after_page_number = True
+        elif line and not _matches_any(line, BOILERPLATE_PATTERNS):
+            keys.append(line.lower())
+            at_page_break.append(after_page_number)
+            after_page_number = False
+
+    counts = Counter(keys)
+    return {key for key, at_break in zip(keys, at_page_break) if at_break and counts[key] > 1}
+
+
+def strip_boilerplate(cv_text: str) -> str:
+    """
+    Drop boilerplate lines and the repeats of page headers and footers.
+    Other repeated lines (e.g. the same skill listed under two jobs) are kept.
+    """
+    lines = cv_text.split('\n')
+    headers_and_footers = page_headers_and_footers(lines)
+    seen = set()
+    kept = []
+
+    for line in lines:
+        if not line:
+            if kept and kept[-1]:
+                kept.append(line)
+            continue
+
+        key = line.lower()
+        if (key in seen and key in headers_and_footers) or _matches_any(line, BOILERPLATE_PATTERNS):
+            continue
+
+        seen.add(key)
+        kept.append(line)
+
+    return '\n'.join(kept).strip()
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, on a word boundary."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = cut.rfind(' ')
+    return cut[:boundary] if boundary > 0 else cut
+
+
+def chunk_cv_text(cv_text: str, chunk_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most chunk_tokens, preferring paragraph and line boundaries.
+
+    Args:
+        cv_text: Preprocessed CV text
+        chunk_tokens: Token budget per chunk
+
+    Returns:
+        List of chunks in document order
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append('\n'.join(current).strip())
+        current, current_tokens = [], 0
+
+    for line in cv_text.split('\n'):
+        # Lines longer than a whole chunk are split on word boundaries
+        while estimate_tokens(line) > chunk_tokens:
+            flush()
+            head = truncate_to_tokens(line, chunk_tokens)
+            chunks.append(head)
+            line = line[len(head):].strip()
+
+        line_tokens = estimate_tokens(line) + 1
+        if current_tokens + line_tokens > chunk_tokens:
+            flush()
+        if line or current:
+            current.append(line)
+            current_tokens += line_tokens
+
+    flush()
+    return [chunk for chunk in chunks if chunk]
+
+
+def preprocess_cv(cv_text: str, chunk_tokens: int, max_chunks: int) -> List[str]:
+    """
+    Clean a CV and split it into at most max_chunks chunks of chunk_tokens each.
+    Text beyond the total budget is dropped.
+
+    Args:
+        cv_text: Raw CV text
+        chunk_tokens: Token budget per LLM prompt
+        max_chunks: Maximum number of chunks (and LLM calls) per CV
+
+    Returns:
+        List of chunks; a single chunk when the CV fits one prompt
+    """
+    text = strip_boilerplate(normalize_cv_text(cv_text))
+    text = truncate_to_tokens(text, chunk_tokens * max_chunks)
+
+    if estimate_tokens(text) <= chunk_tokens:
+        return [text] if text else []
+
+    return chunk_cv_text(text, chunk_tokens)[:max_chunks]
+
+
+def merge_interest_votes(chunk_interests: List[List[str]], limit: int = 8) -> List[str]:
+    """
+    Merge the interests found in each chunk.
+    Interests found in more chunks rank first; ties keep first-seen order. Only merged
+    results are cut to `limit`: a CV analysed in a single chunk keeps all its interests.
+    """
+    if len(chunk_interests) == 1:
+        return list(dict.fromkeys(chunk_interests[0]))
+
+    votes = Counter()
+    first_seen = {}
+
+    for interests in chunk_interests:
+        for interest in dict.fromkeys(interests):
+            votes[interest] += 1
+            first_seen.setdefault(interest, len(first_seen))
+
+    ranked = sorted(votes, key=lambda interest: (-votes[interest], first_seen[interest]))
+    return ranked[:limit]
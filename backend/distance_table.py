@@ -0,0 +1,188 @@
+"""
+Precomputed distance table between Swedish postcode prefixes.
+
+Swedish postcodes cluster strongly by their 3-digit prefix, so the distance
+between prefix centroids is accurate enough for proximity scoring. Distances
+for every prefix pair are stored as uint16 kilometres in a flat binary file
+that is memory-mapped on load, turning each lookup into a single array index.
+
+Build the table with:
+    python distance_table.py [--gazetteer postcodes.csv]
+"""
+
+import argparse
+import csv
+import logging
+import mmap
+import os
+from array import array
+from typing import Dict, Optional, Tuple
+from config import Config
+from geocoding import get_fallback_coordinates, haversine_distance
+
+logger = logging.getLogger(__name__)
+
+# 3-digit prefixes run from 100 to 999
+PREFIX_MIN = 100
+PREFIX_COUNT = 900
+
+# Marker for pairs where at least one prefix has no known centroid
+UNKNOWN_DISTANCE = 0xFFFF
+
+
+def build_prefix_centroids(
+    gazetteer: Optional[Dict[str, Tuple[float, float]]] = None
+) -> Dict[int, Tuple[float, float]]:
+    """
+    Compute a centroid for every 3-digit postcode prefix.
+
+    Args:
+        gazetteer: Optional dict mapping postcode -> (lat, lng). Prefixes it
+            covers use the mean of their postcodes; all others fall back to
+            FALLBACK_COORDINATES.
+
+    Returns:
+        Dict mapping prefix (100-999) -> (lat, lng)
+    """
+    sums: Dict[int, Tuple[float, float, int]] = {}
+    for postcode, (lat, lng) in (gazetteer or {}).items():
+        postcode = str(postcode).strip()
+        if len(postcode) != 5 or not postcode.isdigit():
+            continue
+        prefix = int(postcode[:3])
+        if prefix < PREFIX_MIN:
+            continue
+        lat_sum, lng_sum, count = sums.get(prefix, (0.0, 0.0, 0))
+        sums[prefix] = (lat_sum + lat, lng_sum + lng, count + 1)
+
+    centroids = {
+        prefix: (lat_sum / count, lng_sum / count)
+        for prefix, (lat_sum, lng_sum, count) in sums.items()
+    }
+
+    for prefix in range(PREFIX_MIN, PREFIX_MIN + PREFIX_COUNT):
+        if prefix not in centroids:
+            coords = get_fallback_coordinates(f"{prefix}00")
+            if coords:
+                centroids[prefix] = coords
+
+    return centroids
+
+
+def build_distance_table(
+    path: str,
+    gazetteer: Optional[Dict[str, Tuple[float, float]]] = None
+) -> None:
+    """
+    Build the prefix distance table and write it to disk.
+
+    Args:
+        path: Output file path
+        gazetteer: Optional dict mapping postcode -> (lat, lng)
+    """
+    centroids = build_prefix_centroids(gazetteer)
+    table = array('H', [UNKNOWN_DISTANCE]) * (PREFIX_COUNT * PREFIX_COUNT)
+
+    for prefix_a, (lat_a, lng_a) in centroids.items():
+        row = (prefix_a - PREFIX_MIN) * PREFIX_COUNT
+        for prefix_b, (lat_b, lng_b) in centroids.items():
+            distance_km = haversine_distance(lat_a, lng_a, lat_b, lng_b)
+            table[row + prefix_b - PREFIX_MIN] = min(round(distance_km), UNKNOWN_DISTANCE - 1)
+
+    # Write to a temporary file first so readers never map a partial table
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        table.tofile(f)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Built distance table for {len(centroids)} postcode prefixes at {path}")
+
+
+class PrefixDistanceTable:
+    """Read-only, memory-mapped view of a prefix distance table."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._distances = memoryview(self._mmap).cast('H')
+
+        if len(self._distances) != PREFIX_COUNT * PREFIX_COUNT:
+            self.close()
+            raise ValueError(f"Distance table {path} has unexpected size")
+
+    def distance_km(self, postcode_a: str, postcode_b: str) -> Optional[int]:
+        """
+        Look up the distance between the prefix centroids of two postcodes.
+
+        Returns:
+            Distance in km, or None if either prefix is unknown
+        """
+        index_a = self._prefix_index(postcode_a)
+        index_b = self._prefix_index(postcode_b)
+        if index_a is None or index_b is None:
+            return None
+
+        distance = self._distances[index_a * PREFIX_COUNT + index_b]
+        return None if distance == UNKNOWN_DISTANCE else distance
+
+    def close(self) -> None:
+        """Release the memory map and file handle."""
+        self._distances.release()
+        self._mmap.close()
+        self._file.close()
+
+    @staticmethod
+    def _prefix_index(postcode: str) -> Optional[int]:
+        prefix = postcode.strip()[:3]
+        if len(prefix) != 3 or not prefix.isdigit() or int(prefix) < PREFIX_MIN:
+            return None
+        return int(prefix) - PREFIX_MIN
+
+
+# Shared table for the whole process (the memory map is read-only)
+_distance_table: Optional[PrefixDistanceTable] = None
+
+
+def get_distance_table() -> Optional[PrefixDistanceTable]:
+    """
+    Get the process-wide distance table, building it on first use if missing.
+
+    Returns:
+        The table, or None if USE_DISTANCE_TABLE is disabled or loading failed
+    """
+    global _distance_table
+    if not Config.USE_DISTANCE_TABLE:
+        return None
+
+    if _distance_table is None:
+        try:
+            if not os.path.exists(Config.DISTANCE_TABLE_PATH):
+                build_distance_table(Config.DISTANCE_TABLE_PATH)
+            _distance_table = PrefixDistanceTable(Config.DISTANCE_TABLE_PATH)
+        except Exception as e:
+            logger.error(f"Failed to load distance table: {e}")
+            return None
+
+    return _distance_table
+
+
+def load_gazetteer(path: str) -> Dict[str, Tuple[float, float]]:
+    """Load a gazetteer CSV with postcode, lat and lng columns."""
+    gazetteer = {}
+    with open(path, 'r') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            gazetteer[row['postcode']] = (float(row['lat']), float(row['lng']))
+    return gazetteer
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Build the postcode-prefix distance table")
+    parser.add_argument('--gazetteer', help="CSV file with postcode, lat and lng columns")
+    parser.add_argument('--output', default=Config.DISTANCE_TABLE_PATH, help="Output file path")
+    args = parser.parse_args()
+
+    build_distance_table(args.output, load_gazetteer(args.gazetteer) if args.gazetteer else None)
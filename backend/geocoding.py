@@ -4,9 +4,12 @@ Uses Nominatim (OpenStreetMap) API for postcode lookups.
 """
 
 import logging
+import math
 import requests
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 from time import sleep
+from caching import LRUTTLCache
+from config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,13 @@ class GeocodingService:
         
         # Cache for postcode lookups to reduce API calls
         self._cache: Dict[str, Optional[Tuple[float, float]]] = {}
+        
+        # Optional tier shared through SQLite, so postcodes the workers resolve
+        # are also cached for in-process matching in the API
+        self._shared: Optional[LRUTTLCache] = None
+        if Config.GEOCODE_CACHE_DB:
+            # self._cache is the in-process tier, so keep only the SQLite tier here
+            self._shared = LRUTTLCache('geocoding', max_size=1, persistent_path=Config.GEOCODE_CACHE_DB)
     
     def geocode_postcodes(self, postcodes: Dict[str, str]) -> Dict[str, Tuple[float, float]]:
         """
@@ -37,6 +47,7 @@ class GeocodingService:
         
         for person_id, postcode in postcodes.items():
             try:
+                cached = self._lookup(postcode)[0]
                 coords = self._geocode_single_postcode(postcode)
                 if coords:
                     results[person_id] = coords
@@ -45,7 +56,8 @@ class GeocodingService:
                     logger.warning(f"Failed to geocode {person_id} ({postcode})")
                 
                 # Be respectful to the API - small delay between requests
-                sleep(0.1)
+                if not cached:
+                    sleep(0.1)
                 
             except Exception as e:
                 logger.error(f"Error geocoding {person_id} ({postcode}): {e}")
@@ -53,19 +65,70 @@ class GeocodingService:
         logger.info(f"Successfully geocoded {len(results)} out of {len(postcodes)} postcodes")
         return results
     
-    def _geocode_single_postcode(self, postcode: str) -> Optional[Tuple[float, float]]:
+    def lookup_cached(self, postcodes: Dict[str, str]) -> Tuple[Dict[str, Tuple[float, float]], List[str]]:
+        """
+        Resolve postcodes from the cache only, without any API calls.
+
+        Args:
+            postcodes: Dict mapping person_id -> postcode
+
+        Returns:
+            Tuple of (person_id -> (lat, lng) for cached postcodes,
+            person_ids whose postcode has never been looked up)
+        """
+        results = {}
+        missing = []
+
+        for person_id, postcode in postcodes.items():
+            found, coords = self._lookup(postcode)
+            if not found:
+                missing.append(person_id)
+            elif coords:
+                results[person_id] = coords
+
+        return results, missing
+
+    def warm_cache(self, postcodes: Iterable[str], refresh: bool = False) -> int:
+        """
+        Resolve every distinct postcode that is not cached yet.
+        
+        Args:
+            postcodes: Postcodes to resolve (duplicates are ignored)
+            refresh: Also re-resolve cached postcodes, including failed lookups. A cached
+                entry is only replaced by a definitive answer, never dropped on an HTTP error.
+            
+        Returns:
+            Number of distinct postcodes now present in the cache
+        """
+        pending = sorted(p for p in {str(p).strip() for p in postcodes} if refresh or not self._lookup(p)[0])
+        logger.info(f"{'Refreshing' if refresh else 'Warming'} geocoding cache with {len(pending)} postcodes")
+        
+        for i, postcode in enumerate(pending, 1):
+            self._geocode_single_postcode(postcode, refresh=refresh)
+            
+            if i % 25 == 0 or i == len(pending):
+                logger.info(f"Geocoding warm-up progress: {i}/{len(pending)}")
+            
+            # Be respectful to the API - small delay between requests
+            sleep(0.1)
+        
+        return len(self._cache)
+    
+    def _geocode_single_postcode(self, postcode: str, refresh: bool = False) -> Optional[Tuple[float, float]]:
         """
         Geocode a single Swedish postcode to coordinates.
         
         Args:
             postcode: 5-digit Swedish postal code
+            refresh: Ask the API even if the postcode is cached
             
         Returns:
             Tuple of (lat, lng) or None if geocoding failed
         """
         # Check cache first
-        if postcode in self._cache:
-            return self._cache[postcode]
+        found, coords = self._lookup(postcode)
+        if found and not refresh:
+            return coords
         
         try:
             # Format postcode for Swedish format (XXXXX -> XXX XX)
@@ -79,7 +142,7 @@ class GeocodingService:
                 'addressdetails': 1
             }
             
-            response = self._session.get(self.base_url, params=params, timeout=10)
+            response = self.session.get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -93,13 +156,13 @@ class GeocodingService:
                     lng = float(result['lon'])
                     
                     coords = (lat, lng)
-                    self._cache[postcode] = coords
+                    self._remember(postcode, coords)
                     return coords
                 else:
                     logger.warning(f"Postcode {postcode} not found in Sweden")
             
             # Cache negative results to avoid repeated lookups
-            self._cache[postcode] = None
+            self._remember(postcode, None)
             return None
             
         except requests.exceptions.RequestException as e:
@@ -112,6 +175,38 @@ class GeocodingService:
             logger.error(f"Unexpected error geocoding {postcode}: {e}")
             return None
 
+    
+    def _lookup(self, postcode: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """Cached result for a postcode as (found, coordinates); coordinates are None for failed lookups."""
+        if postcode in self._cache:
+            return True, self._cache[postcode]
+        
+        if self._shared is not None:
+            entry = self._shared.get(postcode)
+            if entry is not None:
+                coords = tuple(entry['coords']) if entry['coords'] else None
+                self._cache[postcode] = coords
+                return True, coords
+        
+        return False, None
+    
+    def _remember(self, postcode: str, coords: Optional[Tuple[float, float]]) -> None:
+        """Cache a lookup result in process and in the shared tier."""
+        self._cache[postcode] = coords
+        if self._shared is not None:
+            self._shared.set(postcode, {'coords': list(coords) if coords else None})
+
+# Shared service so the postcode cache survives across activity executions
+_geocoding_service: Optional[GeocodingService] = None
+
+
+def get_geocoding_service() -> GeocodingService:
+    """Get the process-wide geocoding service and its cache."""
+    global _geocoding_service
+    if _geocoding_service is None:
+        _geocoding_service = GeocodingService()
+    return _geocoding_service
+
 
 # Fallback coordinates for major Swedish cities (if geocoding fails)
 FALLBACK_COORDINATES = {
@@ -183,3 +278,21 @@ def get_fallback_coordinates(postcode: str) -> Optional[Tuple[float, float]]:
         return FALLBACK_COORDINATES[prefix]
     
     return None
+
+
+def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Calculate the great circle distance between two points on Earth (in km)."""
+    
+    # Convert latitude and longitude from degrees to radians
+    lat1, lng1, lat2, lng2 = map(math.radians, [lat1, lng1, lat2, lng2])
+    
+    # Haversine formula
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    
+    # Radius of earth in kilometers
+    r = 6371
+    
+    return c * r
@@ -0,0 +1,180 @@
+"""
+Local keyword and synonym classifier for CV interests.
+
+Scores every predefined interest from word-boundary keyword hits and turns
+the score into a confidence. When enough interests are found with high
+confidence and few are borderline, the result is used directly and the LLM
+call is skipped; otherwise the LLM remains the slow path.
+"""
+
+import logging
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# interest -> (strong keywords, weak keywords)
+# Strong keywords name the interest outright, weak ones only suggest it
+INTEREST_SYNONYMS: Dict[str, Tuple[List[str], List[str]]] = {
+    'News': (['news', 'journalism', 'journalist'], ['reporter', 'editor', 'newspaper', 'current affairs']),
+    'Sports': (['sports', 'sport', 'football', 'soccer', 'basketball', 'tennis', 'ice hockey', 'athletics'],
+               ['athlete', 'coach', 'golf', 'handball', 'floorball', 'swimming', 'skiing']),
+    'Music': (['music', 'musician', 'guitar', 'piano', 'choir', 'band member'],
+              ['singer', 'singing', 'concerts', 'producer', 'composer', 'drums']),
+    'Dance': (['dance', 'dancing', 'dancer', 'ballet', 'choreography'], ['hip hop', 'salsa']),
+    'Celebrity': (['celebrity', 'celebrities'], ['pop culture', 'red carpet']),
+    'Relationships': (['relationships', 'relationship coaching'], ['dating', 'family therapy']),
+    'Movies & TV': (['movies', 'films', 'film', 'cinema', 'television', 'tv series'],
+                    ['screenwriting', 'film production', 'netflix', 'documentaries']),
+    'Technology': (['technology', 'software', 'programming', 'developer', 'software engineer'],
+                   ['python', 'java', 'javascript', 'cloud', 'backend', 'frontend', 'devops', 'tech']),
+    'Business & Finance': (['business', 'finance', 'banking', 'investment', 'accounting', 'entrepreneur'],
+                           ['economics', 'sales', 'marketing', 'management', 'startup', 'consulting']),
+    'Cryptocurrency': (['cryptocurrency', 'cryptocurrencies', 'crypto', 'bitcoin', 'blockchain'],
+                       ['ethereum', 'web3', 'defi', 'nft']),
+    'Career': (['career development', 'career coaching', 'recruitment', 'recruiter'],
+               ['mentoring', 'mentor', 'networking', 'leadership']),
+    'Gaming': (['gaming', 'video games', 'esports', 'game development', 'game developer'],
+               ['gamer', 'games', 'twitch', 'streamer', 'unity', 'unreal engine']),
+    'Health & Fitness': (['fitness', 'health', 'gym', 'personal trainer', 'nutrition'],
+                         ['running', 'marathon', 'yoga', 'crossfit', 'wellness', 'nurse', 'healthcare']),
+    'Travel': (['travel', 'travelling', 'traveling', 'backpacking'], ['tourism', 'abroad', 'exchange semester']),
+    'Food': (['food', 'cooking', 'chef', 'culinary', 'baking'], ['restaurant', 'gastronomy', 'recipes']),
+    'Beauty': (['beauty', 'makeup', 'cosmetics', 'skincare'], ['hairdresser', 'stylist']),
+    'Fashion': (['fashion', 'fashion design', 'clothing design'], ['clothing', 'textile', 'apparel', 'style']),
+    'Nature & Outdoors': (['nature', 'outdoors', 'hiking', 'climbing', 'camping'],
+                          ['sailing', 'kayaking', 'fishing', 'forest', 'environmental']),
+    'Pets': (['pets', 'dogs', 'cats', 'animal care'], ['veterinary', 'horse riding', 'animals']),
+    'Home & Garden': (['gardening', 'interior design', 'home improvement'], ['garden', 'diy', 'carpentry']),
+    'Art': (['art', 'painting', 'drawing', 'illustration', 'artist'],
+            ['graphic design', 'sculpture', 'gallery', 'photography', 'creative']),
+    'Anime': (['anime', 'manga'], ['cosplay', 'japanese animation']),
+    'Memes': (['memes'], ['internet culture']),
+    'Education': (['education', 'teaching', 'teacher', 'tutor', 'tutoring', 'lecturer'],
+                  ['university', 'professor', 'curriculum', 'pedagogy', 'school']),
+    'Science': (['science', 'scientist', 'research', 'physics', 'chemistry', 'biology'],
+                ['laboratory', 'lab', 'phd', 'experiments', 'astronomy', 'data science']),
+    'Religion': (['religion', 'church', 'theology', 'faith'], ['mosque', 'temple', 'spirituality']),
+    'Shopping': (['shopping'], ['retail', 'e-commerce', 'ecommerce']),
+    'Cars': (['cars', 'automotive', 'motorsport'], ['car mechanic', 'vehicle', 'racing']),
+    'Aviation': (['aviation', 'pilot', 'aerospace', 'aircraft'], ['flight', 'airline', 'drone']),
+    'Motorcycles': (['motorcycles', 'motorcycle', 'motorbike'], ['biker', 'motocross']),
+}
+
+STRONG_WEIGHT = 1.0
+WEAK_WEIGHT = 0.4
+# Hits in a hobbies/interests section count double
+SECTION_BONUS = 2.0
+# Repeated mentions of one keyword stop adding evidence after this many hits
+MAX_HITS_PER_KEYWORD = 3
+
+# Confidence at or above which an interest counts as certain
+CONFIDENT = 0.8
+# Confidence range that makes a CV ambiguous (the LLM should decide)
+BORDERLINE = 0.35
+# Confidence of a single strong mention; such interests are included on the fast path
+MENTIONED = 1 - math.exp(-STRONG_WEIGHT)
+
+_SECTION_HEADING = re.compile(r"^\s*(hobbies|interests|interests and hobbies|fritidsintressen|intressen)\b",
+                              re.IGNORECASE)
+
+
+def _keyword_pattern(keyword: str) -> re.Pattern:
+    return re.compile(r"(?<![\w-])" + re.escape(keyword) + r"(?![\w-])", re.IGNORECASE)
+
+
+class InterestClassifier:
+    """Rule-based CV interest classifier with fast-path statistics."""
+
+    def __init__(self, interests: List[str], confident: float = CONFIDENT, min_interests: int = 3,
+                 max_borderline: int = 2):
+        """
+        Args:
+            interests: The predefined interests (interests without rules are never predicted)
+            confident: Confidence threshold for a certain interest
+            min_interests: Certain interests needed to take the fast path
+            max_borderline: Borderline interests tolerated on the fast path
+        """
+        self.confident = confident
+        self.min_interests = min_interests
+        self.max_borderline = max_borderline
+
+        self._rules = {
+            interest: [(_keyword_pattern(k), STRONG_WEIGHT) for k in INTEREST_SYNONYMS[interest][0]]
+                      + [(_keyword_pattern(k), WEAK_WEIGHT) for k in INTEREST_SYNONYMS[interest][1]]
+            for interest in interests if interest in INTEREST_SYNONYMS
+        }
+
+        self._lock = threading.Lock()
+        self._stats = {'evaluated': 0, 'fast_path': 0}
+
+    def classify(self, cv_text: str) -> List[Tuple[str, float]]:
+        """
+        Score every interest against the CV.
+
+        Returns:
+            List of (interest, confidence) for interests with any evidence, most confident first
+        """
+        body, section = self._split_sections(cv_text)
+        results = []
+
+        for interest, rules in self._rules.items():
+            evidence = 0.0
+            for pattern, weight in rules:
+                hits = min(len(pattern.findall(body)), MAX_HITS_PER_KEYWORD)
+                section_hits = min(len(pattern.findall(section)), MAX_HITS_PER_KEYWORD)
+                evidence += weight * (hits + SECTION_BONUS * section_hits)
+
+            if evidence > 0:
+                results.append((interest, 1 - math.exp(-evidence)))
+
+        results.sort(key=lambda item: -item[1])
+        return results
+
+    def fast_path(self, cv_text: str) -> Optional[List[str]]:
+        """
+        Return up to 8 interests if the classifier is confident enough to skip the LLM, else None.
+        """
+        scored = self.classify(cv_text)
+        certain = [interest for interest, confidence in scored if confidence >= self.confident]
+        borderline = [interest for interest, confidence in scored if BORDERLINE <= confidence < self.confident]
+
+        taken = len(certain) >= self.min_interests and len(borderline) <= self.max_borderline
+
+        with self._lock:
+            self._stats['evaluated'] += 1
+            if taken:
+                self._stats['fast_path'] += 1
+
+        if not taken:
+            return None
+        return [interest for interest, confidence in scored if confidence >= min(MENTIONED, self.confident)][:8]
+
+    def stats(self) -> Dict[str, float]:
+        """Return how often the fast path was taken."""
+        with self._lock:
+            evaluated = self._stats['evaluated']
+            return {
+                **self._stats,
+                'fast_path_rate': self._stats['fast_path'] / evaluated if evaluated else 0.0
+            }
+
+    @staticmethod
+    def _split_sections(cv_text: str) -> Tuple[str, str]:
+        """Split the CV into the main body and its hobbies/interests section."""
+        body, section = [], []
+        in_section = False
+
+        for line in cv_text.splitlines():
+            heading = _SECTION_HEADING.match(line)
+            if heading:
+                in_section = True
+                section.append(line[heading.end():])
+                continue
+            if in_section and not line.strip():
+                in_section = False
+            (section if in_section else body).append(line)
+
+        return '\n'.join(body), '\n'.join(section)
@@ -0,0 +1,284 @@
+"""
+Process-wide pooled LLM client.
+
+Every activity shares one AsyncOpenAI client per event loop, so HTTP
+connections (and their TLS sessions) are kept alive and reused instead of
+being set up again for every LLM call. HTTP/2 is used when the optional
+`h2` package is installed (pip install httpx[http2]).
+
+chat_completion() is the single entry point for LLM calls: it schedules the
+call, walks the model fallback chain and records metrics.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Set, Tuple
+import httpx
+import openai
+from openai import AsyncOpenAI
+from temporalio import activity
+from config import Config
+from llm_scheduler import INTERACTIVE, get_llm_scheduler
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# One pooled client per event loop, with the endpoint configuration it was created for
+_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Tuple[Any, ...], AsyncOpenAI]]' = \
+    weakref.WeakKeyDictionary()
+
+# Replaced clients still being closed; the event loop only keeps weak references to tasks
+_closing: Set[asyncio.Task] = set()
+
+_stats = {'requests': 0, 'connections_opened': 0}
+
+# Errors that hand a request to the next model in the chain (anything else is raised as is)
+FALLBACK_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+# HTTP attempts made by the current chat_completion() call (the client retries internally)
+_attempts: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar('llm_attempts', default=None)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def _trace(event_name: str, info: Dict[str, Any]) -> None:
+    """httpcore trace hook - counts newly opened connections."""
+    if event_name == 'connection.connect_tcp.complete':
+        _stats['connections_opened'] += 1
+
+
+async def _on_request(request: httpx.Request) -> None:
+    _stats['requests'] += 1
+    request.extensions['trace'] = _trace
+    attempts = _attempts.get()
+    if attempts is not None:
+        attempts[0] += 1
+
+
+def _create_client() -> AsyncOpenAI:
+    http2 = Config.LLM_HTTP2 and _http2_available()
+    http_client = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=Config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(Config.LLM_TIMEOUT_SECONDS, connect=Config.LLM_CONNECT_TIMEOUT_SECONDS),
+        event_hooks={'request': [_on_request]},
+    )
+
+    logger.info(f"Created pooled LLM client (http2={http2}, max_connections={Config.LLM_MAX_CONNECTIONS})")
+    return AsyncOpenAI(
+        base_url=Config.OPENROUTER_BASE_URL,
+        api_key=Config.OPENROUTER_API_KEY,
+        http_client=http_client,
+    )
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """
+    Get the shared LLM client for the running event loop, creating it lazily.
+
+    httpx connection pools are bound to the event loop they were created on,
+    so each loop gets its own client. A client whose endpoint configuration
+    changed is closed and replaced. Processes that run requests in short-lived
+    loops (the Flask API) call close_llm_client() before each loop ends.
+    """
+    loop = asyncio.get_running_loop()
+    identity = (Config.OPENROUTER_BASE_URL, Config.OPENROUTER_API_KEY)
+
+    entry = _clients.get(loop)
+    if entry is None or entry[0] != identity:
+        if entry is not None:
+            task = loop.create_task(entry[1].close())
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+        entry = (identity, _create_client())
+        _clients[loop] = entry
+
+    return entry[1]
+
+
+async def close_llm_client() -> None:
+    """
+    Close the running event loop's LLM client and its connection pool, if it has one,
+    and wait for the clients it replaced to finish closing.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _clients.pop(loop, None)
+    if entry is not None:
+        await entry[1].close()
+    await asyncio.gather(*(task for task in list(_closing) if task.get_loop() is loop))
+
+
+def get_llm_client_stats() -> Dict[str, Any]:
+    """Return request and connection counters for the pooled client."""
+    requests = _stats['requests']
+    return {
+        **_stats,
+        'connection_reuse_ratio': 1 - _stats['connections_opened'] / requests if requests else 0.0
+    }
+
+
+def current_activity_name() -> str:
+    """Name of the running activity, used to label metrics."""
+    return activity.info().activity_type if activity.in_activity() else 'none'
+
+
+def _current_flow() -> str:
+    """Workflow the current call belongs to, used for fair queueing."""
+    return activity.info().workflow_id if activity.in_activity() else 'none'
+
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """Upper estimate of a request's tokens: prompt (about 4 characters per token) plus max_tokens."""
+    prompt_chars = sum(len(str(message.get('content', ''))) for message in kwargs.get('messages', []))
+    return prompt_chars // 4 + kwargs.get('max_tokens', 0)
+
+
+def model_chain(primary: str) -> List[str]:
+    """The requested model followed by the configured fallback models, without duplicates."""
+    return list(dict.fromkeys([primary, *Config.LLM_FALLBACK_MODELS]))
+
+
+def latency_budget(model: str, operation: str) -> float:
+    """
+    Seconds a model may take for an operation before the request moves on.
+    
+    The budget is the p95 of the model's recent successful calls for the
+    operation times LLM_BUDGET_P95_MULTIPLIER, clamped to the configured
+    bounds. Failed and abandoned calls are not counted, so a model that slows
+    down keeps its budget and keeps handing requests to the next model.
+    """
+    labels = {'model': model, 'operation': operation, 'outcome': 'success'}
+    observed = metrics.histogram('llm_latency_seconds', **labels)
+    if not observed or observed['count'] < max(Config.LLM_BUDGET_MIN_SAMPLES, 1):
+        return Config.LLM_BUDGET_MAX_SECONDS
+    
+    budget = metrics.quantile('llm_latency_seconds', 0.95, **labels) * Config.LLM_BUDGET_P95_MULTIPLIER
+    return min(max(budget, Config.LLM_BUDGET_MIN_SECONDS), Config.LLM_BUDGET_MAX_SECONDS)
+
+
+async def chat_completion(operation: str, priority: str = INTERACTIVE,
+                          deadline_seconds: Optional[float] = None, **kwargs: Any):
+    """
+    Make a scheduled, instrumented chat completion call through the shared client.
+    
+    The call first waits for a slot in the worker's LLM scheduler, then tries
+    the requested model and each configured fallback model in turn. Every
+    model but the last gets a latency budget derived from its observed p95
+    and no client-side retries; a model that exceeds its budget or fails
+    with a rate limit, server or connection error hands the request to the
+    next one. Latency, prompt/completion tokens, cost, retries and errors are
+    recorded in the metrics registry, labelled by activity, operation and model.
+    
+    Args:
+        operation: Short name of the prompt type (e.g. 'cv_analysis')
+        priority: Scheduler priority class ('interactive' or 'batch')
+        deadline_seconds: How long the caller waits for the call. Each model's budget is
+            capped at an even share of the time left, so a caller's timeout never expires
+            before the fallback models had their turn
+        **kwargs: Arguments for client.chat.completions.create
+        
+    Returns:
+        The chat completion response (its `model` is the model that answered)
+        
+    Raises:
+        LLMOverloadedError: If the scheduler sheds the (batch) call
+    """
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+    chain = model_chain(kwargs.pop('model', Config.LLM_MODEL))
+    scheduler = get_llm_scheduler()
+    estimated_tokens = estimate_request_tokens(kwargs)
+    
+    async with scheduler.slot(priority, estimated_tokens, _current_flow()):
+        response = await _completion_with_fallback(operation, chain, kwargs, deadline)
+    
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        scheduler.adjust_tokens(estimated_tokens - (usage.total_tokens or 0))
+    return response
+
+
+async def _completion_with_fallback(operation: str, chain: List[str], kwargs: Dict[str, Any],
+                                    deadline: Optional[float] = None):
+    activity_name = current_activity_name()
+    
+    for i, model in enumerate(chain[:-1]):
+        labels = {'activity': activity_name, 'operation': operation, 'model': model}
+        budget = latency_budget(model, operation)
+        if deadline is not None:
+            budget = min(budget, max(deadline - time.monotonic(), 0) / (len(chain) - i))
+        try:
+            return await asyncio.wait_for(
+                _instrumented_completion(get_llm_client().with_options(max_retries=0), labels,
+                                         {**kwargs, 'model': model}),
+                budget
+            )
+        except asyncio.TimeoutError:
+            reason = 'budget_exceeded'
+        except FALLBACK_ERRORS as e:
+            reason = type(e).__name__
+        
+        metrics.inc('llm_model_fallbacks_total', reason=reason, **labels)
+        logger.warning(f"LLM model {model} failed for {operation} ({reason}, budget {budget:.1f}s), "
+                       f"falling back to the next model")
+    
+    labels = {'activity': activity_name, 'operation': operation, 'model': chain[-1]}
+    return await _instrumented_completion(get_llm_client(), labels, {**kwargs, 'model': chain[-1]})
+
+
+async def _instrumented_completion(client: AsyncOpenAI, labels: Dict[str, str], kwargs: Dict[str, Any]):
+    attempts = [0]
+    token = _attempts.set(attempts)
+    start = time.perf_counter()
+    outcome = 'cancelled'
+    
+    try:
+        response = await client.chat.completions.create(**kwargs)
+        outcome = 'success'
+    except Exception as e:
+        outcome = 'error'
+        metrics.inc('llm_errors_total', error=type(e).__name__, **labels)
+        raise
+    finally:
+        _attempts.reset(token)
+        metrics.observe('llm_latency_seconds', time.perf_counter() - start, outcome=outcome, **labels)
+        metrics.inc('llm_requests_total', **labels)
+        if attempts[0] > 1:
+            metrics.inc('llm_retries_total', attempts[0] - 1, **labels)
+    
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        metrics.inc('llm_prompt_tokens_total', prompt_tokens, **labels)
+        metrics.inc('llm_completion_tokens_total', completion_tokens, **labels)
+        metrics.inc('llm_cost_usd_total', (prompt_tokens * Config.LLM_PROMPT_COST_PER_1K
+                                           + completion_tokens * Config.LLM_COMPLETION_COST_PER_1K) / 1000, **labels)
+    
+    return response
+
+
+def record_llm_outcome(outcome: str, operation: str, count: int = 1) -> None:
+    """
+    Count a parse failure or fallback for an LLM operation.
+    
+    Args:
+        outcome: 'parse_failure' or 'fallback'
+        operation: Prompt type, as passed to chat_completion()
+        count: Number of items affected
+    """
+    if count:
+        metrics.inc(f'llm_{outcome}s_total', count, activity=current_activity_name(),
+                    operation=operation, model=Config.LLM_MODEL)
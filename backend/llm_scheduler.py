@@ -0,0 +1,222 @@
+"""
+Per-worker LLM request scheduler.
+
+Every LLM call acquires a slot before it is sent upstream. Slots are handed
+out by priority (interactive before batch), round-robin across flows
+(workflows) within a priority so one large job cannot starve the others,
+and within a global concurrency limit and tokens-per-minute budget.
+
+Batch work never uses the slots reserved for interactive calls, and is shed
+with LLMOverloadedError when its queue is full or it has waited too long;
+callers fall back or let Temporal retry the activity later.
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+from config import Config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITIES = (INTERACTIVE, BATCH)
+
+
+class LLMOverloadedError(Exception):
+    """Raised when low-priority LLM work is shed under pressure."""
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    priority: str
+    tokens: int
+    flow: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class LLMScheduler:
+    """Priority and fair-queueing admission control for LLM calls on one event loop."""
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int = 0, interactive_reserved: int = 0,
+                 batch_max_queue: int = 100, batch_max_wait_seconds: float = 30.0):
+        """
+        Args:
+            max_concurrency: Maximum LLM calls in flight
+            tokens_per_minute: Token budget per minute (0 for unlimited)
+            interactive_reserved: Slots batch work may never use
+            batch_max_queue: Queued batch calls beyond this are shed immediately
+            batch_max_wait_seconds: Batch calls waiting longer than this are shed (0 waits forever)
+        """
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.interactive_reserved = min(interactive_reserved, max_concurrency - 1)
+        self.batch_max_queue = batch_max_queue
+        self.batch_max_wait_seconds = batch_max_wait_seconds
+
+        self._queues: Dict[str, 'OrderedDict[str, Deque[_Waiter]]'] = {p: OrderedDict() for p in PRIORITIES}
+        self._running = {p: 0 for p in PRIORITIES}
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    @asynccontextmanager
+    async def slot(self, priority: str, tokens: int, flow: str = 'default') -> AsyncIterator[None]:
+        """Hold a scheduler slot for the duration of one LLM call."""
+        await self.acquire(priority, tokens, flow)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    async def acquire(self, priority: str, tokens: int, flow: str = 'default') -> None:
+        """
+        Wait for a slot.
+
+        Raises:
+            LLMOverloadedError: If batch work is shed
+        """
+        if priority == BATCH and self.queued(BATCH) >= self.batch_max_queue:
+            self._shed(priority, 'queue_full')
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority, tokens, flow)
+        self._queues[priority].setdefault(flow, deque()).append(waiter)
+        self._dispatch()
+
+        timeout = self.batch_max_wait_seconds if priority == BATCH and self.batch_max_wait_seconds > 0 else None
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted at the same moment; hand the slot back
+                self.release(priority)
+            else:
+                waiter.future.cancel()
+                self._discard(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._shed(priority, 'timeout')
+            raise
+
+        metrics.observe('llm_scheduler_wait_seconds', time.monotonic() - waiter.enqueued_at, priority=priority)
+
+    def release(self, priority: str) -> None:
+        """Return a slot and admit the next waiter."""
+        self._running[priority] -= 1
+        self._dispatch()
+
+    def adjust_tokens(self, delta: int) -> None:
+        """Correct the budget once the real token usage of a call is known (positive refunds)."""
+        if self.tokens_per_minute:
+            self._tokens = min(self._tokens + delta, float(self.tokens_per_minute))
+
+    def queued(self, priority: str) -> int:
+        return sum(len(waiters) for waiters in self._queues[priority].values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return running and queued calls per priority and the remaining token budget."""
+        return {
+            'running': dict(self._running),
+            'queued': {p: self.queued(p) for p in PRIORITIES},
+            'tokens_available': round(self._tokens) if self.tokens_per_minute else None,
+        }
+
+    def _shed(self, priority: str, reason: str) -> None:
+        metrics.inc('llm_shed_total', priority=priority, reason=reason)
+        raise LLMOverloadedError(f"LLM {priority} request shed ({reason})")
+
+    def _discard(self, waiter: _Waiter) -> None:
+        waiters = self._queues[waiter.priority].get(waiter.flow)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[waiter.priority][waiter.flow]
+
+    def _refill(self) -> None:
+        if not self.tokens_per_minute:
+            return
+        now = time.monotonic()
+        self._tokens = min(float(self.tokens_per_minute),
+                           self._tokens + (now - self._refilled_at) * self.tokens_per_minute / 60)
+        self._refilled_at = now
+
+    def _capacity(self, priority: str) -> int:
+        limit = self.max_concurrency - (self.interactive_reserved if priority == BATCH else 0)
+        return limit - sum(self._running.values())
+
+    def _dispatch(self) -> None:
+        """Admit waiters in priority order while slots and tokens are available."""
+        self._refill()
+
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self._capacity(priority) > 0:
+                flow, waiters = next(iter(queue.items()))
+                waiter = waiters[0]
+
+                if waiter.future.done():
+                    waiters.popleft()
+                elif self.tokens_per_minute and self._tokens < min(waiter.tokens, self.tokens_per_minute):
+                    # Strict priority: nothing overtakes the head waiter while the budget refills
+                    self._schedule_wakeup((waiter.tokens - self._tokens) * 60 / self.tokens_per_minute)
+                    return
+                else:
+                    waiters.popleft()
+                    self._tokens -= waiter.tokens if self.tokens_per_minute else 0
+                    self._running[priority] += 1
+                    waiter.future.set_result(None)
+
+                # Round-robin: the served flow goes to the back of the line
+                if waiters:
+                    queue.move_to_end(flow)
+                else:
+                    del queue[flow]
+
+            if queue:
+                # Higher priority work is waiting for a slot; don't let lower priorities in
+                return
+
+    def _schedule_wakeup(self, delay: float) -> None:
+        if self._wakeup is not None and not self._wakeup.cancelled():
+            self._wakeup.cancel()
+
+        def wakeup():
+            self._wakeup = None
+            self._dispatch()
+
+        self._wakeup = asyncio.get_running_loop().call_later(max(delay, 0.001), wakeup)
+
+
+# One scheduler per event loop, with the configuration it was created for
+_schedulers: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Tuple[Any, ...], LLMScheduler]]' = \
+    weakref.WeakKeyDictionary()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """
+    Get the worker's LLM scheduler, creating it lazily.
+
+    Like the pooled client, the scheduler is bound to the running event loop:
+    each loop gets its own, recreated if the scheduler configuration changes.
+    It holds no connections, so it is dropped along with its loop.
+    """
+    identity = (
+        Config.LLM_MAX_CONCURRENCY,
+        Config.LLM_TOKENS_PER_MINUTE,
+        Config.LLM_INTERACTIVE_RESERVED,
+        Config.LLM_BATCH_MAX_QUEUE,
+        Config.LLM_BATCH_MAX_WAIT_SECONDS,
+    )
+    loop = asyncio.get_running_loop()
+    entry = _schedulers.get(loop)
+    if entry is None or entry[0] != identity:
+        entry = (identity, LLMScheduler(*identity))
+        _schedulers[loop] = entry
+
+    return entry[1]
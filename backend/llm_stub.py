@@ -0,0 +1,313 @@
+"""
+Local OpenAI-compatible chat completions stub for offline testing and load tests.
+
+Serves POST /v1/chat/completions with deterministic answers for the CV
+analysis and match reasoning prompts used in activities.py, with
+configurable latency distributions, error injection and token accounting.
+
+Run standalone:
+    python llm_stub.py --port 8089 --latency-ms 300 --jitter-ms 100 --error-rate 0.02
+
+Then point the backend at it:
+    OPENROUTER_BASE_URL=http://127.0.0.1:8089/v1
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Response latency distribution.
+
+    distribution is one of:
+        fixed     - always mean_ms
+        uniform   - uniform in [mean_ms - jitter_ms, mean_ms + jitter_ms]
+        lognormal - lognormal with median mean_ms and a long tail set by jitter_ms
+    """
+    mean_ms: float = 0.0
+    jitter_ms: float = 0.0
+    distribution: str = 'fixed'
+
+    def sample(self, rng: random.Random) -> float:
+        """Sample a latency in seconds."""
+        if self.distribution == 'uniform':
+            latency_ms = rng.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms)
+        elif self.distribution == 'lognormal' and self.mean_ms > 0:
+            sigma = math.log1p(self.jitter_ms / self.mean_ms)
+            latency_ms = rng.lognormvariate(math.log(self.mean_ms), sigma)
+        else:
+            latency_ms = self.mean_ms
+        return max(latency_ms, 0.0) / 1000
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def default_response(prompt: str) -> str:
+    """Deterministic answers for the prompts used by the backend."""
+
+    # CV analysis: pick the predefined interests mentioned in the CV
+    if 'PREDEFINED INTERESTS LIST:' in prompt and 'CV TEXT:' in prompt:
+        interests_text = prompt.split('PREDEFINED INTERESTS LIST:', 1)[1].split('CV TEXT:', 1)[0]
+        interests = [i.strip() for i in interests_text.strip().split(', ') if i.strip()]
+        cv_text = prompt.split('CV TEXT:', 1)[1].lower()
+        matched = [i for i in interests if i.lower() in cv_text][:8]
+        return json.dumps(matched or interests[:3])
+
+    # Per-mentor reasoning snippet
+    if '"summary"' in prompt and '"offer"' in prompt:
+        name = re.search(r"^Name: (\S*)", prompt, re.MULTILINE)
+        first_name = name.group(1) if name and name.group(1) else 'This mentor'
+        return json.dumps({
+            "summary": f"{first_name} brings years of hands-on experience and loves sharing it.",
+            "offer": "turn your interests into concrete next steps"
+        })
+
+    # Batched match reasoning: one entry per mentor id
+    mentor_ids = re.findall(r"^Mentor ID: (\S+)$", prompt, re.MULTILINE)
+    if mentor_ids:
+        names = re.findall(r"^Name: (.*)$", prompt, re.MULTILINE)
+        return json.dumps([
+            {"mentor_id": mentor_id, "reasoning": f"{name or 'This mentor'} is a strong fit for your goals."}
+            for mentor_id, name in zip(mentor_ids, names + [''] * len(mentor_ids))
+        ])
+
+    # Per-mentor match reasoning
+    name = re.search(r"^Name: (.*)$", prompt, re.MULTILINE)
+    if name:
+        return f"{name.group(1) or 'This mentor'} shares your interests and can help you explore your goals."
+
+    return "OK"
+
+
+class LLMStubServer:
+    """Threaded OpenAI-compatible chat completions server."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: Optional[LatencyProfile] = None,
+                 model_latency: Optional[Dict[str, LatencyProfile]] = None,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 responder: Callable[[str], str] = default_response, seed: int = 0):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Default latency profile
+            model_latency: Per-model latency profiles, overriding the default
+            error_rate: Fraction of requests answered with HTTP 500
+            rate_limit_rate: Fraction of requests answered with HTTP 429
+            responder: Function mapping the last user message to the completion text
+            seed: Seed for latency and error sampling
+        """
+        self.latency = latency or LatencyProfile()
+        self.model_latency = model_latency or {}
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.responder = responder
+
+        self.requests: List[Dict[str, Any]] = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {}
+        self.reset_stats()
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'LLMStubServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'LLMStubServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request, error and token counters."""
+        with self._lock:
+            return {**self._stats, 'by_model': {k: dict(v) for k, v in self._stats['by_model'].items()}}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self._stats = {
+                'requests': 0, 'errors': 0, 'rate_limited': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0, 'by_model': {}
+            }
+
+    def _plan(self, model: str) -> Tuple[float, int]:
+        """Decide the latency and outcome of one request."""
+        with self._lock:
+            profile = self.model_latency.get(model, self.latency)
+            delay = profile.sample(self._rng)
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            return delay, 500
+        if roll < self.error_rate + self.rate_limit_rate:
+            return delay, 429
+        return delay, 200
+
+    def _record(self, body: Dict[str, Any], status: int, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.requests.append(body)
+            model_stats = self._stats['by_model'].setdefault(
+                body.get('model', ''), {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+            )
+            self._stats['requests'] += 1
+            model_stats['requests'] += 1
+            if status == 500:
+                self._stats['errors'] += 1
+            elif status == 429:
+                self._stats['rate_limited'] += 1
+            else:
+                self._stats['prompt_tokens'] += prompt_tokens
+                self._stats['completion_tokens'] += completion_tokens
+                model_stats['prompt_tokens'] += prompt_tokens
+                model_stats['completion_tokens'] += completion_tokens
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive like a real API endpoint
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/stats'):
+                    self._send(200, stub.stats())
+                else:
+                    self._send(404, {"error": {"message": "Not found"}})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+                if self.path.rstrip('/').endswith('/reset'):
+                    stub.reset_stats()
+                    self._send(200, {"status": "reset"})
+                    return
+
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send(404, {"error": {"message": "Not found"}})
+                    return
+
+                model = body.get('model', '')
+                delay, status = stub._plan(model)
+                time.sleep(delay)
+
+                messages = body.get('messages') or [{}]
+                prompt = "\n".join(str(m.get('content', '')) for m in messages)
+                prompt_tokens = estimate_tokens(prompt)
+
+                if status != 200:
+                    stub._record(body, status, prompt_tokens, 0)
+                    message = "Rate limit exceeded" if status == 429 else "Injected upstream error"
+                    self._send(status, {"error": {"message": message, "code": status}})
+                    return
+
+                content = stub.responder(str(messages[-1].get('content', '')))
+                completion_tokens = estimate_tokens(content)
+                stub._record(body, status, prompt_tokens, completion_tokens)
+
+                self._send(200, {
+                    "id": f"chatcmpl-stub-{stub._stats['requests']}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens
+                    }
+                })
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                try:
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the request (e.g. a fallback budget ran out)
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def parse_model_latency(values: List[str], distribution: str) -> Dict[str, LatencyProfile]:
+    """Parse --model-latency entries of the form model=mean_ms[:jitter_ms]."""
+    profiles = {}
+    for value in values:
+        model, timing = value.rsplit('=', 1)
+        mean_ms, _, jitter_ms = timing.partition(':')
+        profiles[model] = LatencyProfile(float(mean_ms), float(jitter_ms or 0), distribution)
+    return profiles
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible LLM stub server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Median response latency")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Latency spread")
+    parser.add_argument('--distribution', choices=['fixed', 'uniform', 'lognormal'], default='fixed')
+    parser.add_argument('--model-latency', action='append', default=[],
+                        help="Per-model latency as model=mean_ms[:jitter_ms] (repeatable)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of HTTP 429 responses")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stub = LLMStubServer(
+        host=args.host,
+        port=args.port,
+        latency=LatencyProfile(args.latency_ms, args.jitter_ms, args.distribution),
+        model_latency=parse_model_latency(args.model_latency, args.distribution),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    print(f"LLM stub listening on {stub.base_url} (GET {stub.base_url}/stats for counters)")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
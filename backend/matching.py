@@ -3,9 +3,13 @@ Matching algorithm for connecting students with mentors.
 Implements multi-criteria scoring based on interests, languages, education, meeting preferences, and location.
 """
 
-import math
+import bisect
+import heapq
+import re
 import logging
 from typing import List, Dict, Any, Tuple, Optional
+from geocoding import haversine_distance
+from distance_table import PrefixDistanceTable
 
 logger = logging.getLogger(__name__)
 
@@ -26,8 +30,84 @@ class MatchingScorer:
     # Maximum distance for bonus scoring (km)
     MAX_DISTANCE_BONUS = 50
     
-    def __init__(self):
-        self.available_interests = self._load_available_interests()
+    # Map subjects to relevant keywords/skills
+    SUBJECT_KEYWORDS = {
+        '🔢 Mathematics': ['math', 'mathematics', 'statistics', 'data', 'analysis', 'finance', 'engineering'],
+        '🔬 Science': ['science', 'research', 'biology', 'chemistry', 'physics', 'lab', 'environmental'],
+        '💻 Technology': ['technology', 'tech', 'software', 'programming', 'coding', 'computer', 'it', 'web', 'app'],
+        '⚙️ Engineering': ['engineering', 'engineer', 'mechanical', 'civil', 'design', 'cad', 'technical'],
+        '📖 English': ['english', 'writing', 'communication', 'literature', 'language'],
+        '📜 History': ['history', 'historical', 'culture', 'social'],
+        '🌍 Geography': ['geography', 'travel', 'global', 'world', 'maps', 'culture'],
+        '🎨 Art': ['art', 'design', 'creative', 'visual', 'graphic', 'drawing', 'painting'],
+        '🎵 Music': ['music', 'audio', 'sound', 'musician', 'production', 'producer'],
+        '🏃 Physical Education': ['sports', 'fitness', 'athletics', 'coaching', 'physical', 'training']
+    }
+    
+    # Career/field keywords - specific career interests
+    CAREER_KEYWORDS = {
+        'software': ['software', 'programmer', 'developer', 'coding', 'engineering'],
+        'data': ['data', 'analytics', 'statistics', 'machine learning', 'ai'],
+        'business': ['business', 'entrepreneur', 'management', 'finance', 'marketing'],
+        'design': ['design', 'creative', 'ux', 'ui', 'graphic', 'art'],
+        'music': ['music', 'musician', 'producer', 'artist', 'singer', 'band'],
+        'gaming': ['game', 'gaming', 'esports', 'streamer', 'developer'],
+        'science': ['scientist', 'research', 'biology', 'chemistry', 'physics', 'lab'],
+        'medical': ['doctor', 'medicine', 'healthcare', 'nurse', 'medical'],
+        'teaching': ['teacher', 'education', 'teaching', 'professor', 'tutor'],
+        'sports': ['sports', 'athlete', 'coach', 'fitness', 'trainer'],
+        'engineering': ['engineer', 'mechanical', 'civil', 'automotive', 'technical'],
+        'fashion': ['fashion', 'designer', 'style', 'clothing', 'beauty'],
+        'food': ['chef', 'cooking', 'culinary', 'restaurant', 'food'],
+        'aviation': ['pilot', 'aviation', 'flight', 'aerospace'],
+        'content': ['content', 'creator', 'influencer', 'social media', 'youtube'],
+        'crypto': ['crypto', 'blockchain', 'bitcoin', 'cryptocurrency']
+    }
+    
+    # Personal interest keywords - hobbies and interests
+    INTEREST_KEYWORDS = [
+        'taylor swift', 'music', 'gaming', 'games', 'sports', 'travel',
+        'photography', 'art', 'reading', 'books', 'movies', 'cooking',
+        'fashion', 'fitness', 'nature', 'animals', 'pets', 'technology'
+    ]
+    
+    # Shared across scorer instances, filled lazily or by warm_up()
+    _interests_cache: Optional[List[str]] = None
+    _career_patterns: Optional[Dict[str, re.Pattern]] = None
+    
+    # Distance score used when coordinates are missing or location is irrelevant
+    NO_LOCATION_SCORE = 90
+    
+    def __init__(self, distance_table: Optional[PrefixDistanceTable] = None):
+        self._available_interests: Optional[List[str]] = None
+        # Optional postcode-prefix distance lookup used instead of haversine
+        self.distance_table = distance_table
+    
+    @property
+    def available_interests(self) -> List[str]:
+        """Available interests, loaded from CSV on first access."""
+        if self._available_interests is None:
+            if MatchingScorer._interests_cache is None:
+                MatchingScorer._interests_cache = self._load_available_interests()
+            self._available_interests = MatchingScorer._interests_cache
+        return self._available_interests
+    
+    @classmethod
+    def warm_up(cls) -> None:
+        """Load the interest list and compile the keyword matchers ahead of the first match."""
+        if cls._interests_cache is None:
+            cls._interests_cache = cls()._load_available_interests()
+        cls._get_career_patterns()
+    
+    @classmethod
+    def _get_career_patterns(cls) -> Dict[str, re.Pattern]:
+        """Compile one alternation per career group (equivalent to any(keyword in text))."""
+        if cls._career_patterns is None:
+            cls._career_patterns = {
+                career_type: re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+                for career_type, keywords in cls.CAREER_KEYWORDS.items()
+            }
+        return cls._career_patterns
     
     def _load_available_interests(self) -> List[str]:
         """Load available interests from CSV file."""
@@ -63,12 +143,48 @@ class MatchingScorer:
         Returns:
             List of matches with mentor_id and score, sorted by score descending
         """
+        return self.combine_scores(student, mentors, self.calculate_base_scores(student, mentors), coordinates)
+    
+    def calculate_base_scores(self, student: Dict[str, Any], mentors: List[Dict[str, Any]]) -> Dict[str, float]:
+        """
+        Score every component except distance, which needs no coordinates.
+        
+        Returns:
+            Dict mapping mentor_id -> partial score (0-95) for mentors passing the hard filters
+        """
+        base_scores = {}
+        for mentor in mentors:
+            base_score = self._calculate_base_score(student, mentor)
+            if base_score is not None:
+                base_scores[mentor['id']] = base_score
+        return base_scores
+    
+    def combine_scores(self, student: Dict[str, Any], mentors: List[Dict[str, Any]],
+                       base_scores: Dict[str, float],
+                       coordinates: Dict[str, Tuple[float, float]]) -> List[Dict[str, Any]]:
+        """
+        Add the distance component to precomputed base scores.
+        
+        Args:
+            student: Student profile dictionary
+            mentors: List of mentor profile dictionaries
+            base_scores: Base scores from calculate_base_scores
+            coordinates: Dict mapping person_id -> (lat, lng) coordinates
+            
+        Returns:
+            List of matches with mentor_id and score, sorted by score descending
+            (identical to calculate_matches)
+        """
         matches = []
         student_coords = coordinates.get('student')
         
         for mentor in mentors:
-            score = self._calculate_single_match(student, mentor, student_coords, 
-                                               coordinates.get(mentor['id']))
+            base_score = base_scores.get(mentor['id'])
+            if base_score is None:
+                continue
+            
+            score = self._add_distance_score(base_score, student, mentor, student_coords,
+                                             coordinates.get(mentor['id']))
             
             if score > 0:  # Only include matches with some compatibility
                 matches.append({
@@ -87,9 +203,38 @@ class MatchingScorer:
                                mentor_coords: Optional[Tuple[float, float]]) -> int:
         """Calculate matching score between a student and single mentor."""
         
+        base_score = self._calculate_base_score(student, mentor)
+        if base_score is None:
+            return 0
+        
+        return self._add_distance_score(base_score, student, mentor, student_coords, mentor_coords)
+    
+    def _add_distance_score(self, base_score: float, student: Dict[str, Any], mentor: Dict[str, Any],
+                            student_coords: Optional[Tuple[float, float]],
+                            mentor_coords: Optional[Tuple[float, float]]) -> int:
+        """Add the weighted distance component to a base score."""
+        
+        # Distance score (5%) - only relevant when the pair could meet in person
+        if self.location_matters(student, mentor):
+            distance_score = self._calculate_distance_score(student_coords, mentor_coords,
+                                                            str(student.get('postcode', '')),
+                                                            str(mentor.get('postcode', '')))
+        else:
+            distance_score = self.NO_LOCATION_SCORE
+        
+        return round(base_score + distance_score * (self.WEIGHTS['distance'] / 100))
+    
+    def _calculate_base_score(self, student: Dict[str, Any], mentor: Dict[str, Any]) -> Optional[float]:
+        """
+        Calculate the weighted score of every component except distance.
+        
+        Returns:
+            Partial score (0-95), or None if the pair fails the hard filters
+        """
+        
         # Hard compatibility filters
         if not self._check_hard_filters(student, mentor):
-            return 0
+            return None
         
         total_score = 0
         
@@ -109,10 +254,6 @@ class MatchingScorer:
         meeting_score = self._calculate_meeting_score(student, mentor)
         total_score += meeting_score * (self.WEIGHTS['meeting_pref'] / 100)
         
-        # Distance score (5%)
-        distance_score = self._calculate_distance_score(student_coords, mentor_coords)
-        total_score += distance_score * (self.WEIGHTS['distance'] / 100)
-        
         # Subject compatibility score (15%)
         subject_score = self._calculate_subject_score(student, mentor)
         total_score += subject_score * (self.WEIGHTS['subjects'] / 100)
@@ -121,7 +262,169 @@ class MatchingScorer:
         bio_goals_score = self._calculate_bio_goals_score(student, mentor)
         total_score += bio_goals_score * (self.WEIGHTS['bio_goals'] / 100)
         
-        return round(total_score)
+        return total_score
+    
+    @staticmethod
+    def location_matters(student: Dict[str, Any], mentor: Dict[str, Any]) -> bool:
+        """
+        Check whether distance is relevant for a pair.
+        
+        If either side only meets online the pair will never meet in person,
+        so the distance component is fixed at NO_LOCATION_SCORE and no coordinates
+        are needed. This includes online-only mentors of students open to both:
+        their distance used to be scored whenever both postcodes geocoded.
+        """
+        student_pref = student.get('meeting_preference', '').lower()
+        mentor_pref = mentor.get('meeting_preference', '').lower()
+        return student_pref != 'online' and mentor_pref != 'online'
+    
+    def explain(self, student: Dict[str, Any], mentor: Dict[str, Any],
+                student_coords: Optional[Tuple[float, float]] = None,
+                mentor_coords: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+        """
+        Collect the evidence behind a pair's score, for template reasoning.
+        
+        Returns:
+            Dict with shared_interests, career_groups, subjects, shared_languages,
+            distance_km and distance_band ('online', 'nearby', 'local', 'regional', 'far' or None)
+        """
+        mentor_interests = set(mentor.get('interests', []))
+        mentor_languages = set(mentor.get('languages', []))
+        
+        distance_km = None
+        if self.location_matters(student, mentor):
+            distance_km = self._pair_distance_km(student_coords, mentor_coords,
+                                                 str(student.get('postcode', '')),
+                                                 str(mentor.get('postcode', '')))
+            distance_band = self.distance_band(distance_km) if distance_km is not None else None
+        else:
+            distance_band = 'online'
+        
+        return {
+            'shared_interests': [i for i in student.get('interests', []) if i in mentor_interests],
+            'career_groups': self._career_matches(*self._profile_texts(student, mentor)),
+            'subjects': [subject for subject, _ in self._subject_matches(student, mentor)],
+            'shared_languages': [l for l in student.get('languages', []) if l in mentor_languages],
+            'distance_km': round(distance_km, 1) if distance_km is not None else None,
+            'distance_band': distance_band
+        }
+    
+    def distance_band(self, distance_km: float) -> str:
+        """Describe a distance in the same bands the distance score uses."""
+        if distance_km <= 5:
+            return 'nearby'
+        if distance_km <= self.MAX_DISTANCE_BONUS / 2:
+            return 'local'
+        if distance_km <= self.MAX_DISTANCE_BONUS:
+            return 'regional'
+        return 'far'
+    
+    def select_location_candidates(self, student: Dict[str, Any], mentors: List[Dict[str, Any]],
+                                   top_k: int, base_scores: Optional[Dict[str, float]] = None) -> List[str]:
+        """
+        Select the mentors whose coordinates could still change the top-K ordering.
+        
+        The distance component contributes between 20 and 100 points scaled by its
+        weight. Every other component is scored up front; a mentor only needs
+        geocoding if location matters for the pair and its best possible score
+        can still reach the K-th best guaranteed score.
+        
+        Args:
+            student: Student profile dictionary
+            mentors: List of mentor profile dictionaries
+            top_k: Number of top matches whose ordering must be exact
+            base_scores: Precomputed calculate_base_scores result (computed if omitted)
+            
+        Returns:
+            List of mentor ids that need coordinates (empty if geocoding can be skipped)
+        """
+        if student.get('meeting_preference', '').lower() == 'online':
+            return []
+        
+        return merge_location_candidates([self.location_bounds(student, mentors, top_k, base_scores)], top_k)
+    
+    def location_bounds(self, student: Dict[str, Any], mentors: List[Dict[str, Any]],
+                        top_k: int, base_scores: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Summarize the score bounds of a roster, or one shard of it, for merge_location_candidates.
+        
+        Returns:
+            {"count": mentors passing the hard filters, "lower_bounds": the top_k best lower bounds
+            (descending), "candidates": [[mentor_id, upper bound], ...]} where candidates are the
+            in-person mentors that can reach this shard's K-th best lower bound, a superset of
+            the ones that can reach the whole roster's
+        """
+        bounds = self._score_bounds(student, mentors, base_scores)
+        lower_bounds = heapq.nlargest(top_k, (lower for _, lower, _, _ in bounds))
+        threshold = _location_threshold(len(bounds), lower_bounds, top_k)
+        
+        return {
+            'count': len(bounds),
+            'lower_bounds': lower_bounds,
+            'candidates': [[mentor_id, upper] for mentor_id, _, upper, matters in bounds
+                           if matters and upper >= threshold]
+        }
+    
+    def settled_top_matches(self, student: Dict[str, Any], mentors: List[Dict[str, Any]],
+                            top_k: int, base_scores: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+        """
+        Find the top-K matches that coordinates can no longer change.
+        
+        A mentor is settled when location does not matter for the pair, so its
+        final score is already known, and fewer than K other mentors can reach
+        a higher rank whatever their distance turns out to be (ties rank in
+        roster order, as in calculate_matches).
+        
+        Args:
+            student: Student profile dictionary
+            mentors: List of mentor profile dictionaries
+            top_k: Number of top matches
+            base_scores: Precomputed calculate_base_scores result (computed if omitted)
+            
+        Returns:
+            Settled matches with mentor_id and their final score, in roster order
+        """
+        bounds = [(mentor_id, round(lower), round(upper), matters)
+                  for mentor_id, lower, upper, matters in self._score_bounds(student, mentors, base_scores)]
+        upper_bounds = sorted(upper for _, _, upper, _ in bounds)
+        
+        settled = []
+        upper_seen: Dict[int, int] = {}
+        for mentor_id, score, upper, matters in bounds:
+            if not matters:
+                # Mentors that can score higher, plus earlier mentors that can tie
+                ahead = len(upper_bounds) - bisect.bisect_right(upper_bounds, score) + upper_seen.get(score, 0)
+                if ahead < top_k:
+                    settled.append({'mentor_id': mentor_id, 'score': score})
+            upper_seen[upper] = upper_seen.get(upper, 0) + 1
+        return settled
+    
+    def _score_bounds(self, student: Dict[str, Any], mentors: List[Dict[str, Any]],
+                      base_scores: Optional[Dict[str, float]] = None) -> List[Tuple[str, float, float, bool]]:
+        """
+        Lowest and highest possible final score of every mentor passing the hard filters.
+        
+        Returns:
+            List of (mentor_id, lower bound, upper bound, location matters) in roster order
+        """
+        if base_scores is None:
+            base_scores = self.calculate_base_scores(student, mentors)
+        
+        weight = self.WEIGHTS['distance'] / 100
+        fixed_distance = self.NO_LOCATION_SCORE * weight
+        min_distance, max_distance = 20 * weight, 100 * weight
+        
+        bounds = []
+        for mentor in mentors:
+            base_score = base_scores.get(mentor['id'])
+            if base_score is None:
+                continue
+            
+            if self.location_matters(student, mentor):
+                bounds.append((mentor['id'], base_score + min_distance, base_score + max_distance, True))
+            else:
+                bounds.append((mentor['id'], base_score + fixed_distance, base_score + fixed_distance, False))
+        return bounds
     
     def _check_hard_filters(self, student: Dict[str, Any], mentor: Dict[str, Any]) -> bool:
         """Check if student and mentor pass hard compatibility filters."""
@@ -237,97 +540,100 @@ class MatchingScorer:
         return 85
     
     def _calculate_distance_score(self, student_coords: Optional[Tuple[float, float]], 
-                                mentor_coords: Optional[Tuple[float, float]]) -> float:
+                                mentor_coords: Optional[Tuple[float, float]],
+                                student_postcode: Optional[str] = None,
+                                mentor_postcode: Optional[str] = None) -> float:
         """Calculate score based on geographic proximity (0-100)."""
         
-        if not student_coords or not mentor_coords:
-            # No location data available - give high score
-            return 90
-        
         try:
-            distance_km = self._calculate_haversine_distance(
-                student_coords[0], student_coords[1],
-                mentor_coords[0], mentor_coords[1]
-            )
-            
-            # Very close (< 5km) gets full score
-            if distance_km <= 5:
-                return 100
-            
-            # Linear decay up to MAX_DISTANCE_BONUS
-            if distance_km <= self.MAX_DISTANCE_BONUS:
-                return 100 - (distance_km / self.MAX_DISTANCE_BONUS) * 80
-            
-            # Far distance gets minimal score
-            return 20
-            
+            distance_km = self._pair_distance_km(student_coords, mentor_coords,
+                                                 student_postcode, mentor_postcode)
         except Exception as e:
             logger.error(f"Error calculating distance: {e}")
             return 50
+        
+        if distance_km is None:
+            # No location data available - give high score
+            return self.NO_LOCATION_SCORE
+        
+        return self._distance_to_score(distance_km)
     
-    def _calculate_haversine_distance(self, lat1: float, lng1: float, 
-                                    lat2: float, lng2: float) -> float:
-        """Calculate the great circle distance between two points on Earth (in km)."""
+    def _pair_distance_km(self, student_coords: Optional[Tuple[float, float]],
+                          mentor_coords: Optional[Tuple[float, float]],
+                          student_postcode: Optional[str] = None,
+                          mentor_postcode: Optional[str] = None) -> Optional[float]:
+        """Distance between a pair in km, or None if there is no location data."""
+        
+        # Prefer the precomputed prefix table - a single array lookup, no trig
+        if self.distance_table and student_postcode and mentor_postcode:
+            distance_km = self.distance_table.distance_km(student_postcode, mentor_postcode)
+            if distance_km is not None:
+                return distance_km
+        
+        if not student_coords or not mentor_coords:
+            return None
         
-        # Convert latitude and longitude from degrees to radians
-        lat1, lng1, lat2, lng2 = map(math.radians, [lat1, lng1, lat2, lng2])
+        return self._calculate_haversine_distance(
+            student_coords[0], student_coords[1],
+            mentor_coords[0], mentor_coords[1]
+        )
+    
+    def _distance_to_score(self, distance_km: float) -> float:
+        """Convert a distance in km to a proximity score (0-100)."""
         
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlng = lng2 - lng1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng/2)**2
-        c = 2 * math.asin(math.sqrt(a))
+        # Very close (< 5km) gets full score
+        if distance_km <= 5:
+            return 100
         
-        # Radius of earth in kilometers
-        r = 6371
+        # Linear decay up to MAX_DISTANCE_BONUS
+        if distance_km <= self.MAX_DISTANCE_BONUS:
+            return 100 - (distance_km / self.MAX_DISTANCE_BONUS) * 80
         
-        return c * r
+        # Far distance gets minimal score
+        return 20
+    
+    def _calculate_haversine_distance(self, lat1: float, lng1: float, 
+                                    lat2: float, lng2: float) -> float:
+        """Calculate the great circle distance between two points on Earth (in km)."""
+        return haversine_distance(lat1, lng1, lat2, lng2)
     
     def _calculate_subject_score(self, student: Dict[str, Any], mentor: Dict[str, Any]) -> float:
         """Calculate score based on subject alignment with mentor's skills (0-100)."""
         
-        student_subjects = student.get('subjects', [])
-        mentor_skills = mentor.get('skills', [])
-        mentor_bio = mentor.get('bio', '').lower()
-        
-        if not student_subjects:
+        if not student.get('subjects', []):
             return 85  # Generous default if no subjects specified
         
         score = 85  # Start with good baseline
         
-        # Map subjects to relevant keywords/skills
-        subject_keywords = {
-            '🔢 Mathematics': ['math', 'mathematics', 'statistics', 'data', 'analysis', 'finance', 'engineering'],
-            '🔬 Science': ['science', 'research', 'biology', 'chemistry', 'physics', 'lab', 'environmental'],
-            '💻 Technology': ['technology', 'tech', 'software', 'programming', 'coding', 'computer', 'it', 'web', 'app'],
-            '⚙️ Engineering': ['engineering', 'engineer', 'mechanical', 'civil', 'design', 'cad', 'technical'],
-            '📖 English': ['english', 'writing', 'communication', 'literature', 'language'],
-            '📜 History': ['history', 'historical', 'culture', 'social'],
-            '🌍 Geography': ['geography', 'travel', 'global', 'world', 'maps', 'culture'],
-            '🎨 Art': ['art', 'design', 'creative', 'visual', 'graphic', 'drawing', 'painting'],
-            '🎵 Music': ['music', 'audio', 'sound', 'musician', 'production', 'producer'],
-            '🏃 Physical Education': ['sports', 'fitness', 'athletics', 'coaching', 'physical', 'training']
-        }
+        matches = sum(weight for _, weight in self._subject_matches(student, mentor))
+        
+        if matches > 0:
+            # Bonus for subject alignment
+            bonus = min(matches * 10, 15)
+            score = min(score + bonus, 100)
+        
+        return score
+    
+    def _subject_matches(self, student: Dict[str, Any], mentor: Dict[str, Any]) -> List[Tuple[str, float]]:
+        """List the student's subjects that the mentor's skills (1.0) or bio (0.7) relate to."""
         
-        matches = 0
-        for subject in student_subjects:
-            keywords = subject_keywords.get(subject, [])
+        mentor_skills = mentor.get('skills', [])
+        mentor_bio = mentor.get('bio', '').lower()
+        
+        matches = []
+        for subject in student.get('subjects', []):
+            keywords = self.SUBJECT_KEYWORDS.get(subject, [])
             
             # Check if mentor's skills or bio mention related keywords
             for keyword in keywords:
                 if any(keyword in skill.lower() for skill in mentor_skills):
-                    matches += 1
+                    matches.append((subject, 1))
                     break
                 elif keyword in mentor_bio:
-                    matches += 0.7  # Slightly lower weight for bio mentions
+                    matches.append((subject, 0.7))  # Slightly lower weight for bio mentions
                     break
         
-        if matches > 0:
-            # Bonus for subject alignment
-            bonus = min(matches * 10, 15)
-            score = min(score + bonus, 100)
-        
-        return score
+        return matches
     
     def _calculate_bio_goals_score(self, student: Dict[str, Any], mentor: Dict[str, Any]) -> float:
         """
@@ -335,67 +641,23 @@ class MatchingScorer:
         Uses keyword matching and context analysis.
         """
         
-        student_bio = student.get('bio', '').lower()
-        student_goals = student.get('goals', '').lower()
-        mentor_bio = mentor.get('bio', '').lower()
-        mentor_role = mentor.get('role', '').lower()
-        mentor_skills = [s.lower() for s in mentor.get('skills', [])]
-        mentor_hobbies = [h.lower() for h in mentor.get('hobbies', [])]
-        
         # If student hasn't provided bio/goals, use generous default
-        if not student_bio and not student_goals:
+        if not student.get('bio', '') and not student.get('goals', ''):
             return 85
         
         score = 70  # Base score
         
-        # Combine student text
-        student_text = f"{student_bio} {student_goals}"
-        
-        # Combine mentor text
-        mentor_text = f"{mentor_bio} {mentor_role} {' '.join(mentor_skills)} {' '.join(mentor_hobbies)}"
-        
-        # Career/field keywords - specific career interests
-        career_keywords = {
-            'software': ['software', 'programmer', 'developer', 'coding', 'engineering'],
-            'data': ['data', 'analytics', 'statistics', 'machine learning', 'ai'],
-            'business': ['business', 'entrepreneur', 'management', 'finance', 'marketing'],
-            'design': ['design', 'creative', 'ux', 'ui', 'graphic', 'art'],
-            'music': ['music', 'musician', 'producer', 'artist', 'singer', 'band'],
-            'gaming': ['game', 'gaming', 'esports', 'streamer', 'developer'],
-            'science': ['scientist', 'research', 'biology', 'chemistry', 'physics', 'lab'],
-            'medical': ['doctor', 'medicine', 'healthcare', 'nurse', 'medical'],
-            'teaching': ['teacher', 'education', 'teaching', 'professor', 'tutor'],
-            'sports': ['sports', 'athlete', 'coach', 'fitness', 'trainer'],
-            'engineering': ['engineer', 'mechanical', 'civil', 'automotive', 'technical'],
-            'fashion': ['fashion', 'designer', 'style', 'clothing', 'beauty'],
-            'food': ['chef', 'cooking', 'culinary', 'restaurant', 'food'],
-            'aviation': ['pilot', 'aviation', 'flight', 'aerospace'],
-            'content': ['content', 'creator', 'influencer', 'social media', 'youtube'],
-            'crypto': ['crypto', 'blockchain', 'bitcoin', 'cryptocurrency']
-        }
+        student_text, mentor_text = self._profile_texts(student, mentor)
         
         # Check for specific career mentions
-        career_matches = 0
-        for career_type, keywords in career_keywords.items():
-            student_mentions = any(keyword in student_text for keyword in keywords)
-            mentor_has = any(keyword in mentor_text for keyword in keywords)
-            
-            if student_mentions and mentor_has:
-                career_matches += 1
+        career_matches = len(self._career_matches(student_text, mentor_text))
         
         if career_matches > 0:
             # Strong bonus for career alignment
             score += min(career_matches * 15, 30)
         
-        # Personal interest keywords - hobbies and interests
-        interest_keywords = [
-            'taylor swift', 'music', 'gaming', 'games', 'sports', 'travel',
-            'photography', 'art', 'reading', 'books', 'movies', 'cooking',
-            'fashion', 'fitness', 'nature', 'animals', 'pets', 'technology'
-        ]
-        
         interest_matches = 0
-        for keyword in interest_keywords:
+        for keyword in self.INTEREST_KEYWORDS:
             if keyword in student_text and keyword in mentor_text:
                 interest_matches += 1
         
@@ -418,11 +680,74 @@ class MatchingScorer:
         
         return min(score, 100)
 
+    
+    @staticmethod
+    def _profile_texts(student: Dict[str, Any], mentor: Dict[str, Any]) -> Tuple[str, str]:
+        """Lowercased free text of both profiles, as used for keyword matching."""
+        student_bio = student.get('bio', '').lower()
+        student_goals = student.get('goals', '').lower()
+        mentor_bio = mentor.get('bio', '').lower()
+        mentor_role = mentor.get('role', '').lower()
+        mentor_skills = [s.lower() for s in mentor.get('skills', [])]
+        mentor_hobbies = [h.lower() for h in mentor.get('hobbies', [])]
+        
+        student_text = f"{student_bio} {student_goals}"
+        mentor_text = f"{mentor_bio} {mentor_role} {' '.join(mentor_skills)} {' '.join(mentor_hobbies)}"
+        return student_text, mentor_text
+    
+    def _career_matches(self, student_text: str, mentor_text: str) -> List[str]:
+        """Career groups mentioned by both the student and the mentor."""
+        return [
+            career_type for career_type, pattern in self._get_career_patterns().items()
+            if pattern.search(student_text) is not None and pattern.search(mentor_text) is not None
+        ]
+
+def shard_bounds(total: int, shard_size: int) -> List[Tuple[int, int]]:
+    """Split a roster of `total` mentors into consecutive (start, end) shards."""
+    return [(start, min(start + shard_size, total)) for start in range(0, total, shard_size)]
 
-def validate_matching_input(data: Dict[str, Any]) -> Tuple[bool, str]:
+
+def merge_ranked_matches(shards: List[List[Dict[str, Any]]], limit: int = 0) -> List[Dict[str, Any]]:
+    """
+    Merge per-shard match lists, each sorted by score descending, into one ranking.
+    
+    Shards must be given in roster order: ties keep roster order, so the result
+    equals scoring the whole roster at once (up to `limit` matches, 0 for all).
+    """
+    merged = heapq.merge(*shards, key=lambda match: -match['score'])
+    return [match for _, match in zip(range(limit), merged)] if limit else list(merged)
+
+
+def _location_threshold(count: int, lower_bounds: List[float], top_k: int) -> float:
+    """The K-th best guaranteed score, which a mentor must be able to reach to need coordinates."""
+    if count <= top_k:
+        return float('-inf')
+    return lower_bounds[top_k - 1] if top_k > 0 else float('inf')
+
+
+def merge_location_candidates(summaries: List[Dict[str, Any]], top_k: int) -> List[str]:
+    """
+    Mentor ids that need coordinates, from the location_bounds of every shard of a roster.
+    
+    The whole roster's K-th best lower bound is among the shards' top_k lower bounds,
+    so the result equals select_location_candidates over the whole roster.
+    """
+    count = sum(summary['count'] for summary in summaries)
+    lower_bounds = heapq.nlargest(top_k, (lower for summary in summaries for lower in summary['lower_bounds']))
+    threshold = _location_threshold(count, lower_bounds, top_k)
+    
+    return [mentor_id for summary in summaries for mentor_id, upper in summary['candidates']
+            if upper >= threshold]
+
+
+def validate_matching_input(data: Dict[str, Any], first_index: int = 0) -> Tuple[bool, str]:
     """
     Validate the input data for the matching API.
     
+    Args:
+        data: Matching request with 'student' and 'mentors'
+        first_index: Roster index of the first mentor, when validating one shard of a roster
+    
     Returns:
         Tuple of (is_valid, error_message)
     """
@@ -447,7 +772,7 @@ def validate_matching_input(data: Dict[str, Any]) -> Tuple[bool, str]:
         return False, f"Student validation error: {student_error}"
     
     # Validate mentors
-    for i, mentor in enumerate(data['mentors']):
+    for i, mentor in enumerate(data['mentors'], first_index):
         mentor_valid, mentor_error = _validate_person_data(mentor, 'mentor')
         if not mentor_valid:
             return False, f"Mentor {i} validation error: {mentor_error}"
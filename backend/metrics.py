@@ -0,0 +1,143 @@
+"""
+In-process metrics registry.
+
+Counters and histograms identified by a name and a set of labels, e.g.
+
+    metrics.inc('llm_requests_total', activity='analyze_cv_with_llm', model='...')
+    metrics.observe('llm_latency_seconds', 0.42, activity='analyze_cv_with_llm', model='...')
+
+Values can be read back with counter(), histogram() and snapshot(), which is
+how tests and the worker logs inspect them.
+"""
+
+import bisect
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Default histogram bucket upper bounds (seconds for latencies)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 45.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _matches(key: LabelKey, labels: Dict[str, Any]) -> bool:
+    """Check whether a series has every given label value."""
+    series_labels = dict(key)
+    return all(series_labels.get(name) == str(value) for name, value in labels.items())
+
+
+class Histogram:
+    """Bucketed histogram that also keeps a window of recent samples for quantiles."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, window: int = 1000):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile of the recent samples (nearest rank), or None if empty."""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([*map(str, self.buckets), '+Inf'], self.bucket_counts)),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of labelled counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increment a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a histogram sample."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """Sum of a counter over every series matching the given labels."""
+        with self._lock:
+            return sum(value for key, value in self._counters.get(name, {}).items() if _matches(key, labels))
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Dict[str, Any]]:
+        """Summary of a histogram merged over every series matching the given labels."""
+        merged = self._merged(name, labels)
+        return merged.summary() if merged is not None else None
+
+    def quantile(self, name: str, q: float, **labels: Any) -> Optional[float]:
+        """Quantile of the recent samples of a histogram, or None if there are none."""
+        merged = self._merged(name, labels)
+        return merged.quantile(q) if merged is not None else None
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Every series as plain data: {'counters': [...], 'histograms': [...]}."""
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(key), 'value': value}
+                    for name, series in self._counters.items() for key, value in series.items()
+                ],
+                'histograms': [
+                    {'name': name, 'labels': dict(key), **histogram.summary()}
+                    for name, series in self._histograms.items() for key, histogram in series.items()
+                ],
+            }
+
+    def reset(self) -> None:
+        """Drop every series."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _merged(self, name: str, labels: Dict[str, Any]) -> Optional[Histogram]:
+        with self._lock:
+            matching = [h for key, h in self._histograms.get(name, {}).items() if _matches(key, labels)]
+            if not matching:
+                return None
+            merged = Histogram(matching[0].buckets, window=sum(h.recent.maxlen for h in matching))
+            for histogram in matching:
+                merged.bucket_counts = [a + b for a, b in zip(merged.bucket_counts, histogram.bucket_counts)]
+                merged.count += histogram.count
+                merged.sum += histogram.sum
+                merged.recent.extend(histogram.recent)
+            return merged
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
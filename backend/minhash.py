@@ -0,0 +1,131 @@
+"""
+MinHash signatures and an LSH index for near-duplicate text detection.
+
+Texts are split into overlapping word shingles; the fraction of matching
+MinHash values between two signatures estimates the Jaccard similarity of
+their shingle sets. Locality-sensitive hashing over signature bands finds
+candidate near-duplicates without comparing against every indexed text.
+"""
+
+import hashlib
+import random
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Mersenne prime used for the universal hash family
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_WORD_PATTERN = re.compile(r"[a-z0-9åäöéü]+")
+
+
+def shingle(text: str, size: int = 3) -> Set[str]:
+    """Split text into a set of overlapping word n-grams."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHashLSH:
+    """Bounded in-process LSH index over MinHash signatures."""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, max_entries: int = 5000,
+                 shingle_size: int = 3, seed: int = 1):
+        """
+        Args:
+            num_perm: Number of hash permutations per signature
+            bands: Number of LSH bands (num_perm must be divisible by bands)
+            max_entries: Maximum number of indexed texts (oldest are evicted)
+            shingle_size: Words per shingle
+            seed: Seed for the hash permutations
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+
+        self._entries: 'OrderedDict[str, Tuple[Tuple[int, ...], Any]]' = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """Compute the MinHash signature of a text."""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'big')
+            for s in shingle(text, self.shingle_size)
+        ]
+        if not hashes:
+            return tuple([_MAX_HASH] * self.num_perm)
+
+        return tuple(
+            min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        )
+
+    def add(self, key: str, text: str, payload: Any) -> None:
+        """Index a text under key with an arbitrary payload."""
+        signature = self.signature(text)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (signature, payload)
+            for band in self._bands(signature):
+                self._buckets[band].add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def query(self, text: str) -> Optional[Tuple[str, float, Any]]:
+        """
+        Find the most similar indexed text.
+
+        Returns:
+            Tuple of (key, estimated Jaccard similarity, payload), or None if no candidate shares a band
+        """
+        signature = self.signature(text)
+
+        with self._lock:
+            candidates: Set[str] = set()
+            for band in self._bands(signature):
+                candidates.update(self._buckets.get(band, ()))
+
+            best = None
+            for key in candidates:
+                other, payload = self._entries[key]
+                similarity = sum(x == y for x, y in zip(signature, other)) / self.num_perm
+                if best is None or similarity > best[1]:
+                    best = (key, similarity, payload)
+
+            return best
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _bands(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def _remove(self, key: str) -> None:
+        signature, _ = self._entries.pop(key)
+        for band in self._bands(signature):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
@@ -218,3 +218,8 @@ def get_mentors_by_interest(interest: str):
 def get_mentor_by_id(mentor_id: str):
     """Get a specific mentor by ID"""
     return next((m for m in MOCK_MENTORS if m["id"] == mentor_id), None)
+
+
+def get_mock_roster(size: int):
+    """Get the mock mentors repeated up to `size`, with unique IDs (mentor-0, mentor-1, ...)"""
+    return [{**MOCK_MENTORS[i % len(MOCK_MENTORS)], "id": f"mentor-{i}"} for i in range(size)]
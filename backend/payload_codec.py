@@ -0,0 +1,158 @@
+"""
+Compressing Temporal payload codec.
+
+Payloads above a size threshold are compressed with zlib, or with zstd when
+the optional `zstandard` package is installed (pip install zstandard). The
+compressed payload wraps the original one, so its metadata (encoding, type
+hints) survives the round trip. Payloads without a compression encoding are
+passed through unchanged, so histories written before the codec was enabled
+still decode.
+
+The API client and the worker must use the same codec: deploy workers first
+when enabling compression. get_data_converter() combines the codec with the
+configured payload converter (see payload_converter.py) for Client.connect.
+"""
+
+import logging
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+import temporalio.converter
+from temporalio.api.common.v1 import Payload
+from config import Config
+from metrics import metrics
+from payload_converter import JSONPayloadConverter, MsgPackPayloadConverter, msgpack_available
+
+logger = logging.getLogger(__name__)
+
+ENCODINGS = {
+    'zlib': b'binary/zlib',
+    'zstd': b'binary/zstd',
+}
+
+
+def _zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class CompressionCodec(temporalio.converter.PayloadCodec):
+    """PayloadCodec that compresses large payloads with zlib or zstd."""
+
+    def __init__(self, algorithm: str = 'zlib', threshold_bytes: int = 1024, level: Optional[int] = None):
+        """
+        Args:
+            algorithm: 'zlib' or 'zstd' (falls back to zlib if zstandard is not installed)
+            threshold_bytes: Payloads smaller than this are left uncompressed
+            level: Compression level (None for the algorithm's default)
+        """
+        if algorithm not in ENCODINGS:
+            raise ValueError(f"Unknown payload compression algorithm: {algorithm}")
+        if algorithm == 'zstd' and not _zstd_available():
+            logger.warning("zstandard is not installed, compressing payloads with zlib instead")
+            algorithm = 'zlib'
+
+        self.algorithm = algorithm
+        self.threshold_bytes = threshold_bytes
+        self.level = level
+
+        self._lock = threading.Lock()
+        self._stats = {'payloads': 0, 'compressed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [self._encode_one(payload) for payload in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [self._decode_one(payload) for payload in payloads]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return payload counts and bytes before/after compression for encoded payloads."""
+        with self._lock:
+            bytes_in = self._stats['bytes_in']
+            return {
+                **self._stats,
+                'algorithm': self.algorithm,
+                'ratio': self._stats['bytes_out'] / bytes_in if bytes_in else 1.0
+            }
+
+    def _encode_one(self, payload: Payload) -> Payload:
+        raw = payload.SerializeToString()
+        encoded = payload
+
+        if len(raw) >= self.threshold_bytes:
+            compressed = self._compress(raw)
+            # Keep the original when compression doesn't pay for its wrapper
+            if len(compressed) < len(raw):
+                encoded = Payload(metadata={'encoding': ENCODINGS[self.algorithm]}, data=compressed)
+
+        size = encoded.ByteSize()
+        with self._lock:
+            self._stats['payloads'] += 1
+            self._stats['compressed'] += encoded is not payload
+            self._stats['bytes_in'] += payload.ByteSize()
+            self._stats['bytes_out'] += size
+        metrics.inc('temporal_payload_bytes_total', payload.ByteSize(), stage='raw')
+        metrics.inc('temporal_payload_bytes_total', size, stage='encoded', algorithm=self.algorithm)
+        return encoded
+
+    def _decode_one(self, payload: Payload) -> Payload:
+        encoding = payload.metadata.get('encoding', b'')
+        if encoding == ENCODINGS['zlib']:
+            raw = zlib.decompress(payload.data)
+        elif encoding == ENCODINGS['zstd']:
+            if not _zstd_available():
+                raise RuntimeError("Received a zstd-compressed payload but zstandard is not installed "
+                                   "(pip install zstandard on every API and worker host)")
+            import zstandard
+            raw = zstandard.ZstdDecompressor().decompress(payload.data)
+        else:
+            return payload
+
+        decoded = Payload()
+        decoded.ParseFromString(raw)
+        return decoded
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.algorithm == 'zstd':
+            import zstandard
+            return zstandard.ZstdCompressor(level=self.level if self.level is not None else 3).compress(data)
+        return zlib.compress(data, self.level if self.level is not None else 6)
+
+
+# Process-wide codec, shared by every client so its statistics cover all payloads
+_payload_codec: Optional[CompressionCodec] = None
+
+
+def get_payload_codec() -> Optional[CompressionCodec]:
+    """Get the configured payload codec, or None when compression is disabled."""
+    global _payload_codec
+    if Config.PAYLOAD_COMPRESSION == 'none':
+        return None
+    if _payload_codec is None:
+        _payload_codec = CompressionCodec(
+            Config.PAYLOAD_COMPRESSION,
+            threshold_bytes=Config.PAYLOAD_COMPRESSION_THRESHOLD_BYTES,
+            level=Config.PAYLOAD_COMPRESSION_LEVEL
+        )
+    return _payload_codec
+
+
+def get_data_converter() -> temporalio.converter.DataConverter:
+    """
+    Data converter for Client.connect.
+
+    Uses the msgpack payload converter when PAYLOAD_CONVERTER=msgpack (and
+    msgpack is installed), and the payload codec when compression is enabled.
+    """
+    converter_class = JSONPayloadConverter
+    if Config.PAYLOAD_CONVERTER == 'msgpack':
+        if msgpack_available():
+            converter_class = MsgPackPayloadConverter
+        else:
+            logger.warning("msgpack is not installed, encoding payloads as JSON instead")
+
+    return temporalio.converter.DataConverter(payload_converter_class=converter_class,
+                                              payload_codec=get_payload_codec())
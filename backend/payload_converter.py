@@ -0,0 +1,80 @@
+"""
+Optional msgpack payload converter for Temporal.
+
+The matching and CV analysis workflows pass plain nested dicts and lists
+(students, mentors, matches), which msgpack encodes and decodes with less
+CPU and fewer bytes than JSON. Requires the optional `msgpack` package
+(pip install msgpack).
+
+Values msgpack cannot encode (dataclasses, datetimes, ...) fall through to
+the standard JSON converter. Decoding goes through Temporal's type-hint
+conversion, so e.g. coordinate tuples are rebuilt exactly as with JSON.
+"""
+
+from typing import Any, List, Optional, Type
+import temporalio.converter
+from temporalio.api.common.v1 import Payload
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_ENCODING = 'binary/msgpack'
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+class MsgPackEncodingPayloadConverter(temporalio.converter.EncodingPayloadConverter):
+    """Converter for 'binary/msgpack' payloads of plain Python data."""
+
+    @property
+    def encoding(self) -> str:
+        return MSGPACK_ENCODING
+
+    def to_payload(self, value: Any) -> Optional[Payload]:
+        try:
+            data = msgpack.packb(value, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            # Not plain data, let the JSON converter handle it
+            return None
+        return Payload(metadata={'encoding': MSGPACK_ENCODING.encode()}, data=data)
+
+    def from_payload(self, payload: Payload, type_hint: Optional[Type] = None) -> Any:
+        value = msgpack.unpackb(payload.data, raw=False, strict_map_key=False)
+        if type_hint:
+            value = temporalio.converter.value_to_type(type_hint, value)
+        return value
+
+
+def _converters(msgpack_first: bool) -> List[temporalio.converter.EncodingPayloadConverter]:
+    defaults = list(temporalio.converter.DefaultPayloadConverter.default_encoding_payload_converters)
+    if not msgpack_available():
+        return defaults
+
+    # The composite converter encodes with the first converter that accepts a value
+    # and decodes by encoding name, so the position only matters for encoding
+    json_index = next(i for i, c in enumerate(defaults)
+                      if isinstance(c, temporalio.converter.JSONPlainPayloadConverter))
+    position = json_index if msgpack_first else len(defaults)
+    defaults.insert(position, MsgPackEncodingPayloadConverter())
+    return defaults
+
+
+class MsgPackPayloadConverter(temporalio.converter.CompositePayloadConverter):
+    """Default converters with msgpack preferred over JSON for plain data."""
+
+    def __init__(self) -> None:
+        super().__init__(*_converters(msgpack_first=True))
+
+
+class JSONPayloadConverter(temporalio.converter.CompositePayloadConverter):
+    """
+    Default converters that encode JSON but can still decode msgpack payloads,
+    so clients and workers can switch converters one at a time.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(*_converters(msgpack_first=False))
@@ -0,0 +1,149 @@
+"""
+Deterministic template reasoning built from match evidence.
+
+Turns the evidence collected by MatchingScorer.explain() into one or two
+specific sentences without calling the LLM. Used for matches beyond the
+top K, as the fallback when LLM reasoning fails, and for every match when
+reasoning is shed under load.
+"""
+
+import zlib
+from typing import Any, Dict, List
+
+# Readable names for the MatchingScorer.CAREER_KEYWORDS groups
+CAREER_LABELS = {
+    'software': 'software development',
+    'data': 'data and analytics',
+    'business': 'business',
+    'design': 'design',
+    'music': 'music',
+    'gaming': 'gaming',
+    'science': 'science',
+    'medical': 'healthcare',
+    'teaching': 'teaching',
+    'sports': 'sports',
+    'engineering': 'engineering',
+    'fashion': 'fashion',
+    'food': 'food and cooking',
+    'aviation': 'aviation',
+    'content': 'content creation',
+    'crypto': 'crypto and blockchain'
+}
+
+DISTANCE_PHRASES = {
+    'nearby': "lives close by, so meeting in person is easy",
+    'local': "is based about {km:.0f} km away, close enough to meet in person",
+    'regional': "is within {km:.0f} km for the occasional in-person meetup",
+    'online': "can mentor you online",
+}
+
+CAREER_OPENERS = [
+    "{name}'s work as {role} lines up with your interest in {careers}.",
+    "As {role}, {name} has hands-on experience in {careers}, which matches your goals.",
+]
+
+INTEREST_OPENERS = [
+    "You and {name} share an interest in {interests}.",
+    "{name} is also into {interests}, which gives you plenty to talk about.",
+]
+
+
+def _join(items: List[str]) -> str:
+    """Join items as 'a', 'a and b' or 'a, b and c'."""
+    if len(items) <= 1:
+        return ''.join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _article(role: str) -> str:
+    return f"{'an' if role[:1].lower() in 'aeiou' else 'a'} {role}"
+
+
+def _subject_name(subject: str) -> str:
+    """Strip the emoji prefix from subject labels like '🔢 Mathematics'."""
+    return subject.split(' ', 1)[-1] if not subject[:1].isalnum() else subject
+
+
+def evidence_sentences(mentor: Dict[str, Any], evidence: Dict[str, Any]) -> List[str]:
+    """
+    Build the student-specific sentences for a match, most specific first.
+
+    Args:
+        mentor: Mentor profile dictionary
+        evidence: Output of MatchingScorer.explain() for the pair
+
+    Returns:
+        List of sentences (empty if the pair shares no specific evidence)
+    """
+    name = mentor.get('first_name') or 'This mentor'
+    role = _article(mentor['role']) if mentor.get('role') else None
+    # Pick phrasing per mentor so a result list doesn't repeat one sentence
+    variant = zlib.crc32(str(mentor.get('id', name)).encode())
+
+    careers = [CAREER_LABELS.get(group, group) for group in evidence.get('career_groups', [])][:2]
+    interests = evidence.get('shared_interests', [])[:3]
+    subjects = [_subject_name(subject) for subject in evidence.get('subjects', [])][:2]
+
+    sentences = []
+    if careers:
+        if role:
+            sentences.append(
+                CAREER_OPENERS[variant % len(CAREER_OPENERS)].format(name=name, role=role, careers=_join(careers))
+            )
+        else:
+            sentences.append(f"{name}'s background in {_join(careers)} matches your goals.")
+        if interests:
+            sentences.append(f"You both enjoy {_join(interests)}.")
+    elif interests:
+        sentences.append(INTEREST_OPENERS[variant % len(INTEREST_OPENERS)].format(name=name, interests=_join(interests)))
+
+    if subjects:
+        noun = 'subject' if len(subjects) == 1 else 'subjects'
+        sentences.append(f"{name}'s skills connect to your favorite {noun}, {_join(subjects)}.")
+
+    distance = DISTANCE_PHRASES.get(evidence.get('distance_band'))
+    if distance:
+        sentences.append(f"{name} {distance.format(km=evidence.get('distance_km') or 0)}.")
+
+    return sentences
+
+
+def template_reasoning(mentor: Dict[str, Any], score: int, evidence: Dict[str, Any]) -> str:
+    """
+    Build a short (at most 3 sentence) match explanation from score evidence.
+
+    Args:
+        mentor: Mentor profile dictionary
+        score: Match score
+        evidence: Output of MatchingScorer.explain() for the pair
+
+    Returns:
+        The explanation text
+    """
+    sentences = evidence_sentences(mentor, evidence)
+
+    if not (evidence.get('career_groups') or evidence.get('shared_interests')):
+        name = mentor.get('first_name') or 'This mentor'
+        role = f" is {_article(mentor['role'])} and" if mentor.get('role') else " is"
+        sentences.insert(0, f"{name}{role} a strong overall match ({score}%) for your interests and goals.")
+
+    return ' '.join(sentences[:3])
+
+
+def snippet_reasoning(mentor: Dict[str, Any], evidence: Dict[str, Any], snippet: Dict[str, str]) -> str:
+    """
+    Combine a mentor's precomputed snippet with the strongest student-specific evidence.
+
+    Args:
+        mentor: Mentor profile dictionary
+        evidence: Output of MatchingScorer.explain() for the pair
+        snippet: Dict with the mentor's 'summary' sentence and 'offer' phrase
+
+    Returns:
+        The explanation text
+    """
+    name = mentor.get('first_name') or 'This mentor'
+    sentences = evidence_sentences(mentor, evidence)[:1]
+    sentences.append(snippet['summary'])
+    sentences.append(f"{name} can help you {snippet['offer']}.")
+    return ' '.join(sentences)
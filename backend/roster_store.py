@@ -0,0 +1,159 @@
+"""
+Versioned mentor roster snapshots.
+
+The API stores each mentor roster once and hands workflows a small reference
+({"roster_id": ..., "version": ..., "size": ...}) instead of the full list, so Temporal
+history and payload serialization stay O(1) in the number of mentors.
+Activities load the snapshot by reference from an in-process cache backed by
+a SQLite file shared between the API and the workers.
+
+Versions are content hashes, so a snapshot never changes once written and
+storing the same roster twice is a no-op.
+
+Large snapshots are also stored in pages of ROSTER_PAGE_SIZE mentors, so an
+activity scoring one shard of a roster only loads the pages it covers rather
+than the whole roster.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Union
+from caching import LRUTTLCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# {"roster_id": str, "version": str, "size": int}
+RosterRef = Dict[str, Any]
+
+# Mentors per stored page of a snapshot
+ROSTER_PAGE_SIZE = 500
+
+
+class RosterNotFoundError(LookupError):
+    """Raised when a roster reference has no stored snapshot (e.g. it expired)."""
+
+
+def roster_version(mentors: List[Dict[str, Any]]) -> str:
+    """Content hash identifying a roster snapshot."""
+    canonical = json.dumps(mentors, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def is_roster_ref(value: Any) -> bool:
+    return isinstance(value, dict) and 'roster_id' in value and 'version' in value
+
+
+class RosterStore:
+    """Store of immutable, versioned mentor roster snapshots."""
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None, persistent_path: Optional[str] = None,
+                 page_size: int = ROSTER_PAGE_SIZE):
+        """
+        Args:
+            max_size: Maximum number of snapshots (and of snapshot pages) kept in process
+            ttl_seconds: How long a snapshot is kept after it was stored (None for ever)
+            persistent_path: SQLite file shared by the API and the workers
+            page_size: Mentors per page of snapshots larger than one page
+        """
+        self.page_size = page_size
+        self._snapshots = LRUTTLCache('mentor-rosters', max_size=max_size, ttl_seconds=ttl_seconds,
+                                      persistent_path=persistent_path)
+        self._pages = LRUTTLCache('mentor-roster-pages', max_size=max_size, ttl_seconds=ttl_seconds,
+                                  persistent_path=persistent_path)
+
+    def put(self, mentors: List[Dict[str, Any]], roster_id: str = 'default') -> RosterRef:
+        """
+        Store a roster snapshot.
+
+        Args:
+            mentors: Mentor profile dictionaries
+            roster_id: Name of the roster the snapshot belongs to
+
+        Returns:
+            Reference to the snapshot, to pass to workflows and activities
+        """
+        ref = {'roster_id': roster_id, 'version': roster_version(mentors), 'size': len(mentors)}
+        key = self._key(ref)
+        if self._snapshots.get(key) is None:
+            self._snapshots.set(key, mentors)
+            if len(mentors) > self.page_size:
+                for start in range(0, len(mentors), self.page_size):
+                    self._pages.set(self._page_key(ref, start // self.page_size), mentors[start:start + self.page_size])
+            logger.info(f"Stored roster snapshot {key} with {len(mentors)} mentors")
+        return ref
+
+    def get(self, ref: RosterRef) -> List[Dict[str, Any]]:
+        """
+        Load a roster snapshot.
+
+        Raises:
+            RosterNotFoundError: If the snapshot is unknown or has expired
+        """
+        mentors = self._snapshots.get(self._key(ref))
+        if mentors is None:
+            raise RosterNotFoundError(f"Unknown mentor roster {self._key(ref)}")
+        return mentors
+
+    def get_range(self, ref: RosterRef, start: int, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Load mentors start:end of a roster snapshot, reading only the pages they are on.
+        Snapshots stored without pages (no larger than one page) are loaded whole.
+
+        Raises:
+            RosterNotFoundError: If the snapshot is unknown or has expired
+        """
+        end = ref['size'] if end is None else min(end, ref['size'])
+        if end <= start:
+            return []
+
+        first_page, last_page = start // self.page_size, (end - 1) // self.page_size
+        mentors = []
+        for page in range(first_page, last_page + 1):
+            page_mentors = self._pages.get(self._page_key(ref, page))
+            if page_mentors is None:
+                return self.get(ref)[start:end]
+            mentors.extend(page_mentors)
+
+        offset = first_page * self.page_size
+        return mentors[start - offset:end - offset]
+
+    def stats(self) -> Dict[str, Any]:
+        return self._snapshots.stats()
+
+    @staticmethod
+    def _key(ref: RosterRef) -> str:
+        return f"{ref['roster_id']}:{ref['version']}"
+
+    def _page_key(self, ref: RosterRef, page: int) -> str:
+        return f"{self._key(ref)}:{self.page_size}:{page}"
+
+
+# Process-wide store, created on first use
+_roster_store: Optional[RosterStore] = None
+
+
+def get_roster_store() -> RosterStore:
+    """Get the process-wide roster store."""
+    global _roster_store
+    if _roster_store is None:
+        _roster_store = RosterStore(Config.ROSTER_CACHE_SIZE, Config.ROSTER_TTL_SECONDS, Config.ROSTER_STORE_DB)
+    return _roster_store
+
+
+def resolve_roster(
+    mentors: Union[RosterRef, List[Dict[str, Any]]],
+    start: int = 0,
+    end: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Return the mentors for either a roster reference or an inline mentor list,
+    optionally only mentors start:end (one shard, loaded without the rest of the roster).
+
+    Raises:
+        RosterNotFoundError: If a reference has no stored snapshot
+    """
+    if (start, end) == (0, None):
+        return get_roster_store().get(mentors) if is_roster_ref(mentors) else mentors
+    return get_roster_store().get_range(mentors, start, end) if is_roster_ref(mentors) else mentors[start:end]
@@ -1,14 +1,43 @@
 import asyncio
 import logging
-from temporalio.client import Client
+from datetime import timedelta
+from temporalio.client import (
+    Client,
+    Schedule,
+    ScheduleActionStartWorkflow,
+    ScheduleAlreadyRunningError,
+    ScheduleIntervalSpec,
+    ScheduleSpec,
+)
 from temporalio.worker import Worker
 from config import Config
-from workflows import CVAnalysisWorkflow, MatchingWorkflow
+from distance_table import get_distance_table
+from mock_mentors import get_mock_mentors
+from payload_codec import get_data_converter
+from workflows import (
+    CVAnalysisWorkflow,
+    MatchingWorkflow,
+    LowLatencyMatchingWorkflow,
+    GeocodeCacheRefreshWorkflow,
+    MentorSnippetRefreshWorkflow
+)
 from activities import (
     analyze_cv_with_llm,
+    lookup_cv_analysis,
     geocode_postcodes,
+    lookup_cached_coordinates,
+    select_location_postcodes,
+    select_shard_location_postcodes,
     calculate_mentor_matches,
-    validate_matching_data
+    score_location_independent,
+    reason_settled_matches,
+    combine_mentor_matches,
+    score_mentor_shard,
+    add_match_reasoning,
+    validate_matching_data,
+    refresh_geocode_cache,
+    refresh_mentor_snippets,
+    warm_up_caches
 )
 
 # Configure logging
@@ -18,6 +47,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+GEOCODE_REFRESH_SCHEDULE_ID = 'geocode-cache-refresh'
+SNIPPET_REFRESH_SCHEDULE_ID = 'mentor-snippet-refresh'
+
+async def ensure_refresh_schedule(client: Client, schedule_id: str, workflow_run, interval_minutes: int):
+    """
+    Create a schedule that periodically starts a background refresh workflow.
+    """
+    try:
+        await client.create_schedule(
+            schedule_id,
+            Schedule(
+                action=ScheduleActionStartWorkflow(
+                    workflow_run,
+                    id=schedule_id,
+                    task_queue=Config.TEMPORAL_TASK_QUEUE,
+                ),
+                spec=ScheduleSpec(
+                    intervals=[ScheduleIntervalSpec(
+                        every=timedelta(minutes=interval_minutes)
+                    )]
+                ),
+            ),
+        )
+        logger.info(f"Created {schedule_id} schedule (every {interval_minutes} min)")
+    except ScheduleAlreadyRunningError:
+        logger.info(f"Schedule {schedule_id} already exists")
+
 async def main():
     """
     Start the Temporal worker that will execute workflows and activities.
@@ -31,21 +87,66 @@ async def main():
         logger.info(f"Connecting to Temporal at {Config.TEMPORAL_HOST}")
         client = await Client.connect(
             Config.TEMPORAL_HOST,
-            namespace=Config.TEMPORAL_NAMESPACE
+            namespace=Config.TEMPORAL_NAMESPACE,
+            data_converter=get_data_converter()
         )
-        logger.info("Successfully connected to Temporal server")
+        logger.info(f"Successfully connected to Temporal server (payload compression: {Config.PAYLOAD_COMPRESSION})")
+        
+        if Config.ROSTER_STORE_DB:
+            # Roster references from the API only resolve if this worker sees the same file
+            logger.info(f"Loading roster references from {Config.ROSTER_STORE_DB}")
+        else:
+            logger.warning("ROSTER_STORE_DB is not set: roster references cannot be resolved, "
+                           "so the API must send mentors inline")
+        
+        # Building the distance table takes seconds, so do it now, off the event loop,
+        # instead of in the first activity that scores a match
+        await asyncio.to_thread(get_distance_table)
+        
+        # Warm caches so the first matches don't pay full geocoding latency
+        if Config.WARMUP_ON_START:
+            logger.info("Warming up caches before starting the worker")
+            await warm_up_caches(get_mock_mentors())
+        
+        if Config.GEOCODE_REFRESH_INTERVAL_MINUTES > 0 and not Config.GEOCODE_CACHE_DB:
+            logger.warning("GEOCODE_REFRESH_INTERVAL_MINUTES needs a shared GEOCODE_CACHE_DB, "
+                           "not scheduling the geocode cache refresh")
+        elif Config.GEOCODE_REFRESH_INTERVAL_MINUTES > 0:
+            await ensure_refresh_schedule(client, GEOCODE_REFRESH_SCHEDULE_ID, GeocodeCacheRefreshWorkflow.run,
+                                          Config.GEOCODE_REFRESH_INTERVAL_MINUTES)
+        
+        if Config.SNIPPET_REFRESH_INTERVAL_MINUTES > 0:
+            await ensure_refresh_schedule(client, SNIPPET_REFRESH_SCHEDULE_ID, MentorSnippetRefreshWorkflow.run,
+                                          Config.SNIPPET_REFRESH_INTERVAL_MINUTES)
         
         # Create and run worker
         logger.info(f"Starting worker on task queue: {Config.TEMPORAL_TASK_QUEUE}")
         worker = Worker(
             client,
             task_queue=Config.TEMPORAL_TASK_QUEUE,
-            workflows=[CVAnalysisWorkflow, MatchingWorkflow],
+            workflows=[
+                CVAnalysisWorkflow,
+                MatchingWorkflow,
+                LowLatencyMatchingWorkflow,
+                GeocodeCacheRefreshWorkflow,
+                MentorSnippetRefreshWorkflow
+            ],
             activities=[
                 analyze_cv_with_llm,
+                lookup_cv_analysis,
                 geocode_postcodes,
+                lookup_cached_coordinates,
+                select_location_postcodes,
+                select_shard_location_postcodes,
                 calculate_mentor_matches,
-                validate_matching_data
+                score_location_independent,
+                reason_settled_matches,
+                combine_mentor_matches,
+                score_mentor_shard,
+                add_match_reasoning,
+                validate_matching_data,
+                refresh_geocode_cache,
+                refresh_mentor_snippets
             ],
         )
         
@@ -0,0 +1,88 @@
+"""
+Tests for how the API starts Temporal workflows.
+These tests use a fake Temporal client and never connect to a server.
+"""
+
+import asyncio
+from temporalio.exceptions import WorkflowAlreadyStartedError
+import app
+import roster_store
+from config import Config
+from mock_mentors import get_mock_mentors
+from roster_store import RosterStore
+from workflows import MatchingWorkflow
+
+
+class FakeHandle:
+    def __init__(self, workflow_id):
+        self.id = workflow_id
+
+    async def result(self):
+        return {"success": True, "suggest": [], "handled_by": self.id}
+
+
+class FakeClient:
+    """Records started workflows; IDs in `running` behave like executions still open."""
+
+    def __init__(self, running=()):
+        self.running = set(running)
+        self.started = []
+        self.attached = []
+        self.args = []
+
+    async def start_workflow(self, workflow_run, arg, id, **kwargs):
+        if id in self.running:
+            raise WorkflowAlreadyStartedError(id, 'MatchingWorkflow')
+        self.running.add(id)
+        self.started.append(id)
+        self.args.append(arg)
+        return FakeHandle(id)
+
+    def get_workflow_handle_for(self, workflow_run, workflow_id):
+        self.attached.append(workflow_id)
+        return FakeHandle(workflow_id)
+
+
+def test_identical_requests_share_a_workflow_id(sample_student):
+    """The workflow ID depends on the request content only, not on key order."""
+    request = {'student': sample_student, 'mentors': get_mock_mentors()}
+    reordered = {'mentors': get_mock_mentors(), 'student': dict(reversed(list(sample_student.items())))}
+    changed = {**request, 'student': {**sample_student, 'postcode': '41199'}}
+
+    assert app.request_workflow_id('matching', request) == app.request_workflow_id('matching', reordered)
+    assert app.request_workflow_id('matching', request) != app.request_workflow_id('matching', changed)
+    assert app.request_workflow_id('matching', request) != app.request_workflow_id('cv', request)
+    assert app.request_workflow_id('matching', request).startswith('matching-')
+
+
+def test_duplicate_request_attaches_to_the_running_workflow(monkeypatch):
+    """A request whose workflow is already running waits on that execution instead of starting one."""
+    client = FakeClient(running={'matching-running'})
+    monkeypatch.setattr(app, 'temporal_client', client)
+
+    attached = asyncio.run(app.execute_coalesced_workflow(MatchingWorkflow.run, {}, 'matching-running'))
+    started = asyncio.run(app.execute_coalesced_workflow(MatchingWorkflow.run, {}, 'matching-new'))
+
+    assert attached['handled_by'] == 'matching-running'
+    assert started['handled_by'] == 'matching-new'
+    assert client.attached == ['matching-running']
+    assert client.started == ['matching-new']
+
+
+def test_mentors_are_sent_inline_without_a_shared_roster_store(monkeypatch, tmp_path, sample_student):
+    """Workflows only get a roster reference when ROSTER_STORE_DB is configured for the workers too."""
+    client = FakeClient()
+    monkeypatch.setattr(app, 'temporal_client', client)
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    request = {'student': sample_student, 'mentors': get_mock_mentors()}
+
+    monkeypatch.setattr(Config, 'ROSTER_STORE_DB', None)
+    asyncio.run(app.execute_matching_workflow(request))
+    assert client.args[-1]['mentors'] == get_mock_mentors()
+    assert 'roster' not in client.args[-1]
+
+    monkeypatch.setattr(Config, 'ROSTER_STORE_DB', str(tmp_path / 'rosters.sqlite'))
+    monkeypatch.setattr(roster_store, '_roster_store', RosterStore(4, persistent_path=Config.ROSTER_STORE_DB))
+    asyncio.run(app.execute_matching_workflow(request))
+    assert client.args[-1]['roster']['size'] == len(get_mock_mentors())
+    assert 'mentors' not in client.args[-1]
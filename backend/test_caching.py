@@ -0,0 +1,58 @@
+"""
+Offline tests for the LRU/TTL cache.
+"""
+
+import os
+import tempfile
+import time
+from caching import LRUTTLCache
+
+
+def test_lru_eviction():
+    """The least recently used entry is evicted first."""
+    cache = LRUTTLCache('test', max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expiry():
+    """Entries expire after their TTL."""
+    cache = LRUTTLCache('test', max_size=10, ttl_seconds=0.05)
+    cache.set('a', ['x'])
+    assert cache.get('a') == ['x']
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_persistent_tier_is_shared():
+    """A second cache on the same file sees entries written by the first."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'cache.sqlite')
+        writer = LRUTTLCache('shared', max_size=10, ttl_seconds=60, persistent_path=path)
+        reader = LRUTTLCache('shared', max_size=10, ttl_seconds=60, persistent_path=path)
+        other_namespace = LRUTTLCache('other', max_size=10, persistent_path=path)
+
+        writer.set('key', {'reasoning': 'cached'})
+
+        assert reader.get('key') == {'reasoning': 'cached'}
+        assert reader.stats()['persistent_hits'] == 1
+        assert other_namespace.get('key') is None
+
+
+if __name__ == "__main__":
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_persistent_tier_is_shared()
+    print("✅ All caching tests passed")
@@ -0,0 +1,172 @@
+"""
+Offline tests for CV analysis.
+These tests run the activities outside a worker against a local LLM stub.
+"""
+
+import asyncio
+import json
+import pytest
+from temporalio.testing import ActivityEnvironment
+import activities
+from activities import analyze_cv_with_llm, lookup_cv_analysis
+from config import Config
+from cv_preprocessing import preprocess_cv, merge_interest_votes
+from minhash import MinHashLSH
+from llm_stub import LLMStubServer
+
+sample_cv = """
+Jane Doe - Software Engineer
+
+Senior engineer with eight years of experience building distributed backend
+services in Python and Go. Led the team that built trading systems for
+cryptocurrency exchanges and designed the market data pipeline, the order
+matching engine and the settlement service. Mentors junior developers and
+runs the internal architecture reading group.
+Hobbies: gaming, travel and cooking.
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_cv_cache(monkeypatch):
+    """Start every test with an empty CV analysis cache and the LLM path forced."""
+    monkeypatch.setattr(Config, 'CV_FAST_PATH_ENABLED', False)
+    activities.cv_analysis_cache.clear()
+    monkeypatch.setattr(activities, 'cv_similarity_index', MinHashLSH())
+    monkeypatch.setattr(activities, '_interest_classifier', None)
+    yield
+    activities.cv_analysis_cache.clear()
+
+
+def run_activity(fn, *args):
+    """Run an activity in a test activity environment."""
+    return asyncio.run(ActivityEnvironment().run(fn, *args))
+
+
+def test_repeated_cv_analysis_is_cached(use_stub):
+    """Re-analysing the same CV (modulo whitespace and case) is served from the cache."""
+    with LLMStubServer(responder=lambda prompt: json.dumps(["Technology", "Cryptocurrency", "Unknown"])) as stub:
+        use_stub(stub)
+
+        assert run_activity(lookup_cv_analysis, sample_cv) is None
+        interests = run_activity(analyze_cv_with_llm, sample_cv)
+
+    assert interests == ["Technology", "Cryptocurrency"]
+    assert run_activity(lookup_cv_analysis, "  " + sample_cv.upper().replace("\n", "  \n ")) == interests
+    assert len(stub.requests) == 1
+
+
+def test_cache_key_depends_on_model(monkeypatch, use_stub):
+    """Switching the LLM model invalidates cached analyses."""
+    with LLMStubServer(responder=lambda prompt: json.dumps(["Technology"])) as stub:
+        use_stub(stub)
+        run_activity(analyze_cv_with_llm, sample_cv)
+
+    monkeypatch.setattr(Config, 'LLM_MODEL', 'another/model')
+    assert run_activity(lookup_cv_analysis, sample_cv) is None
+
+
+def test_near_duplicate_cv_reuses_interests(monkeypatch, use_stub):
+    """A lightly edited CV reuses the previous analysis and picks up newly named interests."""
+    monkeypatch.setattr(Config, 'CV_SIMILARITY_THRESHOLD', 0.6)
+
+    with LLMStubServer(responder=lambda prompt: json.dumps(["Technology", "Cryptocurrency"])) as stub:
+        use_stub(stub)
+        run_activity(analyze_cv_with_llm, sample_cv)
+
+    edited_cv = sample_cv.replace("eight years", "nine years") + "Volunteer: Aviation club.\n"
+    assert run_activity(lookup_cv_analysis, edited_cv) == ["Technology", "Cryptocurrency", "Aviation"]
+
+    monkeypatch.setattr(Config, 'CV_SIMILARITY_REFINE', False)
+    assert run_activity(lookup_cv_analysis, edited_cv) == ["Technology", "Cryptocurrency"]
+
+    unrelated_cv = "Professional chef running a seafood restaurant in Gothenburg. Loves sailing."
+    assert run_activity(lookup_cv_analysis, unrelated_cv) is None
+
+
+def test_near_duplicate_cv_is_found_at_the_default_threshold(monkeypatch, use_stub):
+    """A CV with one line added clears the default similarity threshold."""
+    monkeypatch.setattr(Config, 'CV_SIMILARITY_THRESHOLD', 0.9)
+
+    with LLMStubServer(responder=lambda prompt: json.dumps(["Technology", "Cryptocurrency"])) as stub:
+        use_stub(stub)
+        run_activity(analyze_cv_with_llm, sample_cv)
+
+    edited_cv = sample_cv + "Volunteer: Aviation club.\n"
+    assert run_activity(lookup_cv_analysis, edited_cv) == ["Technology", "Cryptocurrency", "Aviation"]
+    assert len(stub.requests) == 1
+
+
+def test_preprocessing_strips_boilerplate_and_repeats():
+    """Page furniture, repeated headers and consent statements are dropped before prompting."""
+    page_header = "Jane Doe - Software Engineer"
+    raw_cv = (
+        "CURRICULUM VITAE\r\n" + sample_cv + "\n\n\nPage 1 of 2\n" + "-" * 40 + "\n"
+        + page_header + "\n   Speaks   Swedish\tand English.\n"
+        + "References available upon request.\n"
+        + "I consent to the processing of my personal data for recruitment purposes.\n"
+    )
+
+    [chunk] = preprocess_cv(raw_cv, chunk_tokens=1500, max_chunks=4)
+
+    assert chunk.count(page_header) == 1
+    assert "Speaks Swedish and English." in chunk
+    assert "CURRICULUM" not in chunk and "Page 1" not in chunk and "---" not in chunk
+    assert "References" not in chunk and "consent" not in chunk
+    assert "\n\n\n" not in chunk
+
+
+def test_preprocessing_keeps_repeated_content():
+    """Only lines repeated at page breaks are headers or footers; other repeats are CV content."""
+    raw_cv = (
+        "Jane Doe\nBackend developer, Acme\nPython\nBuilt the billing API.\nPage 1 of 2\nJane Doe\n"
+        "Data engineer, Initech\nPython\nRan the data pipelines.\nPage 2 of 2\n"
+    )
+
+    [chunk] = preprocess_cv(raw_cv, chunk_tokens=1500, max_chunks=4)
+
+    assert chunk.count("Jane Doe") == 1
+    assert chunk.count("Python") == 2
+
+
+def test_oversized_cv_is_chunked_and_votes_merged(monkeypatch, use_stub):
+    """Long CVs are analysed in bounded chunks and the interests found across chunks are merged."""
+    monkeypatch.setattr(Config, 'CV_CHUNK_TOKENS', 200)
+    monkeypatch.setattr(Config, 'CV_MAX_CHUNKS', 3)
+
+    paragraphs = [f"Project {i}: built systems for technology companies and travel agencies." for i in range(200)]
+    long_cv = sample_cv + "\n".join(paragraphs)
+
+    def respond(prompt):
+        cv_part = prompt.split("CV TEXT:", 1)[1]
+        return json.dumps(["Technology", "Gaming"] if "Hobbies" in cv_part else ["Travel", "Technology"])
+
+    with LLMStubServer(responder=respond) as stub:
+        use_stub(stub)
+        interests = run_activity(analyze_cv_with_llm, long_cv)
+
+    prompts = [request['messages'][-1]['content'] for request in stub.requests]
+    assert len(prompts) == 3
+    assert all(len(p.split("CV TEXT:", 1)[1].split("Respond with")[0]) <= 200 * 4 + 4 for p in prompts)
+    assert interests == ["Technology", "Travel", "Gaming"]
+    assert run_activity(lookup_cv_analysis, long_cv) == interests
+
+
+def test_merge_interest_votes_ranks_by_agreement():
+    assert merge_interest_votes([["A", "B"], ["B", "C"], ["C", "B", "B"]]) == ["B", "C", "A"]
+    assert merge_interest_votes([[str(i)] for i in range(10)], limit=3) == ["0", "1", "2"]
+    # A single chunk is not a vote, so none of its interests are cut
+    assert merge_interest_votes([[str(i) for i in range(10)]], limit=3) == [str(i) for i in range(10)]
+
+
+def test_fast_path_skips_llm_for_clear_cvs(monkeypatch):
+    """Clearly stated interests are classified locally; ambiguous CVs still go to the LLM."""
+    monkeypatch.setattr(Config, 'CV_FAST_PATH_ENABLED', True)
+
+    assert run_activity(lookup_cv_analysis, sample_cv) == ["Technology", "Gaming", "Travel", "Food", "Cryptocurrency"]
+
+    vague_cv = "Project coordinator who enjoys working with people and solving problems."
+    assert run_activity(lookup_cv_analysis, vague_cv) is None
+
+    stats = activities._interest_classifier.stats()
+    assert stats['evaluated'] == 2 and stats['fast_path'] == 1
+    assert stats['fast_path_rate'] == 0.5
@@ -0,0 +1,146 @@
+"""
+Tests for in-process matching, the API's alternative to the Temporal workflow for small rosters.
+These tests never start a workflow or call the geocoding API.
+"""
+
+import asyncio
+from collections import deque
+import pytest
+from temporalio.testing import ActivityEnvironment
+import activities
+import app
+from activities import calculate_mentor_matches, match_in_process
+from config import Config
+from distance_table import get_distance_table
+from geocoding import GeocodingService, get_geocoding_service
+from matching import MatchingScorer
+from metrics import metrics
+from mock_mentors import get_mock_mentors
+
+
+@pytest.fixture
+def cached_postcodes(sample_student):
+    """Put every mock postcode in the geocoding cache, spread around Stockholm."""
+    service = get_geocoding_service()
+    postcodes = {sample_student['postcode']} | {m['postcode'] for m in get_mock_mentors()}
+    added = {postcode: (59.0 + i / 10, 18.0) for i, postcode in enumerate(sorted(postcodes))
+             if postcode not in service._cache}
+    service._cache.update(added)
+    yield
+    for postcode in added:
+        service._cache.pop(postcode, None)
+
+
+def test_in_process_matching_matches_the_workflow_activities(monkeypatch, cached_postcodes, sample_student):
+    """In-process matching returns what the workflow's activities return for the same coordinates."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    mentors = get_mock_mentors()
+    coordinates, _ = get_geocoding_service().lookup_cached(
+        {'student': sample_student['postcode'], **{m['id']: m['postcode'] for m in mentors}}
+    )
+
+    inline = asyncio.run(match_in_process(sample_student, mentors))
+    expected = asyncio.run(ActivityEnvironment().run(calculate_mentor_matches, sample_student, mentors, coordinates))
+
+    assert inline == expected
+
+
+def test_in_process_matching_only_needs_candidate_postcodes(monkeypatch, sample_student):
+    """Location pruning decides which postcodes in-process matching needs from the cache."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    mentors = get_mock_mentors()
+    in_person = {m['id'] for m in mentors if m['meeting_preference'].lower() != 'online'}
+    scorer = MatchingScorer()
+
+    # With the default top 10 every one of the 10 mentors who meet in person is a candidate
+    assert set(scorer.select_location_candidates(sample_student, mentors, 10)) == in_person
+
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 3)
+    candidates = scorer.select_location_candidates(sample_student, mentors, 3)
+    assert len(candidates) < len(in_person)
+
+    postcodes = {m['id']: m['postcode'] for m in mentors}
+    cached = {sample_student['postcode']: (59.33, 18.06),
+              **{postcodes[mentor_id]: (59.40, 18.00) for mentor_id in candidates}}
+    monkeypatch.setattr(Config, 'GEOCODE_CACHE_DB', None)
+    service = GeocodingService()
+    monkeypatch.setattr(service, '_cache', dict(cached))
+    monkeypatch.setattr(activities, 'get_geocoding_service', lambda: service)
+
+    matches = asyncio.run(match_in_process(sample_student, mentors))
+    # Mentors outside the candidates can be anywhere without changing the top matches
+    coordinates = {'student': cached[sample_student['postcode']],
+                   **{m['id']: cached.get(m['postcode'], (67.86, 20.23)) for m in mentors}}
+    expected = MatchingScorer(distance_table=get_distance_table()).calculate_matches(
+        sample_student, mentors, coordinates)[:3]
+    assert [(m['mentor_id'], m['score']) for m in matches[:3]] == [(m['mentor_id'], m['score']) for m in expected]
+
+
+def test_uncached_postcodes_defer_to_the_workflow(monkeypatch, sample_student):
+    """A postcode that was never geocoded sends the match to Temporal without calling the API in process."""
+    def fail_geocoding(self, postcode):
+        raise AssertionError("The API process should not call the geocoding API")
+
+    monkeypatch.setattr(GeocodingService, '_geocode_single_postcode', fail_geocoding)
+    student = {**sample_student, 'postcode': '98499'}
+
+    assert asyncio.run(match_in_process(student, get_mock_mentors())) is None
+
+    with pytest.raises(ValueError):
+        asyncio.run(match_in_process({**sample_student, 'languages': []}, get_mock_mentors()))
+
+
+def test_shared_geocoding_cache_reaches_the_api_process(monkeypatch, tmp_path):
+    """Postcodes a worker resolved are found by the API process through GEOCODE_CACHE_DB."""
+    monkeypatch.setattr(Config, 'GEOCODE_CACHE_DB', str(tmp_path / 'geocoding.sqlite'))
+    worker, api = GeocodingService(), GeocodingService()
+
+    worker._remember('98499', (65.58, 22.15))
+    worker._remember('98500', None)
+
+    coordinates, missing = api.lookup_cached({'student': '98499', 'mentor-1': '98500', 'mentor-2': '98501'})
+    assert coordinates == {'student': (65.58, 22.15)}
+    assert missing == ['mentor-2']
+
+
+def test_auto_mode_uses_size_and_latency_thresholds(monkeypatch, tmp_path):
+    """Auto mode matches small, fast rosters in process and everything else through Temporal."""
+    metrics.reset()
+    monkeypatch.setattr(app, 'inline_timings', deque(maxlen=1000))
+    monkeypatch.setattr(Config, 'MATCHING_EXECUTION', 'auto')
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    monkeypatch.setattr(Config, 'INLINE_MATCHING_MAX_MENTORS', 50)
+    monkeypatch.setattr(Config, 'INLINE_MATCHING_MAX_MS', 100)
+    monkeypatch.setattr(Config, 'GEOCODE_CACHE_DB', None)
+    monkeypatch.setattr(Config, 'SNIPPET_CACHE_DB', None)
+    mentors = get_mock_mentors()
+
+    # Without the workers' shared caches the API could not give the workflow's answer
+    assert not app.use_inline_matching(mentors)
+    monkeypatch.setattr(Config, 'GEOCODE_CACHE_DB', str(tmp_path / 'geocoding.sqlite'))
+    assert app.use_inline_matching(mentors)
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'snippets')
+    assert not app.use_inline_matching(mentors)
+    monkeypatch.setattr(Config, 'SNIPPET_CACHE_DB', str(tmp_path / 'snippets.sqlite'))
+    assert app.use_inline_matching(mentors)
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    assert not app.use_inline_matching(mentors * 4)
+
+    # 10ms per mentor puts a roster of this size over the latency threshold
+    app.record_inline_timing(0.01)
+    assert not app.use_inline_matching(mentors)
+    assert app.use_inline_matching(mentors[:5])
+
+    # Once the slow samples expire, matches are tried in process again
+    monkeypatch.setattr(Config, 'INLINE_MATCHING_WINDOW_SECONDS', 0)
+    assert app.use_inline_matching(mentors)
+
+    # LLM reasoning stays in the durable workflow unless in-process matching is forced
+    metrics.reset()
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    assert not app.use_inline_matching(mentors)
+    monkeypatch.setattr(Config, 'MATCHING_EXECUTION', 'inline')
+    assert app.use_inline_matching(mentors)
+    monkeypatch.setattr(Config, 'MATCHING_EXECUTION', 'temporal')
+    assert not app.use_inline_matching(mentors)
+    metrics.reset()
@@ -0,0 +1,114 @@
+"""
+Tests for the LLM model fallback chain and its adaptive latency budgets.
+These tests run against a local LLM stub serving models with different latencies.
+"""
+
+import asyncio
+import time
+import pytest
+from config import Config
+from llm_client import chat_completion, latency_budget, model_chain
+from llm_stub import LLMStubServer, LatencyProfile
+from metrics import metrics
+
+MESSAGES = [{"role": "user", "content": "Name: Anna"}]
+
+
+@pytest.fixture(autouse=True)
+def fallback_chain(monkeypatch):
+    """Primary model 'slow' falls back to 'fast'; budgets trust 5 samples."""
+    monkeypatch.setattr(Config, 'LLM_FALLBACK_MODELS', ['fast'])
+    monkeypatch.setattr(Config, 'LLM_BUDGET_MIN_SAMPLES', 5)
+    monkeypatch.setattr(Config, 'LLM_BUDGET_MIN_SECONDS', 0.05)
+    monkeypatch.setattr(Config, 'LLM_BUDGET_MAX_SECONDS', 2.0)
+    metrics.reset()
+
+
+def observe_successes(model, seconds, count=5):
+    for _ in range(count):
+        metrics.observe('llm_latency_seconds', seconds, model=model, operation='test', outcome='success')
+
+
+def complete():
+    start = time.perf_counter()
+    response = asyncio.run(chat_completion('test', model='slow', messages=MESSAGES))
+    return response, time.perf_counter() - start
+
+
+def test_budget_follows_observed_p95():
+    assert model_chain('slow') == ['slow', 'fast']
+    assert model_chain('fast') == ['fast']
+
+    # Too few samples: the maximum budget applies
+    observe_successes('slow', 0.1, count=4)
+    assert latency_budget('slow', 'test') == 2.0
+
+    observe_successes('slow', 0.1, count=1)
+    assert latency_budget('slow', 'test') == pytest.approx(0.15)
+
+    # Abandoned calls don't stretch the budget
+    metrics.observe('llm_latency_seconds', 1.5, model='slow', operation='test', outcome='cancelled')
+    assert latency_budget('slow', 'test') == pytest.approx(0.15)
+
+    # Clamped to the configured bounds
+    observe_successes('fast', 0.001)
+    assert latency_budget('fast', 'test') == 0.05
+
+
+def test_slow_model_hands_over_when_budget_exceeded(use_stub):
+    """A model that is slower than its usual p95 gives way to the next model instead of blocking."""
+    observe_successes('slow', 0.05)
+    latency = {'slow': LatencyProfile(2000), 'fast': LatencyProfile(20)}
+
+    with LLMStubServer(model_latency=latency) as stub:
+        use_stub(stub)
+        response, elapsed = complete()
+
+    assert response.model == 'fast'
+    assert elapsed < 1.5
+    assert metrics.counter('llm_requests_total', model='slow') == 1
+    assert metrics.counter('llm_requests_total', model='fast') == 1
+    assert metrics.counter('llm_model_fallbacks_total', model='slow', reason='budget_exceeded') == 1
+    assert metrics.histogram('llm_latency_seconds', model='fast', outcome='success')['count'] == 1
+
+
+def test_model_within_budget_answers(use_stub):
+    """Without history the generous maximum budget applies and the primary model answers."""
+    latency = {'slow': LatencyProfile(100), 'fast': LatencyProfile(20)}
+
+    with LLMStubServer(model_latency=latency) as stub:
+        use_stub(stub)
+        response, _ = complete()
+
+    assert response.model == 'slow'
+    assert metrics.counter('llm_model_fallbacks_total') == 0
+
+
+def test_upstream_errors_fall_through_without_retries(use_stub):
+    """A rate-limited model is skipped immediately; only the last model retries."""
+    with LLMStubServer(rate_limit_rate=1.0) as stub:
+        use_stub(stub)
+        with pytest.raises(Exception):
+            complete()
+        by_model = stub.stats()['by_model']
+
+    assert by_model['slow']['requests'] == 1
+    assert by_model['fast']['requests'] > 1
+    assert metrics.counter('llm_model_fallbacks_total', model='slow', reason='RateLimitError') == 1
+
+
+def test_caller_deadline_leaves_time_for_the_fallback_model(use_stub):
+    """Without history, a slow primary model gets only its share of the caller's deadline."""
+    latency = {'slow': LatencyProfile(2000), 'fast': LatencyProfile(20)}
+
+    with LLMStubServer(model_latency=latency) as stub:
+        use_stub(stub)
+        start = time.perf_counter()
+        response = asyncio.run(asyncio.wait_for(
+            chat_completion('test', deadline_seconds=1.0, model='slow', messages=MESSAGES),
+            timeout=1.0
+        ))
+
+    assert response.model == 'fast'
+    assert time.perf_counter() - start < 1.0
+    assert metrics.counter('llm_model_fallbacks_total', model='slow', reason='budget_exceeded') == 1
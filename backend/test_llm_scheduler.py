@@ -0,0 +1,126 @@
+"""
+Tests for the per-worker LLM scheduler.
+
+Run with: python -m pytest test_llm_scheduler.py
+"""
+
+import asyncio
+import time
+import pytest
+from temporalio.testing import ActivityEnvironment
+import activities
+from config import Config
+from llm_scheduler import BATCH, INTERACTIVE, LLMOverloadedError, LLMScheduler
+from llm_stub import LLMStubServer, LatencyProfile
+from metrics import metrics
+from mock_mentors import get_mock_mentors
+
+
+async def run_jobs(scheduler, jobs, hold=0.01):
+    """Start jobs (priority, flow, name) in order and return the order they were admitted in."""
+    admitted = []
+
+    async def job(priority, flow, name):
+        async with scheduler.slot(priority, tokens=1, flow=flow):
+            admitted.append(name)
+            await asyncio.sleep(hold)
+
+    tasks = []
+    for priority, flow, name in jobs:
+        tasks.append(asyncio.create_task(job(priority, flow, name)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return admitted
+
+
+def test_interactive_calls_jump_the_batch_queue():
+    scheduler = LLMScheduler(max_concurrency=1)
+    jobs = [(BATCH, 'cv', 'batch-1'), (BATCH, 'cv', 'batch-2'), (BATCH, 'cv', 'batch-3'),
+            (INTERACTIVE, 'match', 'interactive-1')]
+
+    assert asyncio.run(run_jobs(scheduler, jobs)) == ['batch-1', 'interactive-1', 'batch-2', 'batch-3']
+
+
+def test_flows_are_served_round_robin():
+    scheduler = LLMScheduler(max_concurrency=1)
+    jobs = [(BATCH, 'a', 'a1'), (BATCH, 'a', 'a2'), (BATCH, 'a', 'a3'), (BATCH, 'b', 'b1'), (BATCH, 'c', 'c1')]
+
+    assert asyncio.run(run_jobs(scheduler, jobs)) == ['a1', 'a2', 'b1', 'c1', 'a3']
+
+
+def test_batch_work_cannot_use_reserved_slots():
+    scheduler = LLMScheduler(max_concurrency=3, interactive_reserved=1)
+    peak = {'batch': 0}
+
+    async def main():
+        async def batch_job():
+            async with scheduler.slot(BATCH, tokens=1):
+                peak['batch'] = max(peak['batch'], scheduler.stats()['running'][BATCH])
+                await asyncio.sleep(0.05)
+
+        tasks = [asyncio.create_task(batch_job()) for _ in range(6)]
+        await asyncio.sleep(0.01)
+
+        # An interactive call is admitted at once even though batch work is queued
+        start = time.monotonic()
+        async with scheduler.slot(INTERACTIVE, tokens=1):
+            waited = time.monotonic() - start
+        await asyncio.gather(*tasks)
+        return waited
+
+    assert asyncio.run(main()) < 0.01
+    assert peak['batch'] == 2
+
+
+def test_batch_work_is_shed_under_pressure():
+    metrics.reset()
+
+    async def main():
+        scheduler = LLMScheduler(max_concurrency=1, batch_max_queue=1, batch_max_wait_seconds=0.05)
+        await scheduler.acquire(INTERACTIVE, tokens=1)
+
+        waiting = asyncio.create_task(scheduler.acquire(BATCH, tokens=1))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloadedError):
+            await scheduler.acquire(BATCH, tokens=1)
+        with pytest.raises(LLMOverloadedError):
+            await waiting
+        assert scheduler.stats()['queued'][BATCH] == 0
+
+    asyncio.run(main())
+    assert metrics.counter('llm_shed_total', reason='queue_full') == 1
+    assert metrics.counter('llm_shed_total', reason='timeout') == 1
+
+
+def test_tokens_per_minute_budget_delays_calls():
+    async def main():
+        # 6000 tokens per minute refills 100 tokens per second
+        scheduler = LLMScheduler(max_concurrency=4, tokens_per_minute=6000)
+        async with scheduler.slot(INTERACTIVE, tokens=6000):
+            pass
+        start = time.monotonic()
+        async with scheduler.slot(INTERACTIVE, tokens=20):
+            return time.monotonic() - start
+
+    assert 0.15 <= asyncio.run(main()) < 0.5
+
+
+def test_activities_route_llm_calls_by_priority(monkeypatch, online_student, use_stub, run_matches):
+    """Match reasoning runs as interactive work while snippet generation runs as batch work."""
+    metrics.reset()
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 3)
+    monkeypatch.setattr(Config, 'LLM_MAX_CONCURRENCY', 2)
+    monkeypatch.setattr(Config, 'LLM_INTERACTIVE_RESERVED', 1)
+    activities.reasoning_cache.clear()
+    activities.mentor_snippet_cache.clear()
+
+    with LLMStubServer(latency=LatencyProfile(20)) as stub:
+        use_stub(stub)
+        run_matches(online_student, get_mock_mentors())
+        asyncio.run(ActivityEnvironment().run(activities.refresh_mentor_snippets, get_mock_mentors()[:4]))
+
+    assert metrics.histogram('llm_scheduler_wait_seconds', priority=INTERACTIVE)['count'] == 3
+    assert metrics.histogram('llm_scheduler_wait_seconds', priority=BATCH)['count'] == 4
+    activities.reasoning_cache.clear()
+    activities.mentor_snippet_cache.clear()
@@ -0,0 +1,70 @@
+"""
+Tests for the local LLM stub server.
+
+Run with: python -m pytest test_llm_stub.py
+"""
+
+import asyncio
+import time
+import openai
+import pytest
+from openai import AsyncOpenAI
+from llm_stub import LLMStubServer, LatencyProfile, default_response
+
+
+def complete(stub, prompt, model="stub-model"):
+    async def run():
+        client = AsyncOpenAI(base_url=stub.base_url, api_key="stub-key", max_retries=0)
+        try:
+            response = await client.chat.completions.create(
+                model=model, messages=[{"role": "user", "content": prompt}]
+            )
+            return response.choices[0].message.content, response.usage
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+def test_default_responses_follow_backend_prompts():
+    cv_prompt = "PREDEFINED INTERESTS LIST:\nTechnology, Music, Gaming\n\nCV TEXT:\nI build technology for music festivals."
+    assert default_response(cv_prompt) == '["Technology", "Music"]'
+
+    batch_prompt = "Mentor ID: m1\nName: Anna\n\nMentor ID: m2\nName: Erik"
+    assert '"mentor_id": "m2"' in default_response(batch_prompt)
+
+
+def test_token_accounting_per_model():
+    with LLMStubServer() as stub:
+        content, usage = complete(stub, "Name: Anna\nRole: Engineer", model="model-a")
+        complete(stub, "hello", model="model-b")
+
+        stats = stub.stats()
+
+    assert "Anna" in content
+    assert stats['requests'] == 2
+    assert stats['by_model']['model-a']['completion_tokens'] == usage.completion_tokens
+    assert stats['prompt_tokens'] == usage.prompt_tokens + stats['by_model']['model-b']['prompt_tokens']
+
+
+def test_error_injection_and_model_latency():
+    with LLMStubServer(error_rate=1.0) as stub:
+        with pytest.raises(openai.InternalServerError):
+            complete(stub, "hello")
+        assert stub.stats()['errors'] == 1
+
+    with LLMStubServer(rate_limit_rate=1.0) as stub:
+        with pytest.raises(openai.RateLimitError):
+            complete(stub, "hello")
+
+    slow = {"slow-model": LatencyProfile(mean_ms=300)}
+    with LLMStubServer(model_latency=slow) as stub:
+        start = time.perf_counter()
+        complete(stub, "hello", model="fast-model")
+        fast_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        complete(stub, "hello", model="slow-model")
+        slow_elapsed = time.perf_counter() - start
+
+    assert slow_elapsed >= 0.3 > fast_elapsed
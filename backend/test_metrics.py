@@ -0,0 +1,94 @@
+"""
+Tests for the metrics registry and LLM call instrumentation.
+These tests run the activities outside a worker against a local LLM stub.
+"""
+
+import asyncio
+import dataclasses
+import pytest
+from temporalio.testing import ActivityEnvironment
+import activities
+from activities import analyze_cv_with_llm
+from config import Config
+from llm_stub import LLMStubServer
+from metrics import MetricsRegistry, metrics
+
+sample_cv = """
+Backend developer working on payment systems in Python.
+Hobbies: gaming, travel and cooking.
+"""
+
+
+def run_activity(fn, *args):
+    """Run an activity in a test environment that reports its real activity type."""
+    env = ActivityEnvironment()
+    env.info = dataclasses.replace(env.info, activity_type=fn.__name__)
+    return asyncio.run(env.run(fn, *args))
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics(monkeypatch):
+    """Start every test with empty metrics and the LLM path forced."""
+    monkeypatch.setattr(Config, 'CV_FAST_PATH_ENABLED', False)
+    metrics.reset()
+    activities.cv_analysis_cache.clear()
+    yield
+    activities.cv_analysis_cache.clear()
+
+
+def test_registry_counters_and_histograms():
+    registry = MetricsRegistry()
+    registry.inc('calls', activity='a', model='m1')
+    registry.inc('calls', 2, activity='b', model='m1')
+    for value in (0.1, 0.2, 0.3, 0.4):
+        registry.observe('latency', value, model='m1')
+    registry.observe('latency', 5.0, model='m2')
+
+    assert registry.counter('calls') == 3
+    assert registry.counter('calls', activity='b') == 2
+    assert registry.counter('calls', model='m2') == 0
+
+    assert registry.histogram('latency', model='m1')['count'] == 4
+    assert registry.quantile('latency', 0.5, model='m1') == 0.2
+    assert registry.quantile('latency', 0.99) == 5.0
+    assert registry.histogram('missing') is None
+    assert len(registry.snapshot()['histograms']) == 2
+
+
+def test_llm_calls_record_latency_and_tokens(use_stub):
+    """Every LLM call records latency and token usage labelled by activity and model."""
+    with LLMStubServer(responder=lambda prompt: '["Technology", "Gaming"]') as stub:
+        use_stub(stub)
+        run_activity(analyze_cv_with_llm, sample_cv)
+        stub_stats = stub.stats()
+
+    labels = {'activity': 'analyze_cv_with_llm', 'operation': 'cv_analysis', 'model': Config.LLM_MODEL}
+    assert metrics.counter('llm_requests_total', **labels) == 1
+    assert metrics.histogram('llm_latency_seconds', **labels)['count'] == 1
+    assert metrics.counter('llm_prompt_tokens_total', **labels) == stub_stats['prompt_tokens']
+    assert metrics.counter('llm_completion_tokens_total', **labels) == stub_stats['completion_tokens']
+    assert metrics.counter('llm_parse_failures_total') == 0
+
+
+def test_parse_failures_and_fallbacks_are_counted(use_stub):
+    """A non-JSON answer counts as a parse failure and, if interests are found, a fallback."""
+    with LLMStubServer(responder=lambda prompt: "I think Technology and Gaming fit best.") as stub:
+        use_stub(stub)
+        interests = run_activity(analyze_cv_with_llm, sample_cv)
+
+    assert interests == ["Technology", "Gaming"]
+    assert metrics.counter('llm_parse_failures_total', operation='cv_analysis') == 1
+    assert metrics.counter('llm_fallbacks_total', operation='cv_analysis') == 1
+
+
+def test_retries_and_errors_are_counted(use_stub):
+    """Client-side retries of a failing upstream are counted per call."""
+    with LLMStubServer(error_rate=1.0) as stub:
+        use_stub(stub)
+        with pytest.raises(Exception):
+            run_activity(analyze_cv_with_llm, sample_cv)
+        attempts = stub.stats()['requests']
+
+    assert attempts > 1
+    assert metrics.counter('llm_retries_total', activity='analyze_cv_with_llm') == attempts - 1
+    assert metrics.counter('llm_errors_total', error='InternalServerError') == 1
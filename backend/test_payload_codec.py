@@ -0,0 +1,119 @@
+"""
+Tests for the compressing Temporal payload codec and the msgpack payload converter.
+These tests run the data converter directly, without a Temporal server.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+import pytest
+import temporalio.converter
+from temporalio.api.common.v1 import Payload
+from mock_mentors import get_mock_mentors
+from payload_codec import CompressionCodec, _zstd_available
+from payload_converter import JSONPayloadConverter, MsgPackPayloadConverter
+
+
+@pytest.fixture
+def matching_request(sample_student):
+    return {'student': sample_student, 'mentors': get_mock_mentors()}
+
+
+def round_trip(converter, value):
+    async def main():
+        payloads = await converter.encode([value])
+        return payloads, await converter.decode(payloads, [type(value)])
+    return asyncio.run(main())
+
+
+def test_large_payloads_are_compressed(matching_request):
+    codec = CompressionCodec('zlib', threshold_bytes=1024)
+    payloads, decoded = round_trip(temporalio.converter.DataConverter(payload_codec=codec), matching_request)
+
+    assert decoded == [matching_request]
+    assert payloads[0].metadata['encoding'] == b'binary/zlib'
+
+    stats = codec.stats()
+    assert stats['compressed'] == 1
+    assert stats['bytes_out'] < stats['bytes_in'] / 2
+
+
+def test_small_payloads_are_left_alone():
+    codec = CompressionCodec('zlib', threshold_bytes=1024)
+    payloads, decoded = round_trip(temporalio.converter.DataConverter(payload_codec=codec), 'short')
+
+    assert decoded == ['short']
+    assert payloads[0].metadata['encoding'] == b'json/plain'
+    assert codec.stats()['compressed'] == 0
+
+
+def test_uncompressed_payloads_still_decode(matching_request):
+    """Histories written before compression was enabled keep working."""
+    legacy = asyncio.run(temporalio.converter.default().encode([matching_request]))
+    converter = temporalio.converter.DataConverter(payload_codec=CompressionCodec('zlib'))
+
+    assert asyncio.run(converter.decode(legacy, [dict])) == [matching_request]
+
+
+def test_zstd_falls_back_to_zlib_without_zstandard():
+    codec = CompressionCodec('zstd', threshold_bytes=0)
+    payload = Payload(metadata={'encoding': b'json/plain'}, data=b'{"bio": "' + b'mentor ' * 200 + b'"}')
+
+    encoded = asyncio.run(codec.encode([payload]))
+    assert encoded[0].metadata['encoding'] == (b'binary/zstd' if _zstd_available() else b'binary/zlib')
+    assert asyncio.run(codec.decode(encoded)) == [payload]
+
+
+def test_msgpack_converter_round_trips_matching_types(matching_request):
+    pytest.importorskip('msgpack')
+    converter = temporalio.converter.DataConverter(payload_converter_class=MsgPackPayloadConverter)
+    coordinates = {'student': (59.3293, 18.0686), 'mentor-1': (57.7089, 11.9746)}
+    matches = [{'mentor_id': 'mentor-1', 'score': 87, 'reasoning': 'Anna shares your interest in music.'}]
+
+    async def main():
+        payloads = await converter.encode([matching_request, coordinates, matches])
+        decoded = await converter.decode(
+            payloads, [Dict[str, Any], Dict[str, Tuple[float, float]], List[Dict[str, Any]]]
+        )
+        return payloads, decoded
+
+    payloads, decoded = asyncio.run(main())
+    assert [p.metadata['encoding'] for p in payloads] == [b'binary/msgpack'] * 3
+    assert decoded == [matching_request, coordinates, matches]
+
+
+def test_converters_decode_each_others_payloads(matching_request):
+    """JSON and msgpack clients can be switched over one at a time."""
+    pytest.importorskip('msgpack')
+    msgpack_converter = temporalio.converter.DataConverter(payload_converter_class=MsgPackPayloadConverter)
+    json_converter = temporalio.converter.DataConverter(payload_converter_class=JSONPayloadConverter)
+
+    from_msgpack = asyncio.run(msgpack_converter.encode([matching_request]))
+    from_json = asyncio.run(json_converter.encode([matching_request]))
+
+    assert from_json[0].metadata['encoding'] == b'json/plain'
+    assert asyncio.run(json_converter.decode(from_msgpack, [dict])) == [matching_request]
+    assert asyncio.run(msgpack_converter.decode(from_json, [dict])) == [matching_request]
+
+
+def test_values_msgpack_cannot_encode_fall_back_to_json():
+    pytest.importorskip('msgpack')
+    converter = temporalio.converter.DataConverter(payload_converter_class=MsgPackPayloadConverter)
+
+    @dataclass
+    class Suggestion:
+        mentor_id: str
+        score: int
+
+    payloads = asyncio.run(converter.encode([Suggestion('mentor-1', 87)]))
+    assert payloads[0].metadata['encoding'] == b'json/plain'
+    assert asyncio.run(converter.decode(payloads, [Suggestion])) == [Suggestion('mentor-1', 87)]
+
+
+def test_zstd_payloads_need_zstandard_to_decode(monkeypatch):
+    """A host without zstandard reports why it cannot read zstd payloads from other hosts."""
+    monkeypatch.setattr('payload_codec._zstd_available', lambda: False)
+    payload = Payload(metadata={'encoding': b'binary/zstd'}, data=b'\x28\xb5\x2f\xfd')
+
+    with pytest.raises(RuntimeError, match='zstandard is not installed'):
+        asyncio.run(CompressionCodec('zlib').decode([payload]))
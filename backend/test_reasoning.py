@@ -0,0 +1,362 @@
+"""
+Offline tests for match reasoning generation.
+These tests run the activities outside a worker and never call the real LLM.
+"""
+
+import asyncio
+import json
+import re
+import time
+import pytest
+from temporalio.testing import ActivityEnvironment
+import activities
+from activities import (calculate_mentor_matches, combine_mentor_matches, reason_settled_matches,
+                        score_location_independent)
+from config import Config
+from llm_stub import LLMStubServer
+from matching import MatchingScorer
+from metrics import metrics
+from mock_mentors import get_mock_mentors
+from reasoning_templates import template_reasoning, evidence_sentences
+
+@pytest.fixture(autouse=True)
+def clear_reasoning_cache():
+    """Start every test with an empty reasoning cache."""
+    activities.reasoning_cache.clear()
+    yield
+    activities.reasoning_cache.clear()
+
+
+def expected_template(match, student):
+    """Template reasoning expected for a match without coordinates."""
+    mentor = {m['id']: m for m in get_mock_mentors()}[match['mentor_id']]
+    evidence = MatchingScorer().explain(student, mentor)
+    return template_reasoning(mentor, match['score'], evidence)
+
+
+def test_reasoning_fans_out_concurrently(monkeypatch, online_student, run_matches):
+    """Top-K reasoning calls run concurrently, keep their order and fall back on timeout."""
+    delay = 0.2
+
+    async def fake_reasoning(student, mentor, score, logger=None):
+        if mentor['id'] == 'mentor-music-1':
+            await asyncio.sleep(10)
+        await asyncio.sleep(delay)
+        return f"reasoning for {mentor['id']}"
+
+    monkeypatch.setattr(activities, 'generate_match_reasoning', fake_reasoning)
+    monkeypatch.setattr(Config, 'REASONING_CONCURRENCY', 10)
+    monkeypatch.setattr(Config, 'REASONING_TIMEOUT_SECONDS', 1.0)
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 10)
+
+    start = time.monotonic()
+    matches = run_matches(online_student, get_mock_mentors())
+    elapsed = time.monotonic() - start
+
+    # Ten sequential calls would take at least 10 * delay
+    assert elapsed < 10 * delay
+    assert [m['score'] for m in matches] == sorted((m['score'] for m in matches), reverse=True)
+
+    for match in matches[:10]:
+        if match['mentor_id'] == 'mentor-music-1':
+            assert match['reasoning'] == expected_template(match, online_student)
+        else:
+            assert match['reasoning'] == f"reasoning for {match['mentor_id']}"
+
+
+def test_failed_reasoning_calls_keep_the_template(monkeypatch, online_student, use_stub, run_matches):
+    """Top matches whose LLM call fails keep their template reasoning and count as fallbacks."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 3)
+    metrics.reset()
+
+    with LLMStubServer(error_rate=1.0) as stub:
+        use_stub(stub)
+        matches = run_matches(online_student, get_mock_mentors())
+
+    assert stub.stats()['errors'] >= 3
+    assert all(match['reasoning'] == expected_template(match, online_student) for match in matches)
+    assert metrics.counter('llm_fallbacks_total', operation='match_reasoning') == 3
+
+
+def test_concurrency_cap_is_respected(monkeypatch, online_student, run_matches):
+    """No more than REASONING_CONCURRENCY reasoning calls run at once."""
+    running = 0
+    peak = 0
+
+    async def fake_reasoning(student, mentor, score, logger=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    monkeypatch.setattr(activities, 'generate_match_reasoning', fake_reasoning)
+    monkeypatch.setattr(Config, 'REASONING_CONCURRENCY', 3)
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 10)
+
+    run_matches(online_student, get_mock_mentors())
+    assert peak == 3
+
+
+def test_batched_reasoning_uses_one_call(monkeypatch, online_student, use_stub, run_matches):
+    """Batched mode makes a single LLM call and falls back per item for bad entries."""
+
+    def respond(prompt):
+        mentor_ids = re.findall(r"Mentor ID: (\S+)", prompt)
+        items = [{"mentor_id": mentor_id, "reasoning": f"batched for {mentor_id}"} for mentor_id in mentor_ids]
+        # Drop two mentors and blank out a third
+        items = items[2:]
+        items[0]['reasoning'] = ""
+        return "```json\n" + json.dumps(items + ["not an object"]) + "\n```"
+
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'batched')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 5)
+
+    with LLMStubServer(responder=respond) as stub:
+        use_stub(stub)
+        matches = run_matches(online_student, get_mock_mentors())
+
+    assert len(stub.requests) == 1
+    top = matches[:5]
+    for i, match in enumerate(top):
+        if i < 3:
+            assert match['reasoning'] == expected_template(match, online_student)
+        else:
+            assert match['reasoning'] == f"batched for {match['mentor_id']}"
+
+
+def test_batched_reasoning_malformed_output(monkeypatch, online_student, use_stub, run_matches):
+    """Unparseable batched output falls back for every match."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'batched')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 3)
+
+    with LLMStubServer(responder=lambda prompt: "Sorry, I can't help with that.") as stub:
+        use_stub(stub)
+        matches = run_matches(online_student, get_mock_mentors())
+
+    assert len(stub.requests) == 1
+    for match in matches[:3]:
+        assert match['reasoning'] == expected_template(match, online_student)
+
+
+def test_per_mentor_reasoning_against_stub(monkeypatch, online_student, use_stub, run_matches):
+    """Per-mentor mode makes one call per top match."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 4)
+
+    def respond(prompt):
+        return "Name: " + re.search(r"Name: (.*)", prompt).group(1)
+
+    with LLMStubServer(responder=respond) as stub:
+        use_stub(stub)
+        matches = run_matches(online_student, get_mock_mentors())
+
+    assert len(stub.requests) == 4
+    mentors_by_id = {m['id']: m for m in get_mock_mentors()}
+    for match in matches[:4]:
+        mentor = mentors_by_id[match['mentor_id']]
+        assert match['reasoning'] == f"Name: {mentor['first_name']} {mentor['last_name']}"
+
+
+def test_settled_matches_are_reasoned_before_distance(monkeypatch, online_student, use_stub, run_matches):
+    """Reasoning generated for settled matches is reused when distance is merged in."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 4)
+    env = ActivityEnvironment()
+    mentors = get_mock_mentors()
+
+    with LLMStubServer(responder=lambda prompt: re.search(r"Name: (.*)", prompt).group(1)) as stub:
+        use_stub(stub)
+        plan = asyncio.run(env.run(score_location_independent, online_student, mentors))
+        reasoned = asyncio.run(env.run(reason_settled_matches, online_student, mentors, plan['settled']))
+        early_requests = len(stub.requests)
+        matches = asyncio.run(env.run(combine_mentor_matches, online_student, mentors, {}, reasoned))
+
+    # An online student's top matches are all settled, so no reasoning is left for the end
+    assert len(plan['settled']) == 4
+    assert early_requests == len(stub.requests) == 4
+
+    activities.reasoning_cache.clear()
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    expected = run_matches(online_student, mentors)
+    assert [(m['mentor_id'], m['score']) for m in matches] == [(m['mentor_id'], m['score']) for m in expected]
+    assert [m['reasoning'] for m in matches[:4]] == [reasoned[m['mentor_id']] for m in expected[:4]]
+    assert [m['reasoning'] for m in matches[4:]] == [m['reasoning'] for m in expected[4:]]
+
+
+def test_activities_follow_the_request_settings(monkeypatch, online_student, use_stub, run_matches):
+    """Activities reason and select candidates as the request's settings say, not the worker's Config."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 10)
+    settings = {'reasoning_mode': 'template', 'top_k': 2}
+    env = ActivityEnvironment()
+    mentors = get_mock_mentors()
+
+    with LLMStubServer() as stub:
+        use_stub(stub)
+        matches = asyncio.run(env.run(calculate_mentor_matches, online_student, mentors, {}, settings))
+        plan = asyncio.run(env.run(score_location_independent, online_student, mentors, settings))
+        reasoned = asyncio.run(env.run(reason_settled_matches, online_student, mentors, plan['settled'], settings))
+        combined = asyncio.run(env.run(combine_mentor_matches, online_student, mentors, {}, reasoned, settings))
+
+    assert stub.requests == []
+    assert len(plan['settled']) == 2
+    assert reasoned == {}
+    assert all(match['reasoning'] == expected_template(match, online_student) for match in matches)
+    assert combined == matches
+
+
+def test_repeat_match_hits_reasoning_cache(monkeypatch, online_student, use_stub, run_matches):
+    """A repeated match for the same student is served from the reasoning cache."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 4)
+
+    with LLMStubServer(responder=lambda prompt: "A great fit.") as stub:
+        use_stub(stub)
+        first = run_matches(online_student, get_mock_mentors())
+        second = run_matches(online_student, get_mock_mentors())
+
+        # Changing a prompt field invalidates the cached entries
+        run_matches({**online_student, "goals": "I want to become a chef"}, get_mock_mentors())
+
+    assert [m['reasoning'] for m in first] == [m['reasoning'] for m in second]
+    assert len(stub.requests) == 8
+    assert activities.reasoning_cache.stats()['hits'] == 4
+
+
+def test_llm_connections_are_reused(monkeypatch, online_student, use_stub, run_matches):
+    """All reasoning calls in a match share pooled keep-alive connections."""
+    from llm_client import get_llm_client_stats
+
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'REASONING_CONCURRENCY', 1)
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 5)
+
+    before = get_llm_client_stats()
+    with LLMStubServer(responder=lambda prompt: "A great fit.") as stub:
+        use_stub(stub)
+        run_matches(online_student, get_mock_mentors())
+    after = get_llm_client_stats()
+
+    assert after['requests'] - before['requests'] == 5
+    assert after['connections_opened'] - before['connections_opened'] == 1
+
+
+def test_llm_client_is_closed_with_its_event_loop(monkeypatch):
+    """Each event loop gets its own client, and close_llm_client releases it."""
+    from llm_client import close_llm_client, get_llm_client
+
+    monkeypatch.setattr(Config, 'OPENROUTER_API_KEY', 'test-key')
+
+    async def request():
+        client = get_llm_client()
+        assert get_llm_client() is client
+        await close_llm_client()
+        return client
+
+    first, second = asyncio.run(request()), asyncio.run(request())
+    assert first is not second
+    assert first.is_closed() and second.is_closed()
+
+
+def test_replaced_llm_client_is_closed(monkeypatch):
+    """A client replaced after a configuration change is closed by the time the loop's client is."""
+    from llm_client import close_llm_client, get_llm_client
+
+    monkeypatch.setattr(Config, 'OPENROUTER_API_KEY', 'test-key')
+
+    async def request():
+        old = get_llm_client()
+        monkeypatch.setattr(Config, 'OPENROUTER_API_KEY', 'rotated-key')
+        new = get_llm_client()
+        await close_llm_client()
+        return old, new
+
+    old, new = asyncio.run(request())
+    assert old is not new
+    assert old.is_closed() and new.is_closed()
+
+
+def test_template_reasoning_uses_score_evidence(online_student):
+    """Template reasoning names the shared interests, career group and subjects behind a match."""
+    mentor = {m['id']: m for m in get_mock_mentors()}['mentor-software-1']
+    student = {**online_student, "meeting_preference": "Both", "subjects": ["🔢 Mathematics"]}
+
+    evidence = MatchingScorer().explain(student, mentor, (59.33, 18.06), (59.40, 18.00))
+    assert evidence['shared_interests'] == ["Technology", "Gaming"]
+    assert evidence['career_groups'] == ["software", "engineering"]
+    assert evidence['subjects'] == ["🔢 Mathematics"]
+    assert evidence['distance_band'] == 'local'
+
+    reasoning = template_reasoning(mentor, 88, evidence)
+    assert reasoning == (
+        "Erik's background in software development and engineering matches your goals. "
+        "You both enjoy Technology and Gaming. "
+        "Erik's skills connect to your favorite subject, Mathematics."
+    )
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        template_reasoning(mentor, 88, MatchingScorer().explain(student, mentor))
+    assert (time.perf_counter() - start) / 1000 < 0.001
+
+
+def test_load_shedding_uses_templates_for_every_match(monkeypatch, online_student, run_matches):
+    """Template mode and in-flight shedding skip the LLM; matches beyond top K always get templates."""
+    async def fail_reasoning(*args, **kwargs):
+        raise AssertionError("LLM reasoning should not be called")
+
+    monkeypatch.setattr(activities, 'generate_match_reasoning', fail_reasoning)
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 3)
+
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    matches = run_matches(online_student, get_mock_mentors())
+    assert all(match['reasoning'] == expected_template(match, online_student) for match in matches)
+
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'REASONING_SHED_IN_FLIGHT', 2)
+    monkeypatch.setattr(activities, '_reasoning_in_flight', 2)
+    assert run_matches(online_student, get_mock_mentors()) == matches
+
+
+def test_snippet_reasoning_needs_no_llm_at_request_time(monkeypatch, online_student, use_stub, run_matches):
+    """Snippets are generated once per mentor revision and combined with student evidence per request."""
+    activities.mentor_snippet_cache.clear()
+    mentors = get_mock_mentors()[:6]
+
+    with LLMStubServer() as stub:
+        use_stub(stub)
+        env = ActivityEnvironment()
+        assert asyncio.run(env.run(activities.refresh_mentor_snippets, mentors)) == 6
+        assert asyncio.run(env.run(activities.refresh_mentor_snippets, mentors)) == 0
+
+        # Editing a profile creates a new revision that needs a new snippet
+        edited = [{**mentors[0], "bio": mentors[0]["bio"] + " Now also teaching data science."}] + mentors[1:]
+        assert asyncio.run(env.run(activities.refresh_mentor_snippets, edited)) == 1
+        assert len(stub.requests) == 7
+
+        stub.reset_stats()
+        monkeypatch.setattr(Config, 'REASONING_MODE', 'snippets')
+        matches = run_matches(online_student, edited)
+        assert stub.requests == []
+
+    by_id = {m['id']: m for m in edited}
+    for match in matches:
+        mentor = by_id[match['mentor_id']]
+        assert f"{mentor['first_name']} brings years of hands-on experience" in match['reasoning']
+        assert f"{mentor['first_name']} can help you turn your interests into concrete next steps." in match['reasoning']
+
+    top = matches[0]
+    evidence = MatchingScorer().explain(online_student, by_id[top['mentor_id']])
+    assert top['reasoning'].startswith(evidence_sentences(by_id[top['mentor_id']], evidence)[0])
+    activities.mentor_snippet_cache.clear()
+
+
+def test_parse_mentor_snippet():
+    assert activities.parse_mentor_snippet('```json\n{"summary": "Erik codes", "offer": "Learn Python."}\n```') == {
+        "summary": "Erik codes.", "offer": "learn Python"
+    }
+    assert activities.parse_mentor_snippet('{"summary": "", "offer": "x"}') is None
+    assert activities.parse_mentor_snippet("no json here") is None
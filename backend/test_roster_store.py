@@ -0,0 +1,146 @@
+"""
+Tests for versioned mentor roster snapshots.
+These tests run the activities outside a worker, without Temporal or an LLM.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import inspect
+import pytest
+import temporalio.activity
+import temporalio.converter
+import temporalio.workflow
+from temporalio.testing import ActivityEnvironment
+import activities
+import roster_store
+from activities import calculate_mentor_matches, select_location_postcodes, validate_matching_data
+from config import Config
+from mock_mentors import get_mock_mentors
+from payload_codec import get_data_converter
+from workflows import MentorSnippetRefreshWorkflow
+from roster_store import RosterNotFoundError, RosterStore, roster_version
+
+
+@pytest.fixture
+def roster_db():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield os.path.join(tmp, 'rosters.sqlite')
+
+
+@pytest.fixture
+def store(monkeypatch, roster_db):
+    """A roster store on a temporary SQLite file, used as the process-wide store."""
+    store = RosterStore(max_size=4, persistent_path=roster_db)
+    monkeypatch.setattr(roster_store, '_roster_store', store)
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    return store
+
+
+def run(fn, *args):
+    return asyncio.run(ActivityEnvironment().run(fn, *args))
+
+
+def test_snapshots_are_versioned_by_content(store):
+    mentors = get_mock_mentors()
+    ref = store.put(mentors)
+
+    assert ref == {'roster_id': 'default', 'version': roster_version(mentors), 'size': len(mentors)}
+    assert store.put(list(mentors)) == ref
+    assert store.get(ref) == mentors
+
+    changed = [{**mentors[0], 'bio': 'Updated bio'}, *mentors[1:]]
+    assert store.put(changed)['version'] != ref['version']
+
+    with pytest.raises(RosterNotFoundError):
+        store.get({'roster_id': 'default', 'version': 'unknown'})
+
+
+def test_workers_load_snapshots_written_by_the_api(store, roster_db):
+    """A second process (the worker) reads the snapshot from the shared SQLite file."""
+    ref = store.put(get_mock_mentors())
+    worker_store = RosterStore(max_size=4, persistent_path=roster_db)
+
+    assert worker_store.get(ref) == get_mock_mentors()
+
+
+def test_shards_load_only_their_pages(roster_db):
+    """A worker scoring one shard reads the pages it covers, never the whole snapshot."""
+    mentors = get_mock_mentors()
+    ref = RosterStore(max_size=4, persistent_path=roster_db, page_size=4).put(mentors)
+    worker_store = RosterStore(max_size=4, persistent_path=roster_db, page_size=4)
+
+    assert worker_store.get_range(ref, 5, 11) == mentors[5:11]
+    assert worker_store.get_range(ref, 12, None) == mentors[12:]
+    assert worker_store.get_range(ref, 20, 30) == []
+    assert worker_store.stats()['persistent_hits'] == worker_store.stats()['misses'] == 0
+
+    # Snapshots of a single page are loaded whole
+    small = RosterStore(max_size=4, persistent_path=roster_db).put(mentors)
+    assert RosterStore(max_size=4, persistent_path=roster_db).get_range(small, 5, 11) == mentors[5:11]
+
+
+def test_activities_accept_roster_references(store, sample_student):
+    """Activities give the same results for a roster reference as for the inline list."""
+    mentors = get_mock_mentors()
+    ref = store.put(mentors)
+
+    assert run(validate_matching_data, {'student': sample_student, 'roster': ref})
+    assert run(select_location_postcodes, sample_student, ref) == run(select_location_postcodes, sample_student, mentors)
+    assert run(calculate_mentor_matches, sample_student, ref, {}) == run(calculate_mentor_matches, sample_student, mentors, {})
+
+    with pytest.raises(ValueError):
+        run(validate_matching_data, {'student': sample_student, 'roster': {'roster_id': 'default', 'version': 'gone'}})
+
+
+def test_workflow_input_size_does_not_grow_with_the_roster(store, sample_student):
+    small = {'student': sample_student, 'roster': store.put(get_mock_mentors()[:2])}
+    large = {'student': sample_student, 'roster': store.put(get_mock_mentors() * 50)}
+
+    # Only the digits of the roster size differ
+    assert len(json.dumps(large)) - len(json.dumps(small)) <= 2
+
+
+ROSTER_ACTIVITIES = [
+    activities.select_location_postcodes, activities.select_shard_location_postcodes,
+    activities.calculate_mentor_matches, activities.score_mentor_shard, activities.add_match_reasoning,
+    activities.score_location_independent, activities.reason_settled_matches,
+    activities.combine_mentor_matches, activities.refresh_mentor_snippets,
+]
+
+
+@pytest.mark.parametrize('converter', [temporalio.converter.default(), get_data_converter()],
+                         ids=['default', 'configured'])
+def test_roster_references_survive_the_data_converter(store, sample_student, converter):
+    """Every activity taking a roster decodes a reference with its real parameter types."""
+    ref = store.put(get_mock_mentors())
+    match = {'mentor_id': 'mentor-1', 'score': 80, 'reasoning': 'A good fit.'}
+    samples = {
+        'student': sample_student, 'mentors': ref, 'coordinates': {'student': (59.33, 18.06)},
+        'start': 0, 'end': 10, 'top_k': 10, 'limit': 100, 'matches': [match], 'settled': [match],
+        'reasoned': {'mentor-1': 'A good fit.'}, 'settings': {'reasoning_mode': 'template', 'top_k': 10},
+    }
+
+    for fn in ROSTER_ACTIVITIES:
+        names = list(inspect.signature(fn).parameters)
+        args = [samples[name] for name in names]
+        arg_types = temporalio.activity._Definition.must_from_callable(fn).arg_types
+
+        async def round_trip():
+            return await converter.decode(await converter.encode(args), arg_types)
+
+        assert asyncio.run(round_trip()) == args, fn.__name__
+
+
+def test_snippet_refresh_workflow_accepts_roster_references(store):
+    """The API starts snippet refreshes with a roster reference, which the workflow must decode."""
+    ref = store.put(get_mock_mentors())
+    arg_types = temporalio.workflow._Definition.must_from_class(MentorSnippetRefreshWorkflow).arg_types
+    converter = get_data_converter()
+
+    async def round_trip(value):
+        return await converter.decode(await converter.encode([value]), arg_types)
+
+    assert asyncio.run(round_trip(ref)) == [ref]
+    assert asyncio.run(round_trip(get_mock_mentors())) == [get_mock_mentors()]
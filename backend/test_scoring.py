@@ -0,0 +1,319 @@
+"""
+Offline tests for the matching scorer.
+These tests run without Temporal, the Flask API or a real LLM.
+"""
+
+import os
+import tempfile
+import asyncio
+import time
+import pytest
+import requests
+from temporalio.testing import ActivityEnvironment
+import activities
+from activities import (calculate_mentor_matches, combine_mentor_matches, geocode_postcodes,
+                        lookup_cached_coordinates, score_location_independent, score_mentor_shard,
+                        score_with_template_reasoning, select_shard_location_postcodes, validate_matching_data)
+from config import Config
+from distance_table import PrefixDistanceTable, build_distance_table
+import geocoding
+from geocoding import GeocodingService, get_geocoding_service
+from llm_stub import LLMStubServer
+from matching import MatchingScorer, merge_location_candidates, merge_ranked_matches, shard_bounds
+from mock_mentors import get_mock_mentors
+from workflows import matching_result, matching_settings, request_settings, use_distributed_scoring
+
+def test_online_student_skips_geocoding(sample_student):
+    """Online-only students never need coordinates."""
+    scorer = MatchingScorer()
+    student = {**sample_student, "meeting_preference": "Online"}
+
+    assert scorer.select_location_candidates(student, get_mock_mentors(), 10) == []
+
+
+def test_online_mentors_are_never_candidates(sample_student):
+    """Mentors who only meet online never need coordinates."""
+    scorer = MatchingScorer()
+    mentors = get_mock_mentors()
+    candidates = scorer.select_location_candidates(sample_student, mentors, len(mentors))
+
+    online_ids = {m['id'] for m in mentors if m['meeting_preference'].lower() == 'online'}
+    assert candidates
+    assert not online_ids.intersection(candidates)
+
+
+def test_online_pairs_get_the_fixed_distance_score(sample_student):
+    """Distance is not scored for pairs that never meet in person, even when both are geocoded."""
+    scorer = MatchingScorer()
+    online_mentor = next(m for m in get_mock_mentors() if m['meeting_preference'].lower() == 'online')
+    nearby = {'student': (59.33, 18.06), online_mentor['id']: (59.33, 18.06)}
+    far = {'student': (59.33, 18.06), online_mentor['id']: (57.71, 11.97)}
+
+    assert not scorer.location_matters(sample_student, online_mentor)
+    assert (scorer.calculate_matches(sample_student, [online_mentor], nearby)
+            == scorer.calculate_matches(sample_student, [online_mentor], far)
+            == scorer.calculate_matches(sample_student, [online_mentor], {}))
+
+
+def test_pruned_candidates_keep_top_k_ordering(sample_student):
+    """Skipping geocoding for pruned mentors must not change the top-K ranking."""
+    scorer = MatchingScorer()
+    mentors = get_mock_mentors()
+    top_k = 3
+
+    # Far-away coordinates give the worst possible distance score for every mentor
+    full_coordinates = {'student': (67.8558, 20.2253)}
+    for mentor in mentors:
+        full_coordinates[mentor['id']] = (55.6050, 13.0038)
+
+    candidates = set(scorer.select_location_candidates(sample_student, mentors, top_k))
+    pruned_coordinates = {
+        person_id: coords for person_id, coords in full_coordinates.items()
+        if person_id == 'student' or person_id in candidates
+    }
+
+    full = scorer.calculate_matches(sample_student, mentors, full_coordinates)[:top_k]
+    pruned = scorer.calculate_matches(sample_student, mentors, pruned_coordinates)[:top_k]
+
+    assert [m['score'] for m in full] == [m['score'] for m in pruned]
+    assert len(candidates) < len(mentors)
+
+
+def test_cached_coordinates_lookup_never_calls_the_api():
+    """The local-activity lookup resolves cached postcodes and reports the rest as missing."""
+    service = get_geocoding_service()
+    service._cache.update({'11122': (59.33, 18.06), '41199': None})
+    try:
+        lookup = asyncio.run(ActivityEnvironment().run(
+            lookup_cached_coordinates,
+            {'student': '11122', 'mentor-1': '41199', 'mentor-2': '99999'}
+        ))
+    finally:
+        service._cache.pop('11122')
+        service._cache.pop('41199')
+
+    # Postcodes that failed before get the regional fallback, like in geocode_postcodes
+    assert lookup['coordinates'] == {'student': (59.33, 18.06), 'mentor-1': (57.7089, 11.9746)}
+    assert lookup['missing'] == ['mentor-2']
+
+
+def test_refreshing_the_cache_retries_failed_postcodes(monkeypatch):
+    """A refresh re-resolves cached postcodes but keeps them when the API is unreachable."""
+    monkeypatch.setattr(Config, 'GEOCODE_CACHE_DB', None)
+    monkeypatch.setattr(geocoding, 'sleep', lambda seconds: None)
+    service = GeocodingService()
+    service._cache.update({'11122': None, '41199': (57.70, 11.97)})
+    found = [{'lat': '59.33', 'lon': '18.06', 'address': {'country_code': 'se'}}]
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return found
+
+    def get(url, params, timeout):
+        if params['q'] == '411 99':
+            raise requests.exceptions.ConnectionError("unreachable")
+        return Response()
+
+    monkeypatch.setattr(service.session, 'get', get)
+
+    service.warm_cache(['11122', '41199'])
+    assert service._cache['11122'] is None
+
+    service.warm_cache(['11122', '41199'], refresh=True)
+    assert service._cache == {'11122': (59.33, 18.06), '41199': (57.70, 11.97)}
+
+
+def test_geocoding_activity_does_not_block_the_event_loop(monkeypatch):
+    """Blocking geocoding API calls run in a thread, so other activities keep making progress."""
+    class SlowService:
+        def geocode_postcodes(self, postcodes):
+            time.sleep(0.3)
+            return {person_id: (59.33, 18.06) for person_id in postcodes}
+
+    monkeypatch.setattr(activities, 'get_geocoding_service', lambda: SlowService())
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        for _ in range(5):
+            await asyncio.sleep(0.02)
+            ticks += 1
+
+    async def main():
+        ticker = asyncio.ensure_future(tick())
+        coordinates = await ActivityEnvironment().run(geocode_postcodes, {'student': '11122'})
+        ticks_while_geocoding = ticks
+        await ticker
+        return coordinates, ticks_while_geocoding
+
+    coordinates, ticks_while_geocoding = asyncio.run(main())
+    assert coordinates == {'student': (59.33, 18.06)}
+    assert ticks_while_geocoding == 5
+
+
+def test_distance_table_matches_haversine():
+    """Prefix table distances agree with haversine between the same centroids."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'distances.bin')
+        build_distance_table(path)
+        table = PrefixDistanceTable(path)
+
+        try:
+            scorer = MatchingScorer()
+            stockholm, gothenburg = (59.3293, 18.0686), (57.7089, 11.9746)
+            expected = scorer._calculate_haversine_distance(*stockholm, *gothenburg)
+
+            assert table.distance_km('11122', '41101') == round(expected)
+            assert table.distance_km('11122', '11835') == 0
+            assert table.distance_km('11122', '98132') is None
+            assert table.distance_km('abc', '11122') is None
+
+            # The scorer reads from the table even without coordinates
+            table_scorer = MatchingScorer(distance_table=table)
+            assert table_scorer._calculate_distance_score(None, None, '11122', '11835') == 100
+            assert table_scorer._calculate_distance_score(None, None, '11122', '41101') == 20
+        finally:
+            table.close()
+
+
+def test_sharded_scoring_matches_full_scoring(sample_student, mock_roster):
+    """Merging per-shard top results gives the same ranking as scoring the whole roster."""
+    mentors = mock_roster(53)
+    coordinates = {'student': (59.33, 18.06), 'mentor-4': (59.40, 18.00)}
+    limit = 12
+
+    shards = [
+        asyncio.run(ActivityEnvironment().run(score_mentor_shard, sample_student, mentors, coordinates,
+                                              start, end, limit))
+        for start, end in shard_bounds(len(mentors), 10)
+    ]
+    full = score_with_template_reasoning(MatchingScorer(), sample_student, mentors, coordinates)
+
+    assert len(shards) == 6
+    assert merge_ranked_matches(shards, limit) == full[:limit]
+    assert merge_ranked_matches(shards) == full[:len(merge_ranked_matches(shards))]
+
+
+def test_only_sharded_results_report_their_limit(monkeypatch):
+    """Workflow results carry result_limit only when the roster was scored in shards."""
+    monkeypatch.setattr(Config, 'MATCHING_SHARD_SIZE', 10)
+    monkeypatch.setattr(Config, 'MATCHING_SHARD_RESULT_LIMIT', 100)
+    settings = matching_settings()
+    mentors = get_mock_mentors()
+
+    assert matching_result(mentors[:5], [], settings) == {"success": True, "suggest": []}
+    assert matching_result(mentors, [], settings)["result_limit"] == 100
+    assert matching_result({'roster_id': 'r', 'size': 53}, [], settings)["result_limit"] == 100
+
+
+def test_workflows_use_the_settings_they_were_started_with(monkeypatch, sample_student):
+    """A request's resolved settings win over the environment of the worker replaying it."""
+    monkeypatch.setattr(Config, 'MATCHING_SHARD_SIZE', 10)
+    request = {'student': sample_student, 'mentors': get_mock_mentors(), 'settings': matching_settings()}
+
+    monkeypatch.setattr(Config, 'MATCHING_SHARD_SIZE', 0)
+    assert request_settings(request)['shard_size'] == 10
+    assert use_distributed_scoring(request['mentors'], request_settings(request))
+    assert request_settings({'student': sample_student})['shard_size'] == 0
+
+
+def test_sharded_location_candidates_match_the_whole_roster(sample_student, mock_roster):
+    """Merging per-shard bounds selects the same postcodes as bounding the whole roster at once."""
+    mentors = mock_roster(53)
+    env = ActivityEnvironment()
+
+    for top_k in (0, 3, 10, 60):
+        summaries = [
+            asyncio.run(env.run(select_shard_location_postcodes, sample_student, mentors, start, end, top_k))
+            for start, end in shard_bounds(len(mentors), 10)
+        ]
+        expected = MatchingScorer().select_location_candidates(sample_student, mentors, top_k)
+        assert merge_location_candidates(summaries, top_k) == expected
+
+
+def test_roster_shards_are_validated_separately(sample_student):
+    """Shard validation reports the mentor's index in the whole roster."""
+    mentors = get_mock_mentors() * 2
+    mentors[20] = {**mentors[20], 'postcode': 'abc'}
+    request = {'student': sample_student, 'mentors': mentors}
+    env = ActivityEnvironment()
+
+    assert asyncio.run(env.run(validate_matching_data, request, 0, 15))
+    with pytest.raises(ValueError, match="Mentor 20 "):
+        asyncio.run(env.run(validate_matching_data, request, 15, 30))
+
+
+def test_settled_matches_keep_score_and_rank_for_any_distance(sample_student):
+    """Settled top matches are final whatever coordinates the in-person mentors get."""
+    scorer = MatchingScorer()
+    mentors = get_mock_mentors()
+    top_k = 4
+    settled = scorer.settled_top_matches(sample_student, mentors, top_k)
+
+    # Every in-person mentor next door, then every in-person mentor far away
+    for mentor_coords in ((59.33, 18.06), (67.8558, 20.2253)):
+        coordinates = {'student': (59.33, 18.06), **{m['id']: mentor_coords for m in mentors}}
+        top = scorer.calculate_matches(sample_student, mentors, coordinates)[:top_k]
+        for match in settled:
+            assert match in top
+
+    assert settled
+    online_ids = {m['id'] for m in mentors if m['meeting_preference'].lower() == 'online'}
+    assert {match['mentor_id'] for match in settled} <= online_ids
+
+
+def test_concurrent_scoring_matches_calculate_mentor_matches(monkeypatch, sample_student, mock_roster):
+    """Scoring without location first and adding distance later gives the same matches."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'template')
+    mentors = mock_roster(40)
+    env = ActivityEnvironment()
+
+    plan = asyncio.run(env.run(score_location_independent, sample_student, mentors))
+    coordinates = {'student': (59.33, 18.06)}
+    coordinates.update({person_id: (57.71, 11.97) for person_id in plan['postcodes'] if person_id != 'student'})
+
+    combined = asyncio.run(env.run(combine_mentor_matches, sample_student, mentors, coordinates, {}))
+    expected = asyncio.run(env.run(calculate_mentor_matches, sample_student, mentors, coordinates))
+
+    assert combined == expected
+    assert plan['postcodes']['student'] == sample_student['postcode']
+    assert set(plan) == {'postcodes', 'settled'}
+
+
+def test_combined_matches_reuse_earlier_reasoning(monkeypatch, sample_student, use_stub, mock_roster):
+    """Top matches reasoned while geocoding keep that reasoning; only the rest of the top K call the LLM."""
+    monkeypatch.setattr(Config, 'REASONING_MODE', 'per_mentor')
+    monkeypatch.setattr(Config, 'MATCHING_TOP_K', 4)
+    activities.reasoning_cache.clear()
+    mentors = mock_roster(40)
+    coordinates = {'student': (59.33, 18.06)}
+    env = ActivityEnvironment()
+
+    template = {'reasoning_mode': 'template', 'top_k': 4}
+    expected = asyncio.run(env.run(calculate_mentor_matches, sample_student, mentors, coordinates, template))
+    # Reasoning for a match that is no longer in the top K is not reused
+    reasoned = {match['mentor_id']: f"early for {match['mentor_id']}" for match in (expected[0], expected[2], expected[6])}
+
+    with LLMStubServer(responder=lambda prompt: "Generated by the LLM") as stub:
+        use_stub(stub)
+        combined = asyncio.run(env.run(combine_mentor_matches, sample_student, mentors, coordinates, reasoned))
+
+    assert len(stub.requests) == 2
+    assert [(m['mentor_id'], m['score']) for m in combined] == [(m['mentor_id'], m['score']) for m in expected]
+    assert [m['reasoning'] for m in combined[:4]] == [
+        f"early for {expected[0]['mentor_id']}", "Generated by the LLM",
+        f"early for {expected[2]['mentor_id']}", "Generated by the LLM",
+    ]
+    assert [m['reasoning'] for m in combined[4:]] == [m['reasoning'] for m in expected[4:]]
+
+
+if __name__ == "__main__":
+    from conftest import SAMPLE_STUDENT
+    test_online_student_skips_geocoding(SAMPLE_STUDENT)
+    test_online_mentors_are_never_candidates(SAMPLE_STUDENT)
+    test_pruned_candidates_keep_top_k_ordering(SAMPLE_STUDENT)
+    test_distance_table_matches_haversine()
+    print("✅ All scoring tests passed")
@@ -1,5 +1,6 @@
+import asyncio
 from datetime import timedelta
-from typing import Dict, List, Any
+from typing import Awaitable, Dict, List, Any, Optional, Union
 from temporalio import workflow
 from temporalio.common import RetryPolicy
 
@@ -7,18 +8,356 @@ from temporalio.common import RetryPolicy
 with workflow.unsafe.imports_passed_through():
     from activities import (
         analyze_cv_with_llm,
+        lookup_cv_analysis,
         geocode_postcodes, 
+        lookup_cached_coordinates,
+        select_location_postcodes,
+        select_shard_location_postcodes,
         calculate_mentor_matches,
-        validate_matching_data
+        score_location_independent,
+        reason_settled_matches,
+        combine_mentor_matches,
+        score_mentor_shard,
+        add_match_reasoning,
+        validate_matching_data,
+        refresh_geocode_cache,
+        refresh_mentor_snippets
     )
+    from config import Config
+    from matching import merge_location_candidates, merge_ranked_matches, shard_bounds
+    from roster_store import RosterRef
+
+
+def mentor_roster(matching_request: Dict[str, Any]) -> Any:
+    """
+    The mentors to pass to activities: the request's roster reference, so
+    history stays small, or the inline list sent by older clients.
+    """
+    return matching_request.get('roster') or matching_request['mentors']
+
+
+def roster_size(mentors: Any) -> int:
+    """Number of mentors behind a roster reference or inline list."""
+    return len(mentors) if isinstance(mentors, list) else mentors.get('size', 0)
+
+
+def matching_settings() -> Dict[str, Any]:
+    """
+    The settings that decide which steps a matching workflow takes.
+    
+    The process starting a workflow resolves them into the request's 'settings', so
+    replaying its history takes the same branches whatever environment the replaying
+    worker was started with.
+    """
+    return {
+        'reasoning_mode': Config.REASONING_MODE,
+        'top_k': Config.MATCHING_TOP_K,
+        'shard_size': Config.MATCHING_SHARD_SIZE,
+        'shard_parallelism': Config.MATCHING_SHARD_PARALLELISM,
+        'shard_result_limit': Config.MATCHING_SHARD_RESULT_LIMIT,
+    }
+
+
+def request_settings(matching_request: Dict[str, Any]) -> Dict[str, Any]:
+    """The settings a matching request was started with (the worker's for clients that send none)."""
+    settings = matching_request.get('settings')
+    return settings if settings is not None else matching_settings()
+
+
+def use_distributed_scoring(mentors: Any, settings: Dict[str, Any]) -> bool:
+    """Check whether a roster is large enough to be scored in shards."""
+    return 0 < settings['shard_size'] < roster_size(mentors)
+
+
+def matching_result(mentors: Any, matches: List[Dict[str, Any]], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Successful matching workflow result. Rosters scored in shards only return their
+    best shard_result_limit matches, which the result reports as result_limit.
+    """
+    result = {"success": True, "suggest": matches}
+    if use_distributed_scoring(mentors, settings) and settings['shard_result_limit']:
+        result["result_limit"] = settings['shard_result_limit']
+    return result
+
+
+async def run_validated(validation: Awaitable[Any], work: Awaitable[Any]) -> Any:
+    """
+    Run work concurrently with the validation of its input.
+    
+    A validation failure cancels the work and wins over any error the invalid
+    input caused in it; the work's result is only returned once validation passed.
+    """
+    work_task = asyncio.ensure_future(work)
+    try:
+        await validation
+    except BaseException:
+        work_task.cancel()
+        raise
+    return await work_task
+
+
+async def geocode_student(student: Dict[str, Any]) -> Dict[str, Any]:
+    """Geocode the student's postcode, speculatively, before the mentor candidates are known."""
+    if student.get('meeting_preference', '').lower() == 'online' or not student.get('postcode'):
+        return {}
+    
+    return await workflow.execute_activity(
+        geocode_postcodes,
+        {'student': student['postcode']},
+        start_to_close_timeout=timedelta(seconds=120),
+        retry_policy=RetryPolicy(
+            initial_interval=timedelta(seconds=2),
+            maximum_interval=timedelta(seconds=10),
+            maximum_attempts=3,
+            backoff_coefficient=2.0,
+        )
+    )
+
+
+async def reason_settled(student: Dict[str, Any], mentors: Any, settled: List[Dict[str, Any]],
+                         validation: Awaitable[Any], settings: Dict[str, Any]) -> Dict[str, str]:
+    """
+    LLM reasoning for settled top matches, started once the request passed validation;
+    a failure only means generating it later.
+    """
+    if not settled or settings['reasoning_mode'] in ('template', 'snippets'):
+        return {}
+    
+    try:
+        await validation
+    except Exception:
+        # The workflow reports the validation failure, there is nothing to reason about
+        return {}
+    
+    try:
+        return await workflow.execute_activity(
+            reason_settled_matches,
+            args=(student, mentors, settled, settings),
+            start_to_close_timeout=timedelta(seconds=300),  # 5 minutes for multiple LLM calls
+            retry_policy=RetryPolicy(maximum_attempts=1)
+        )
+    except Exception as e:
+        workflow.logger.warning(f"Early reasoning for settled matches failed: {str(e)}")
+        return {}
+
+
+async def score_concurrently(student: Dict[str, Any], mentors: Any, validation: Awaitable[Any],
+                             settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Concurrent scoring pipeline for rosters scored by a single worker.
+    
+    Only the distance component needs coordinates, so:
+    1. The student's postcode is geocoded while every other component is scored
+    2. The candidate mentor postcodes are geocoded while LLM reasoning is generated
+       for the settled top matches, whose score and rank location cannot change
+    3. The roster is scored with the coordinates and the remaining top matches
+       get their reasoning
+    
+    Scoring and geocoding run while the request is validated, but no LLM call is
+    made before validation has passed.
+    
+    Returns the same matches as calculate_mentor_matches.
+    """
+    student_coordinates = asyncio.ensure_future(geocode_student(student))
+    
+    plan = await workflow.execute_activity(
+        score_location_independent,
+        args=(student, mentors, settings),
+        start_to_close_timeout=timedelta(seconds=120),
+        retry_policy=RetryPolicy(
+            initial_interval=timedelta(seconds=1),
+            maximum_interval=timedelta(seconds=10),
+            maximum_attempts=3,
+            backoff_coefficient=2.0,
+        )
+    )
+    
+    postcodes = plan['postcodes']
+    if not postcodes:
+        workflow.logger.info("Location cannot change the top matches, skipping geocoding")
+        student_coordinates.cancel()
+    
+    reasoned = asyncio.ensure_future(reason_settled(student, mentors, plan['settled'], validation, settings))
+    
+    coordinates = {}
+    mentor_postcodes = {person_id: postcode for person_id, postcode in postcodes.items() if person_id != 'student'}
+    if mentor_postcodes:
+        workflow.logger.info(f"Geocoding {len(mentor_postcodes)} mentor postcodes "
+                             f"alongside reasoning for {len(plan['settled'])} settled matches")
+        coordinates = await workflow.execute_activity(
+            geocode_postcodes,
+            mentor_postcodes,
+            start_to_close_timeout=timedelta(seconds=120),  # Longer timeout for API calls
+            retry_policy=RetryPolicy(
+                initial_interval=timedelta(seconds=2),
+                maximum_interval=timedelta(seconds=10),
+                maximum_attempts=3,
+                backoff_coefficient=2.0,
+            )
+        )
+    if postcodes:
+        coordinates.update(await student_coordinates)
+        workflow.logger.info(f"Geocoded {len(coordinates)} postcodes successfully")
+    
+    await validation
+    return await workflow.execute_activity(
+        combine_mentor_matches,
+        args=(student, mentors, coordinates, await reasoned, settings),
+        start_to_close_timeout=timedelta(seconds=300),  # 5 minutes for multiple LLM calls
+        retry_policy=RetryPolicy(
+            initial_interval=timedelta(seconds=2),
+            maximum_interval=timedelta(seconds=10),
+            maximum_attempts=2,
+            backoff_coefficient=2.0,
+        )
+    )
+
+
+# Retry policy for the activities of distributed matching, which each handle one shard
+SHARD_RETRY_POLICY = RetryPolicy(
+    initial_interval=timedelta(seconds=1),
+    maximum_interval=timedelta(seconds=10),
+    maximum_attempts=3,
+    backoff_coefficient=2.0,
+)
+
+
+async def gather_shards(mentors: Any, run_shard, settings: Dict[str, Any]) -> List[Any]:
+    """
+    Run one activity per shard_size mentors, with up to shard_parallelism
+    in flight, and return their results in roster order.
+    
+    run_shard(roster, start, end) gets the roster reference and the shard's
+    bounds; an inline list is sliced here so each activity only carries its shard.
+    """
+    semaphore = asyncio.Semaphore(max(settings['shard_parallelism'], 1))
+    
+    async def run(start: int, end: int) -> Any:
+        async with semaphore:
+            if isinstance(mentors, list):
+                return await run_shard(mentors[start:end], 0, end - start)
+            return await run_shard(mentors, start, end)
+    
+    bounds = shard_bounds(roster_size(mentors), settings['shard_size'])
+    return await asyncio.gather(*(run(start, end) for start, end in bounds))
+
+
+async def validate_request(matching_request: Dict[str, Any]) -> None:
+    """
+    Validate a matching request; a large roster reference is validated shard by shard
+    so no single activity has to load and check the whole roster.
+    """
+    retry_policy = RetryPolicy(
+        initial_interval=timedelta(seconds=1),
+        maximum_interval=timedelta(seconds=5),
+        maximum_attempts=2,
+        backoff_coefficient=2.0,
+    )
+    mentors = mentor_roster(matching_request)
+    settings = request_settings(matching_request)
+    
+    if isinstance(mentors, list) or not use_distributed_scoring(mentors, settings):
+        await workflow.execute_activity(
+            validate_matching_data,
+            matching_request,
+            start_to_close_timeout=timedelta(seconds=10),
+            retry_policy=retry_policy
+        )
+        return
+    
+    async def validate_shard(roster: Any, start: int, end: int) -> bool:
+        return await workflow.execute_activity(
+            validate_matching_data,
+            args=(matching_request, start, end),
+            start_to_close_timeout=timedelta(seconds=60),
+            retry_policy=retry_policy
+        )
+    
+    await gather_shards(mentors, validate_shard, settings)
+
+
+async def select_postcodes_in_shards(student: Dict[str, Any], mentors: Any,
+                                     settings: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Distributed select_location_postcodes: each shard reports its score bounds and
+    candidates, and the thresholds are merged into the whole roster's candidates.
+    """
+    if student.get('meeting_preference', '').lower() == 'online':
+        return {}
+    
+    async def select_shard(roster: Any, start: int, end: int) -> Dict[str, Any]:
+        return await workflow.execute_activity(
+            select_shard_location_postcodes,
+            args=(student, roster, start, end, settings['top_k']),
+            start_to_close_timeout=timedelta(seconds=120),
+            retry_policy=SHARD_RETRY_POLICY
+        )
+    
+    summaries = await gather_shards(mentors, select_shard, settings)
+    candidate_ids = set(merge_location_candidates(summaries, settings['top_k']))
+    if not candidate_ids:
+        return {}
+    
+    postcodes = {'student': student['postcode']}
+    for summary in summaries:
+        postcodes.update({mentor_id: postcode for mentor_id, postcode in summary['postcodes'].items()
+                          if mentor_id in candidate_ids})
+    return postcodes
+
+
+async def score_in_shards(
+    student: Dict[str, Any],
+    mentors: Any,
+    coordinates: Dict[str, Any],
+    settings: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Distributed scoring for large rosters.
+    
+    Scores shard_size mentors per activity, with up to shard_parallelism
+    shards in flight, so the work spreads across every worker polling the
+    task queue. Each shard returns its best shard_result_limit matches,
+    which are merged into one ranking (identical to scoring the whole roster
+    at once) before snippet or LLM reasoning is added to the top matches.
+    """
+    limit = settings['shard_result_limit']
+    
+    async def score_shard(roster: Any, start: int, end: int) -> List[Dict[str, Any]]:
+        return await workflow.execute_activity(
+            score_mentor_shard,
+            args=(student, roster, coordinates, start, end, limit),
+            start_to_close_timeout=timedelta(seconds=120),
+            retry_policy=SHARD_RETRY_POLICY
+        )
+    
+    workflow.logger.info(f"Scoring {roster_size(mentors)} mentors in shards")
+    shards = await gather_shards(mentors, score_shard, settings)
+    matches = merge_ranked_matches(shards, limit)
+    
+    if settings['reasoning_mode'] == 'template':
+        return matches
+    
+    return await workflow.execute_activity(
+        add_match_reasoning,
+        args=(student, mentors, coordinates, matches, settings),
+        start_to_close_timeout=timedelta(seconds=300),  # 5 minutes for multiple LLM calls
+        retry_policy=RetryPolicy(
+            initial_interval=timedelta(seconds=2),
+            maximum_interval=timedelta(seconds=10),
+            maximum_attempts=2,
+            backoff_coefficient=2.0,
+        )
+    )
+
 
 @workflow.defn
 class CVAnalysisWorkflow:
     """
     Workflow for analyzing CV text and extracting matching interests.
     
-    This workflow orchestrates the CV analysis process by calling the LLM activity
-    and handling any errors or retries that may occur.
+    This workflow orchestrates the CV analysis process by checking the analysis
+    cache, calling the LLM activity on a miss, and handling any errors or
+    retries that may occur.
     """
     
     @workflow.run
@@ -40,6 +379,24 @@ class CVAnalysisWorkflow:
         workflow.logger.info(f"Starting CV Analysis Workflow for text length: {len(cv_text)}")
         
         try:
+            # Reuse a previous analysis of the same CV if there is one
+            try:
+                cached_interests = await workflow.execute_local_activity(
+                    lookup_cv_analysis,
+                    cv_text,
+                    start_to_close_timeout=timedelta(seconds=5)
+                )
+            except Exception as e:
+                workflow.logger.warning(f"CV analysis cache lookup failed: {str(e)}")
+                cached_interests = None
+            
+            if cached_interests is not None:
+                workflow.logger.info(f"Workflow completed from cache with {len(cached_interests)} interests")
+                return {
+                    "success": True,
+                    "interests": cached_interests
+                }
+            
             # Execute the LLM analysis activity with retry policy
             interests = await workflow.execute_activity(
                 analyze_cv_with_llm,
@@ -76,10 +433,16 @@ class MatchingWorkflow:
     Workflow for matching students with mentors.
     
     This workflow orchestrates the matching process by:
-    1. Validating input data
-    2. Geocoding postcodes to coordinates
-    3. Running the matching algorithm
+    1. Validating input data, concurrently with the steps below
+    2. Geocoding postcodes to coordinates (only where distance can change the top matches)
+       while the location-independent components are scored
+    3. Adding distance to the scores and generating reasoning, starting early for
+       top matches location cannot change (see score_concurrently)
     4. Returning scored matches
+    
+    Rosters larger than MATCHING_SHARD_SIZE are scored in parallel shards
+    (see score_in_shards) and only the best MATCHING_SHARD_RESULT_LIMIT
+    matches are returned.
     """
     
     @workflow.run
@@ -88,45 +451,57 @@ class MatchingWorkflow:
         Execute the matching workflow.
         
         Args:
-            matching_request: Dictionary containing student and mentors data
+            matching_request: Dictionary containing the student and a mentor 'roster'
+                reference (or an inline 'mentors' list)
             
         Returns:
             Dictionary containing the matching results:
             {
                 "success": bool,
                 "suggest": [{"mentor_id": str, "score": int}, ...],
+                "result_limit": int (optional, when only the best matches are returned),
                 "error": str (optional)
             }
         """
         workflow.logger.info("Starting Matching Workflow")
         
         try:
-            # Step 1: Validate input data
-            await workflow.execute_activity(
-                validate_matching_data,
-                matching_request,
-                start_to_close_timeout=timedelta(seconds=10),
-                retry_policy=RetryPolicy(
-                    initial_interval=timedelta(seconds=1),
-                    maximum_interval=timedelta(seconds=5),
-                    maximum_attempts=2,
-                    backoff_coefficient=2.0,
-                )
-            )
+            # Step 1: Validate input data while the matches are computed
+            validation = asyncio.ensure_future(validate_request(matching_request))
+            matches = await run_validated(validation, self.calculate_matches(matching_request, validation))
             
-            workflow.logger.info("Input data validation passed")
+            workflow.logger.info(f"Matching workflow completed successfully with {len(matches)} matches")
             
-            # Step 2: Prepare postcodes for geocoding
-            student = matching_request['student']
-            mentors = matching_request['mentors']
+            return matching_result(mentor_roster(matching_request), matches, request_settings(matching_request))
             
-            postcodes = {'student': student['postcode']}
-            for mentor in mentors:
-                postcodes[mentor['id']] = mentor['postcode']
+        except Exception as e:
+            workflow.logger.error(f"Matching workflow failed with error: {str(e)}")
             
+            return {
+                "success": False,
+                "suggest": [],
+                "error": str(e)
+            }
+    
+    async def calculate_matches(self, matching_request: Dict[str, Any],
+                                validation: Awaitable[Any]) -> List[Dict[str, Any]]:
+        """
+        Steps 2-4: geocode and score the matches (includes LLM reasoning generation).
+        
+        LLM reasoning waits for validation to pass; the cheaper stages run alongside it.
+        """
+        student = matching_request['student']
+        mentors = mentor_roster(matching_request)
+        settings = request_settings(matching_request)
+        
+        if not use_distributed_scoring(mentors, settings):
+            return await score_concurrently(student, mentors, validation, settings)
+        
+        postcodes = await select_postcodes_in_shards(student, mentors, settings)
+        
+        coordinates = {}
+        if postcodes:
             workflow.logger.info(f"Preparing to geocode {len(postcodes)} postcodes")
-            
-            # Step 3: Geocode postcodes to coordinates
             coordinates = await workflow.execute_activity(
                 geocode_postcodes,
                 postcodes,
@@ -138,34 +513,197 @@ class MatchingWorkflow:
                     backoff_coefficient=2.0,
                 )
             )
-            
             workflow.logger.info(f"Geocoded {len(coordinates)} postcodes successfully")
+        
+        await validation
+        return await score_in_shards(student, mentors, coordinates, settings)
+
+
+@workflow.defn
+class LowLatencyMatchingWorkflow:
+    """
+    Low-latency variant of MatchingWorkflow.
+    
+    Validation and geocoding cache lookups run as local activities in the
+    worker that runs the workflow task, so they skip the task queue
+    round-trip and the extra history events of a regular activity. Only
+    work that can be slow or flaky stays a durable, regular activity:
+    geocoding postcodes missing from the cache, and scoring when it
+    generates LLM reasoning. Rosters large enough to be scored in shards are
+    also validated and bounded in shards, by regular activities. Results are
+    the same as MatchingWorkflow's.
+    """
+    
+    @workflow.run
+    async def run(self, matching_request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute the low-latency matching workflow.
+        
+        Args:
+            matching_request: Dictionary containing the student and a mentor 'roster'
+                reference (or an inline 'mentors' list)
             
-            # Step 4: Calculate matching scores (includes LLM reasoning generation)
-            matches = await workflow.execute_activity(
-                calculate_mentor_matches,
-                args=(student, mentors, coordinates),
-                start_to_close_timeout=timedelta(seconds=300),  # 5 minutes for multiple LLM calls
-                retry_policy=RetryPolicy(
-                    initial_interval=timedelta(seconds=2),
-                    maximum_interval=timedelta(seconds=10),
-                    maximum_attempts=2,
-                    backoff_coefficient=2.0,
+        Returns:
+            Dictionary containing the matching results (same shape as MatchingWorkflow)
+        """
+        workflow.logger.info("Starting Low-Latency Matching Workflow")
+        
+        try:
+            student = matching_request['student']
+            mentors = mentor_roster(matching_request)
+            settings = request_settings(matching_request)
+            
+            if use_distributed_scoring(mentors, settings):
+                # Too large for one local activity: validate and bound the roster in shards
+                await validate_request(matching_request)
+                postcodes = await select_postcodes_in_shards(student, mentors, settings)
+            else:
+                # Validation is deterministic, so a failure is not worth retrying
+                await workflow.execute_local_activity(
+                    validate_matching_data,
+                    matching_request,
+                    start_to_close_timeout=timedelta(seconds=5),
+                    retry_policy=RetryPolicy(maximum_attempts=1)
+                )
+                postcodes = await workflow.execute_local_activity(
+                    select_location_postcodes,
+                    args=(student, mentors, settings),
+                    start_to_close_timeout=timedelta(seconds=10)
+                )
+            
+            coordinates = {}
+            if postcodes:
+                lookup = await workflow.execute_local_activity(
+                    lookup_cached_coordinates,
+                    postcodes,
+                    start_to_close_timeout=timedelta(seconds=5)
                 )
+                coordinates = lookup['coordinates']
+                missing = {person_id: postcodes[person_id] for person_id in lookup['missing']}
+                
+                # Only postcodes this worker has never resolved pay for a durable geocoding activity
+                if missing:
+                    workflow.logger.info(f"Geocoding {len(missing)} uncached postcodes")
+                    coordinates.update(await workflow.execute_activity(
+                        geocode_postcodes,
+                        missing,
+                        start_to_close_timeout=timedelta(seconds=120),
+                        retry_policy=RetryPolicy(
+                            initial_interval=timedelta(seconds=2),
+                            maximum_interval=timedelta(seconds=10),
+                            maximum_attempts=3,
+                            backoff_coefficient=2.0,
+                        )
+                    ))
+                
+                workflow.logger.info(f"Resolved {len(coordinates)} of {len(postcodes)} postcodes")
+            
+            retry_policy = RetryPolicy(
+                initial_interval=timedelta(seconds=2),
+                maximum_interval=timedelta(seconds=10),
+                maximum_attempts=2,
+                backoff_coefficient=2.0,
             )
+            if use_distributed_scoring(mentors, settings):
+                matches = await score_in_shards(student, mentors, coordinates, settings)
+            elif settings['reasoning_mode'] in ('template', 'snippets'):
+                # No LLM calls at request time, so scoring is fast enough to run locally too
+                matches = await workflow.execute_local_activity(
+                    calculate_mentor_matches,
+                    args=(student, mentors, coordinates, settings),
+                    start_to_close_timeout=timedelta(seconds=30),
+                    retry_policy=retry_policy
+                )
+            else:
+                matches = await workflow.execute_activity(
+                    calculate_mentor_matches,
+                    args=(student, mentors, coordinates, settings),
+                    start_to_close_timeout=timedelta(seconds=300),  # 5 minutes for multiple LLM calls
+                    retry_policy=retry_policy
+                )
             
-            workflow.logger.info(f"Matching workflow completed successfully with {len(matches)} matches")
+            workflow.logger.info(f"Low-latency matching workflow completed with {len(matches)} matches")
             
-            return {
-                "success": True,
-                "suggest": matches
-            }
+            return matching_result(mentors, matches, settings)
             
         except Exception as e:
-            workflow.logger.error(f"Matching workflow failed with error: {str(e)}")
+            workflow.logger.error(f"Low-latency matching workflow failed with error: {str(e)}")
             
             return {
                 "success": False,
                 "suggest": [],
                 "error": str(e)
             }
+
+
+@workflow.defn
+class GeocodeCacheRefreshWorkflow:
+    """
+    Workflow for refreshing the geocoding cache from the mentor roster.
+    
+    Started periodically by a Temporal schedule so new mentor postcodes are
+    resolved before the first match that needs them.
+    """
+    
+    @workflow.run
+    async def run(self) -> int:
+        """
+        Execute the cache refresh workflow.
+        
+        Returns:
+            Number of postcodes in the geocoding cache
+        """
+        workflow.logger.info("Starting Geocode Cache Refresh Workflow")
+        
+        cached = await workflow.execute_activity(
+            refresh_geocode_cache,
+            start_to_close_timeout=timedelta(minutes=10),
+            retry_policy=RetryPolicy(
+                initial_interval=timedelta(seconds=5),
+                maximum_interval=timedelta(seconds=30),
+                maximum_attempts=2,
+                backoff_coefficient=2.0,
+            )
+        )
+        
+        workflow.logger.info(f"Geocode cache refresh completed with {cached} postcodes cached")
+        return cached
+
+
+@workflow.defn
+class MentorSnippetRefreshWorkflow:
+    """
+    Workflow for generating per-mentor reasoning snippets in the background.
+    
+    Started by a Temporal schedule for the built-in roster, and by the API for
+    the mentors of a matching request when snippet reasoning is enabled. Only
+    mentors whose current profile revision has no snippet cost an LLM call.
+    """
+    
+    @workflow.run
+    async def run(self, mentors: Optional[Union[RosterRef, List[Dict[str, Any]]]] = None) -> int:
+        """
+        Execute the snippet refresh workflow.
+        
+        Args:
+            mentors: Roster reference or mentor list (None for the built-in roster)
+            
+        Returns:
+            Number of snippets generated
+        """
+        workflow.logger.info("Starting Mentor Snippet Refresh Workflow")
+        
+        generated = await workflow.execute_activity(
+            refresh_mentor_snippets,
+            mentors,
+            start_to_close_timeout=timedelta(minutes=30),
+            retry_policy=RetryPolicy(
+                initial_interval=timedelta(seconds=5),
+                maximum_interval=timedelta(seconds=30),
+                maximum_attempts=2,
+                backoff_coefficient=2.0,
+            )
+        )
+        
+        workflow.logger.info(f"Mentor snippet refresh completed with {generated} snippets generated")
+        return generated